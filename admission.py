@@ -0,0 +1,170 @@
+"""
+Admission control for the GPT path: a circuit breaker and per-client rate limits
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit breaker is open"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"GPT circuit open; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class QueueFullError(Exception):
+    """Raised when too many GPT requests are already waiting"""
+
+
+def classify_failure(error):
+    """Return 'quota', 'rate_limit' or 'timeout' for errors that trip the breaker, else None"""
+    if isinstance(error, TimeoutError):
+        return 'timeout'
+    # The SDK's own timeout isn't a TimeoutError; it is loaded already if it raised one
+    openai = sys.modules.get('openai')
+    if openai is not None and isinstance(error, openai.APITimeoutError):
+        return 'timeout'
+    message = str(error)
+    if 'insufficient_quota' in message:
+        return 'quota'
+    if 'rate_limit' in message or getattr(error, 'status_code', None) == 429:
+        return 'rate_limit'
+    return None
+
+
+class CircuitBreaker:
+    """Fail fast while the upstream is rate-limited, out of quota or timing out.
+
+    Closed, every call is allowed. ``failure_threshold`` consecutive tripping
+    failures (or a single quota error) open the circuit, and calls are
+    rejected for ``reset_timeout`` seconds (``quota_reset_timeout`` after a
+    quota error). After that one trial call is let through: success closes
+    the circuit, another tripping failure opens it again. A trial that ends
+    without an answer, because it was cancelled or never sent, must call
+    ``release_trial`` so the next call can try instead.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, quota_reset_timeout=300.0,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.quota_reset_timeout = quota_reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._open_for = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if self._clock() - self._opened_at < self._open_for:
+                return 'open'
+            return 'half_open'
+
+    def retry_after(self):
+        """Seconds until the circuit lets a trial call through"""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self._open_for - (self._clock() - self._opened_at))
+
+    def allow(self):
+        """Return True if a call may go upstream now"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._clock() - self._opened_at < self._open_for or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def release_trial(self):
+        """Let another call be the trial, without changing the circuit's state"""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("GPT circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self, error):
+        """Count a failed call; errors that don't indicate upstream trouble are ignored"""
+        kind = classify_failure(error)
+        if kind is None:
+            # The upstream answered, so this says nothing about its health
+            self.record_success()
+            return
+        with self._lock:
+            self._failures += 1
+            if kind == 'quota' or self._trial or self._failures >= self.failure_threshold:
+                self._open_for = self.quota_reset_timeout if kind == 'quota' else self.reset_timeout
+                self._opened_at = self._clock()
+                self._trial = False
+                logger.warning(f"GPT circuit opened for {self._open_for:g}s after {kind} failure")
+
+
+class ClientRateLimiter:
+    """Token bucket per client key, refilled at rate tokens per second up to burst.
+
+    Buckets for the least recently seen clients are dropped once more than
+    ``max_clients`` are tracked; a dropped client simply starts full again.
+    """
+
+    def __init__(self, rate, burst, max_clients=10000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._clock = clock
+        self._buckets = OrderedDict()  # client -> [tokens, last refill time]
+        self._lock = threading.Lock()
+
+    def acquire(self, client):
+        """Take a token for client; return 0 if admitted, else seconds until one is available"""
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = [self.burst, now]
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / self.rate
+
+
+def create_circuit_breaker():
+    """Create the GPT circuit breaker from environment settings"""
+    return CircuitBreaker(
+        failure_threshold=int(os.environ.get('GPT_BREAKER_THRESHOLD', 5)),
+        reset_timeout=float(os.environ.get('GPT_BREAKER_RESET', 30)),
+        quota_reset_timeout=float(os.environ.get('GPT_BREAKER_QUOTA_RESET', 300)),
+    )
+
+
+def create_client_limiter():
+    """Create the per-client GPT rate limiter from environment settings, or None if disabled"""
+    per_minute = float(os.environ.get('GPT_CLIENT_RATE', 20))
+    if per_minute <= 0:
+        return None
+    burst = float(os.environ.get('GPT_CLIENT_BURST', 5))
+    return ClientRateLimiter(rate=per_minute / 60, burst=max(1.0, burst))
@@ -1,112 +1,481 @@
+import hashlib
 import logging
-from flask import Flask, render_template, jsonify, request
-from text_generator import ButterTextGenerator
-from twitter_bot import create_twitter_bot
+import math
+import os
+import time
+from flask import Flask, Response, g, jsonify, request
+from werkzeug.middleware.proxy_fix import ProxyFix
+from text_generator import ButterTextGenerator, split_gpt_text
+from gpt_prompts import DEFAULT_TUNING_PARAMS
+from gpt_cache import gpt_cache
+from twitter_bot import create_twitter_bot, twitter_bot_enabled
+from output_formats import OUTPUT_FORMATS, UNIT_SEPARATORS, dumps, json_response, render_units
+from admission import create_client_limiter
+from static_pages import create_page_cache, init_static_caching
+from vocab_packs import require_grammar, vocab_registry
+from text_pool import create_text_pool, gpt_pool_counts, register_gpt_pools, register_template_pools
+import metrics
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+# Configure logging; set LOG_LEVEL=DEBUG for per-request detail
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper())
 logger = logging.getLogger(__name__)
 
+# Without its grammar table the default pack produces agreement errors ("is melts")
+if os.environ.get('VOCAB_REQUIRE_GRAMMAR', 'true').lower() == 'true':
+    require_grammar(vocab_registry)
+
 app = Flask(__name__)
+# Reverse proxies in front of the app whose X-Forwarded-For/-Proto headers are trusted;
+# with none, a client can't choose its own address by sending the headers itself
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS, x_proto=TRUSTED_PROXY_HOPS)
+# The HTML pages are static, so they are rendered and compressed once;
+# static asset URLs carry a content hash
+page_cache = create_page_cache(app)
+init_static_caching(app)
 text_generator = ButterTextGenerator()
+# Shared across requests; tuning parameters are passed per call
+gpt_generator = ButterTextGenerator(use_gpt=True)
+markov_generator = ButterTextGenerator(engine='markov')
+
+ENGINES = ['template', 'markov', 'gpt']
+
+# Per-client token buckets for GPT requests (GPT_CLIENT_RATE per minute, GPT_CLIENT_BURST)
+gpt_client_limiter = create_client_limiter()
+
+# Optional pool of pre-generated text for unseeded requests (TEXT_POOL_ENABLED);
+# the refill thread gets its own generator so it never shares an RNG with requests
+text_pool = create_text_pool()
+if text_pool:
+    register_template_pools(text_pool, ButterTextGenerator())
+    if gpt_generator.use_gpt:
+        register_gpt_pools(text_pool, gpt_generator, gpt_pool_counts())
 
-# Initialize Twitter bot
-twitter_bot = create_twitter_bot()
-if twitter_bot:
-    logger.info("Twitter bot initialized and scheduled successfully")
+# Initialize Twitter bot only when it is enabled and configured, so the
+# template API never waits on the Twitter and scheduler SDKs at startup
+twitter_bot = None
+if twitter_bot_enabled():
+    twitter_bot = create_twitter_bot()
+    if twitter_bot:
+        logger.info("Twitter bot initialized successfully")
+    else:
+        logger.warning("Failed to initialize Twitter bot")
 else:
-    logger.warning("Failed to initialize Twitter bot")
+    logger.info("Twitter bot disabled (set TWITTER_BOT_ENABLED and Twitter credentials to enable it)")
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.http_request_duration.observe(time.perf_counter() - start, route, request.method)
+        metrics.http_requests.inc(route, request.method, str(response.status_code))
+    metrics.registry.ensure_flusher()
+    return response
+
+metrics.registry.gauge('butter_gpt_circuit_open', 'Whether the GPT circuit breaker is rejecting calls',
+                       lambda: int(gpt_generator.dispatcher is not None
+                                   and gpt_generator.dispatcher.breaker is not None
+                                   and gpt_generator.dispatcher.breaker.state == 'open'))
+
+# Under gunicorn this runs in each worker, after the fork
+metrics.registry.ensure_flusher()
+
+# Seeded output never changes for a given vocabulary, so it can be cached for a year
+SEEDED_CACHE_MAX_AGE = 31536000
+
+def parse_seed():
+    """Return the optional integer seed query parameter"""
+    seed = request.args.get('seed')
+    return int(seed) if seed is not None else None
+
+def parse_pack(args=None):
+    """Return the requested vocabulary pack name, or None if there is no such pack"""
+    pack = (request.args if args is None else args).get('pack') or vocab_registry.default
+    if not isinstance(pack, str) or vocab_registry.get(pack) is None:
+        return None
+    return pack
+
+def invalid_pack_error():
+    return {
+        'error': 'Invalid pack parameter',
+        'message': f'Pack must be one of: {", ".join(vocab_registry.names())}'
+    }
+
+def local_generator(pack, seed=None, engine='template'):
+    """Return a generator for pack; only seeded or non-default-pack requests need their own"""
+    if seed is not None or (engine == 'template' and pack != vocab_registry.default):
+        return ButterTextGenerator(seed=seed, engine=engine, pack=pack)
+    return markov_generator if engine == 'markov' else text_generator
+
+def seeded_etag(*parts, pack=None):
+    """Build a strong ETag for seeded output from the request and vocabulary pack"""
+    key = ':'.join(str(part) for part in (vocab_registry.get(pack).fingerprint,) + parts)
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+def engine_cache_parts(engine, tuning_params=None):
+    """Extra ETag inputs for engines whose output depends on more than the vocabulary"""
+    if engine != 'markov':
+        return ()
+    playfulness = (tuning_params or DEFAULT_TUNING_PARAMS)['playfulness']
+    return (markov_generator.markov.fingerprint, playfulness)
+
+def client_id():
+    """Identify the client for rate limiting, by its address as seen past TRUSTED_PROXY_HOPS proxies"""
+    return request.remote_addr
+
+def parse_format():
+    """Return the format query parameter, or None if it is not a known format"""
+    output_format = request.args.get('format', 'json')
+    return output_format if output_format in OUTPUT_FORMATS else None
+
+def parse_tuning_params():
+    """Return the GPT tuning parameters from the query string, defaulting each one"""
+    return {param: int(request.args.get(param, default)) for param, default in DEFAULT_TUNING_PARAMS.items()}
+
+def sse_event(data, event=None):
+    """Encode one Server-Sent Event carrying a JSON payload"""
+    head = f"event: {event}\n".encode() if event else b''
+    return head + b'data: ' + dumps(data) + b'\n\n'
+
+def units_response(units, mode, output_format):
+    """Render generated units in a non-JSON-envelope format"""
+    body, mimetype = render_units(units, mode, output_format)
+    return Response(body, mimetype=mimetype)
+
+def pooled_output(engine, count, mode, tuning_params=None, pack=None):
+    """Return (units, text) from the text pool for an unseeded request.
+
+    Template pools hold single units of the default pack, so both are
+    returned. GPT pools hold whole completions for the default tuning
+    profile, so only text is returned. Both are None when the pool can't
+    serve the request.
+    """
+    if text_pool is None:
+        return None, None
+    if engine == 'template':
+        if pack not in (None, vocab_registry.default):
+            return None, None
+        units = text_pool.take(('template', mode), count,
+                               fill=lambda n: text_generator.generate_units(n, mode))
+        if units is not None:
+            return units, UNIT_SEPARATORS[mode].join(units)
+    elif engine == 'gpt' and (tuning_params or DEFAULT_TUNING_PARAMS) == DEFAULT_TUNING_PARAMS:
+        texts = text_pool.take(('gpt', mode, count))
+        if texts is not None:
+            return None, texts[0]
+    return None, None
+
+def cacheable(response, etag):
+    """Mark a seeded response as immutable and cacheable by shared caches"""
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = SEEDED_CACHE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return page_cache.respond('index.html')
 
 @app.route('/api/docs')
 def api_docs():
-    return render_template('api.html')
+    return page_cache.respond('api.html')
 
 @app.route('/sheets')
 def sheets_docs():
-    return render_template('google_sheets.html')
+    return page_cache.respond('google_sheets.html')
 
-@app.route('/generate', methods=['GET'])
-def generate_text():
-    """Generate butter-themed text through web interface."""
-    try:
-        # Parse and validate basic parameters
-        count = int(request.args.get('count', 1))
-        mode = request.args.get('mode', 'paragraph')
-        use_gpt = request.args.get('use_gpt', '').lower() == 'true'
-        
-        # Get tuning parameters
-        tuning_params = {
-            'playfulness': int(request.args.get('playfulness', 7)),
-            'humor': int(request.args.get('humor', 4)),
-            'emotion': int(request.args.get('emotion', 6)),
-            'poetic': int(request.args.get('poetic', 8)),
-            'metaphorical': int(request.args.get('metaphorical', 8)),
-            'technical': int(request.args.get('technical', 3))
-        }
-        
-        # Validate parameters
-        if count < 1 or count > 10:
-            return jsonify({'error': 'Count must be between 1 and 10'}), 400
-            
-        if mode not in ['paragraph', 'sentence', 'word']:
-            return jsonify({'error': 'Invalid mode'}), 400
-            
-        for param, value in tuning_params.items():
-            if not isinstance(value, int) or value < 1 or value > 10:
-                return jsonify({'error': f'Invalid {param} value. Must be between 1 and 10'}), 400
+class WebGeneration:
+    """A validated /generate request"""
+
+    def __init__(self, count, mode, engine, seed, output_format, pack, tuning_params, fallback):
+        self.count = count
+        self.mode = mode
+        self.engine = engine
+        self.seed = seed
+        self.output_format = output_format
+        self.pack = pack
+        self.tuning_params = tuning_params
+        # With fallback=template, GPT requests that can't be served get template text instead of an error
+        self.fallback = fallback
+        self.fallback_reason = None
+        self.etag = None
+
+def prepare_web_generation():
+    """Parse and validate a /generate request.
+
+    Returns (generation, None), or (None, response) when the request can be
+    answered without generating anything: invalid parameters, unavailable
+    engines and conditional requests. Raises ValueError for non-integer
+    parameters.
+    """
+    # Parse and validate basic parameters
+    count = int(request.args.get('count', 1))
+    mode = request.args.get('mode', 'paragraph')
+    use_gpt = request.args.get('use_gpt', '').lower() == 'true'
+    engine = request.args.get('engine', 'gpt' if use_gpt else 'template')
+    use_gpt = engine == 'gpt'
+    seed = parse_seed()
+    output_format = parse_format()
+    pack = parse_pack()
+    
+    # Get tuning parameters
+    tuning_params = parse_tuning_params()
+    
+    # Validate parameters
+    if count < 1 or count > 10:
+        return None, (jsonify({'error': 'Count must be between 1 and 10'}), 400)
         
-        # Create a new generator instance with current settings
-        generator = ButterTextGenerator(use_gpt=use_gpt, tuning_params=tuning_params)
+    if mode not in ['paragraph', 'sentence', 'word']:
+        return None, (jsonify({'error': 'Invalid mode'}), 400)
         
-        # Check if GPT was requested but not available
-        if use_gpt and not generator.use_gpt:
-            logger.warning("GPT generation requested but not available")
-            return jsonify({
+    if engine not in ENGINES:
+        return None, (jsonify({'error': 'Invalid engine'}), 400)
+        
+    if output_format is None:
+        return None, (jsonify({'error': 'Invalid format'}), 400)
+        
+    if pack is None:
+        return None, (jsonify({'error': 'Invalid pack'}), 400)
+        
+    for param, value in tuning_params.items():
+        if not isinstance(value, int) or value < 1 or value > 10:
+            return None, (jsonify({'error': f'Invalid {param} value. Must be between 1 and 10'}), 400)
+    
+    generation = WebGeneration(count, mode, engine, seed, output_format, pack, tuning_params,
+                               fallback=use_gpt and request.args.get('fallback') == 'template')
+    
+    # Check if GPT was requested but not available
+    if use_gpt and not gpt_generator.use_gpt:
+        logger.warning("GPT generation requested but not available")
+        if not generation.fallback:
+            return None, (jsonify({
                 'text': None,
                 'error': 'GPT generation is currently unavailable. Please try again later or disable GPT.',
                 'fallback_available': True
-            }), 503
+            }), 503)
+        generation.fallback_reason = 'GPT generation is currently unavailable'
+    elif use_gpt and gpt_client_limiter:
+        retry_after = gpt_client_limiter.acquire(client_id())
+        if retry_after:
+            metrics.gpt_rejections.inc('client_rate')
+            if not generation.fallback:
+                response = jsonify({
+                    'text': None,
+                    'error': 'Too many GPT requests. Please wait a moment or disable GPT.',
+                    'fallback_available': True
+                })
+                response.headers['Retry-After'] = str(math.ceil(retry_after))
+                return None, (response, 429)
+            generation.fallback_reason = 'GPT request limit reached'
+    
+    if generation.fallback_reason:
+        generation.engine = engine = 'template'
+    
+    if engine == 'markov' and markov_generator.markov is None:
+        logger.warning("N-gram generation requested but no model is loaded")
+        return None, (jsonify({
+            'text': None,
+            'error': 'The n-gram engine is currently unavailable. Please try another engine.',
+            'fallback_available': True
+        }), 503)
+    
+    # Seeded local output is deterministic, so answer revalidations up front
+    if seed is not None and engine != 'gpt' and not generation.fallback_reason:
+        generation.etag = seeded_etag('web', engine, mode, count, seed, output_format,
+                                      *engine_cache_parts(engine, tuning_params), pack=pack)
+        if request.if_none_match.contains(generation.etag):
+            return None, cacheable(Response(status=304), generation.etag)
+    
+    return generation, None
+
+def web_generation_response(generation, engine, text=None):
+    """Generate text with engine and build the /generate response.
+
+    text is GPT output the caller has already fetched, if any.
+    """
+    count, mode, tuning_params = generation.count, generation.mode, generation.tuning_params
+    use_gpt = engine == 'gpt'
+    # Reuse the shared generators; only seeded requests need their own RNG
+    generator = gpt_generator if use_gpt else local_generator(generation.pack, generation.seed, engine)
+    
+    units = None
+    if text is None and generation.seed is None:
+        units, text = pooled_output(engine, count, mode, tuning_params, generation.pack)
+    
+    # Other formats are rendered from the generator's own unit boundaries
+    if generation.output_format != 'json':
+        logger.debug("Generating %s %s units as %s (GPT: %s)", count, mode, generation.output_format, use_gpt)
+        if units is None:
+            units = split_gpt_text(text, mode) if text is not None else \
+                generator.generate_units(count, mode, tuning_params)
+        response = units_response(units, mode, generation.output_format)
+    else:
+        # Generate text based on mode
+        if text is not None:
+            logger.debug("Serving %s prepared %s(s) (GPT: %s)", count, mode, use_gpt)
+        elif mode == 'paragraph':
+            logger.debug("Generating %s paragraphs (GPT: %s)", count, use_gpt)
+            text = generator.generate_paragraphs(count, tuning_params)
+        elif mode == 'sentence':
+            logger.debug("Generating %s sentences (GPT: %s)", count, use_gpt)
+            text = generator.generate_sentences(count, tuning_params)
+        else:
+            logger.debug("Generating %s words (GPT: %s)", count, use_gpt)
+            text = generator.generate_words(count, tuning_params)
         
-        try:
-            # Generate text based on mode
-            if mode == 'paragraph':
-                logger.debug(f"Generating {count} paragraphs (GPT: {use_gpt})")
-                text = generator.generate_paragraphs(count)
-            elif mode == 'sentence':
-                logger.debug(f"Generating {count} sentences (GPT: {use_gpt})")
-                text = generator.generate_sentences(count)
-            else:
-                logger.debug(f"Generating {count} words (GPT: {use_gpt})")
-                text = generator.generate_words(count)
-            
-            if text is None:
-                return jsonify({
-                    'error': 'Failed to generate text. Please try again.',
-                    'fallback_available': not use_gpt
-                }), 500
-            
-            return jsonify({'text': text})
-            
-        except ValueError as ve:
-            # This catches the specific GPT-related errors we defined
-            error_message = str(ve)
-            logger.warning(f"GPT generation error: {error_message}")
+        if text is None:
             return jsonify({
-                'error': error_message,
+                'error': 'Failed to generate text. Please try again.',
                 'fallback_available': not use_gpt
-            }), 503  # Service Unavailable
+            }), 500
+        
+        body = {'text': text}
+        if generation.fallback_reason:
+            body['fallback'] = {'engine': engine, 'reason': generation.fallback_reason}
+        response = json_response(body)
+    
+    if generation.fallback_reason:
+        response.headers['X-Butter-Fallback'] = engine
+    if generation.etag:
+        return cacheable(response, generation.etag)
+    return response
+
+def gpt_failure_response(generation, error):
+    """Answer a /generate request whose GPT call failed: template text with fallback, else a 503"""
+    # This catches the specific GPT-related errors we defined
+    error_message = str(error)
+    logger.warning(f"GPT generation error: {error_message}")
+    if generation.fallback:
+        generation.fallback_reason = error_message
+        return web_generation_response(generation, 'template')
+    return jsonify({
+        'error': error_message,
+        'fallback_available': generation.engine != 'gpt'
+    }), 503  # Service Unavailable
+
+@app.route('/generate', methods=['GET'])
+def generate_text():
+    """Generate butter-themed text through web interface."""
+    try:
+        generation, response = prepare_web_generation()
+        if response is not None:
+            return response
+        
+        try:
+            return web_generation_response(generation, generation.engine)
+        except ValueError as ve:
+            return gpt_failure_response(generation, ve)
         
     except ValueError as ve:
         logger.error(f"Invalid parameter value: {str(ve)}")
         return jsonify({'error': 'Invalid parameter value'}), 400
     except Exception as e:
         logger.error(f"Error generating text: {str(e)}")
+        metrics.record_error('web', e)
         return jsonify({'error': 'Failed to generate text'}), 500
 
+@app.route('/generate/stream', methods=['GET'])
+def stream_gpt_text():
+    """
+    Stream GPT text to the web interface as Server-Sent Events.
+
+    Takes the same parameters as /generate with use_gpt=true. Text is sent
+    as it arrives from OpenAI, as message events carrying {"text": "..."},
+    and a "done" event ends the stream. Failures before the first text get
+    the same JSON error responses as /generate; a failure after it is sent
+    as an "error" event. With fallback=template, a request GPT can't serve
+    gets a "fallback" event followed by template text.
+
+    When the client disconnects, the OpenAI request is cancelled.
+    """
+    try:
+        count = int(request.args.get('count', 1))
+        mode = request.args.get('mode', 'paragraph')
+        tuning_params = parse_tuning_params()
+    except ValueError:
+        return jsonify({'error': 'Invalid parameter value'}), 400
+    
+    if count < 1 or count > 10:
+        return jsonify({'error': 'Count must be between 1 and 10'}), 400
+    
+    if mode not in ['paragraph', 'sentence', 'word']:
+        return jsonify({'error': 'Invalid mode'}), 400
+    
+    for param, value in tuning_params.items():
+        if value < 1 or value > 10:
+            return jsonify({'error': f'Invalid {param} value. Must be between 1 and 10'}), 400
+    
+    fallback = request.args.get('fallback') == 'template'
+    fallback_reason = None
+    if not gpt_generator.use_gpt:
+        logger.warning("GPT streaming requested but not available")
+        if not fallback:
+            return jsonify({
+                'text': None,
+                'error': 'GPT generation is currently unavailable. Please try again later or disable GPT.',
+                'fallback_available': True
+            }), 503
+        fallback_reason = 'GPT generation is currently unavailable'
+    elif gpt_client_limiter:
+        retry_after = gpt_client_limiter.acquire(client_id())
+        if retry_after:
+            metrics.gpt_rejections.inc('client_rate')
+            if not fallback:
+                response = jsonify({
+                    'text': None,
+                    'error': 'Too many GPT requests. Please wait a moment or disable GPT.',
+                    'fallback_available': True
+                })
+                response.headers['Retry-After'] = str(math.ceil(retry_after))
+                return response, 429
+            fallback_reason = 'GPT request limit reached'
+    
+    chunks = first = None
+    if not fallback_reason:
+        _, first = pooled_output('gpt', count, mode, tuning_params)
+        if first is None:
+            chunks = gpt_generator.stream_with_gpt(count, mode, tuning_params)
+            try:
+                # Wait for the first text here, so early failures get a normal error response
+                first = next(chunks, '')
+            except ValueError as ve:
+                logger.warning(f"GPT streaming error: {str(ve)}")
+                if not fallback:
+                    return jsonify({'error': str(ve), 'fallback_available': True}), 503
+                fallback_reason = str(ve)
+    
+    def events():
+        try:
+            if fallback_reason:
+                yield sse_event({'engine': 'template', 'reason': fallback_reason}, 'fallback')
+                units = text_generator.generate_units(count, mode)
+                yield sse_event({'text': UNIT_SEPARATORS[mode].join(units)})
+            else:
+                yield sse_event({'text': first})
+                for chunk in chunks or ():
+                    yield sse_event({'text': chunk})
+            yield sse_event({}, 'done')
+        except ValueError as ve:
+            yield sse_event({'error': str(ve)}, 'error')
+        finally:
+            # Runs when the server closes the response after a disconnect, too
+            if chunks is not None:
+                chunks.close()
+    
+    response = Response(events(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop proxies such as nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    if fallback_reason:
+        response.headers['X-Butter-Fallback'] = 'template'
+    return response
+
 @app.route('/api/v1/generate', methods=['GET'])
 def api_generate_text():
     """
@@ -115,6 +484,15 @@ def api_generate_text():
     Query Parameters:
     - count (int): Number of units to generate (1-10)
     - mode (str): Generation mode ('paragraph', 'sentence', or 'word')
+    - seed (int, optional): Seed for reproducible output
+    - engine (str, optional): 'template' (default) or 'markov'
+    - pack (str, optional): Vocabulary pack for the template engine
+      (default 'butter')
+    - format (str, optional): 'json' (default) for the object below, or
+      'plain', 'html', 'markdown' or 'json-array' to get just the text
+    - length (int, optional): Return text of exactly this many units
+      (1-100,000) instead of count/mode units; uses the template engine
+    - unit (str, optional): 'chars' (default) or 'bytes' (UTF-8) for length
     
     Returns:
     JSON object containing:
@@ -122,18 +500,40 @@ def api_generate_text():
     - metadata (object):
         - count (int): Number of units generated
         - mode (str): Generation mode used
-        - timestamp (str): Generation timestamp
+        - timestamp (str): Generation timestamp (unseeded requests)
+        - seed (int): Seed used (seeded requests)
+    
+    Seeded responses carry a strong ETag and a long-lived Cache-Control
+    header, and conditional requests with a matching If-None-Match get a 304.
     
     Example:
     GET /api/v1/generate?count=2&mode=paragraph
     
     Error Codes:
+    - 304: Not modified (seeded requests only)
     - 400: Invalid parameters
     - 500: Server error
+    - 503: Requested engine unavailable
     """
     try:
         count = int(request.args.get('count', 1))
         mode = request.args.get('mode', 'paragraph')
+        seed = parse_seed()
+        engine = request.args.get('engine', 'template')
+        output_format = parse_format()
+        pack = parse_pack()
+        
+        if pack is None:
+            return jsonify(invalid_pack_error()), 400
+        
+        if output_format is None:
+            return jsonify({
+                'error': 'Invalid format parameter',
+                'message': f'Format must be one of: {", ".join(OUTPUT_FORMATS)}'
+            }), 400
+        
+        if 'length' in request.args:
+            return generate_exact_length(seed, output_format, pack)
         
         if count < 1 or count > 10:
             return jsonify({
@@ -147,18 +547,60 @@ def api_generate_text():
                 'message': 'Mode must be one of: paragraph, sentence, word'
             }), 400
         
-        if mode == 'paragraph':
-            logger.debug(f"API: Generating {count} paragraphs")
-            text = text_generator.generate_paragraphs(count)
+        if engine not in ['template', 'markov']:
+            return jsonify({
+                'error': 'Invalid engine parameter',
+                'message': 'Engine must be one of: template, markov'
+            }), 400
+        
+        if engine == 'markov' and markov_generator.markov is None:
+            return jsonify({
+                'error': 'Engine unavailable',
+                'message': 'The n-gram engine has no model loaded'
+            }), 503
+        
+        generator = local_generator(pack, seed, engine)
+        units = text = None
+        if seed is not None:
+            etag = seeded_etag('api', engine, mode, count, seed, output_format,
+                               *engine_cache_parts(engine), pack=pack)
+            if request.if_none_match.contains(etag):
+                return cacheable(Response(status=304), etag)
+        else:
+            units, text = pooled_output(engine, count, mode, pack=pack)
+        
+        if output_format != 'json':
+            logger.debug("API: Generating %s %s units as %s", count, mode, output_format)
+            if units is None:
+                units = generator.generate_units(count, mode)
+            response = units_response(units, mode, output_format)
+            return cacheable(response, etag) if seed is not None else response
+        
+        if text is not None:
+            logger.debug("API: Serving %s pooled %s(s)", count, mode)
+        elif mode == 'paragraph':
+            logger.debug("API: Generating %s paragraphs", count)
+            text = generator.generate_paragraphs(count)
         elif mode == 'sentence':
-            logger.debug(f"API: Generating {count} sentences")
-            text = text_generator.generate_sentences(count)
+            logger.debug("API: Generating %s sentences", count)
+            text = generator.generate_sentences(count)
         else:
-            logger.debug(f"API: Generating {count} words")
-            text = text_generator.generate_words(count)
+            logger.debug("API: Generating %s words", count)
+            text = generator.generate_words(count)
+        
+        if seed is not None:
+            # No timestamp, so the body is byte-identical for every request
+            return cacheable(json_response({
+                'text': text,
+                'metadata': {
+                    'count': count,
+                    'mode': mode,
+                    'seed': seed
+                }
+            }), etag)
         
         from datetime import datetime
-        return jsonify({
+        return json_response({
             'text': text,
             'metadata': {
                 'count': count,
@@ -169,15 +611,281 @@ def api_generate_text():
     except ValueError:
         return jsonify({
             'error': 'Invalid parameter type',
-            'message': 'Count must be a valid integer'
+            'message': 'Count and seed must be valid integers'
         }), 400
     except Exception as e:
         logger.error(f"API Error generating text: {str(e)}")
+        metrics.record_error('api', e)
+        return jsonify({
+            'error': 'Internal server error',
+            'message': 'Failed to generate text'
+        }), 500
+
+LENGTH_MAX = 100_000
+LENGTH_UNITS = ['chars', 'bytes']
+
+def parse_length(max_length):
+    """Validate the length/unit query parameters, returning (length, unit, error response)"""
+    unit = request.args.get('unit', 'chars')
+    try:
+        length = int(request.args.get('length'))
+    except ValueError:
+        return None, unit, (jsonify({
+            'error': 'Invalid length parameter',
+            'message': 'Length must be an integer'
+        }), 400)
+    if length < 1 or length > max_length:
+        return length, unit, (jsonify({
+            'error': 'Invalid length parameter',
+            'message': f'Length must be between 1 and {max_length}'
+        }), 400)
+    if unit not in LENGTH_UNITS:
+        return length, unit, (jsonify({
+            'error': 'Invalid unit parameter',
+            'message': 'Unit must be one of: chars, bytes'
+        }), 400)
+    return length, unit, None
+
+def generate_exact_length(seed, output_format='json', pack=None):
+    """Build the /api/v1/generate response for a length= request"""
+    length, unit, error = parse_length(LENGTH_MAX)
+    if error:
+        return error
+
+    generator = local_generator(pack, seed)
+    etag = None
+    if seed is not None:
+        etag = seeded_etag('api-length', length, unit, seed, output_format, pack=pack)
+        if request.if_none_match.contains(etag):
+            return cacheable(Response(status=304), etag)
+
+    logger.debug("API: Generating exactly %s %s", length, unit)
+    text = generator.generate_length(length, unit)
+    if output_format == 'plain':
+        # No trailing newline, so the body is exactly the requested size
+        response = Response(text, mimetype='text/plain')
+    elif output_format != 'json':
+        response = units_response([text], 'paragraph', output_format)
+    else:
+        metadata = {'length': length, 'unit': unit}
+        if seed is not None:
+            metadata['seed'] = seed
+        else:
+            from datetime import datetime
+            metadata['timestamp'] = datetime.utcnow().isoformat() + 'Z'
+        response = json_response({'text': text, 'metadata': metadata})
+    return cacheable(response, etag) if etag else response
+
+BATCH_MAX_REQUESTS = 1000
+
+def generate_batch_item(spec):
+    """Generate text for one batch spec, returning a result or error object"""
+    if not isinstance(spec, dict):
+        return {'error': 'Invalid request', 'message': 'Each request must be an object'}
+    try:
+        count = int(spec.get('count', 1))
+        seed = spec.get('seed')
+        seed = int(seed) if seed is not None else None
+    except (TypeError, ValueError):
+        return {'error': 'Invalid parameter type', 'message': 'Count and seed must be valid integers'}
+    mode = spec.get('mode', 'paragraph')
+    pack = parse_pack(spec)
+
+    if count < 1 or count > 10:
+        return {'error': 'Invalid count parameter', 'message': 'Count must be between 1 and 10'}
+    if mode not in ['paragraph', 'sentence', 'word']:
+        return {'error': 'Invalid mode parameter', 'message': 'Mode must be one of: paragraph, sentence, word'}
+    if pack is None:
+        return invalid_pack_error()
+
+    generator = local_generator(pack, seed)
+    if mode == 'paragraph':
+        text = generator.generate_paragraphs(count)
+    elif mode == 'sentence':
+        text = generator.generate_sentences(count)
+    else:
+        text = generator.generate_words(count)
+
+    metadata = {'count': count, 'mode': mode}
+    if seed is not None:
+        metadata['seed'] = seed
+    return {'text': text, 'metadata': metadata}
+
+@app.route('/api/v1/generate/batch', methods=['POST'])
+def api_generate_batch():
+    """
+    Generate text for many requests in a single call.
+
+    Request Body (JSON):
+    - requests (list): Up to 1000 objects, each with the same fields as
+      /api/v1/generate: count (int), mode (str), and optional seed (int)
+      and pack (str)
+
+    Returns:
+    JSON object containing:
+    - results (list): One entry per request, in order. Each is either
+      {"text": ..., "metadata": {...}} or {"error": ..., "message": ...}
+      when that request's parameters are invalid.
+
+    Example:
+    POST /api/v1/generate/batch
+    {"requests": [{"count": 2, "mode": "sentence"}, {"count": 5, "mode": "word", "seed": 42}]}
+
+    Error Codes:
+    - 400: Malformed body or too many requests
+    - 500: Server error
+    """
+    payload = request.get_json(silent=True)
+    specs = payload.get('requests') if isinstance(payload, dict) else None
+    if not isinstance(specs, list):
+        return jsonify({
+            'error': 'Invalid request body',
+            'message': 'Body must be a JSON object with a "requests" list'
+        }), 400
+
+    if len(specs) > BATCH_MAX_REQUESTS:
+        return jsonify({
+            'error': 'Too many requests',
+            'message': f'A batch may contain at most {BATCH_MAX_REQUESTS} requests'
+        }), 400
+
+    try:
+        logger.debug("API: Generating batch of %s requests", len(specs))
+        return json_response({'results': [generate_batch_item(spec) for spec in specs]})
+    except Exception as e:
+        logger.error(f"API Error generating batch: {str(e)}")
+        metrics.record_error('api', e)
         return jsonify({
             'error': 'Internal server error',
             'message': 'Failed to generate text'
         }), 500
 
+STREAM_MAX_COUNT = 10_000_000
+STREAM_MAX_LENGTH = 1_000_000_000
+
+@app.route('/api/v1/stream', methods=['GET'])
+def api_stream_text():
+    """
+    Stream large amounts of butter-themed placeholder text.
+
+    Query Parameters:
+    - count (int): Number of units to generate (1-10,000,000)
+    - mode (str): Generation mode ('paragraph', 'sentence', or 'word')
+    - format (str): 'text' (default) for plain text, or 'ndjson' for one
+      JSON object per line, e.g. {"text": "..."}
+    - seed (int, optional): Seed for reproducible output
+    - pack (str, optional): Vocabulary pack (default 'butter')
+    - length (int, optional): Stream exactly this many units of text
+      (1-1,000,000,000) instead of count/mode units
+    - unit (str, optional): 'chars' (default) or 'bytes' (UTF-8) for length
+
+    Text is produced and sent in small batches, so memory use and
+    time-to-first-byte do not grow with count or length.
+
+    Example:
+    GET /api/v1/stream?count=100000&mode=sentence&format=ndjson
+
+    Error Codes:
+    - 400: Invalid parameters
+    """
+    try:
+        count = int(request.args.get('count', 1))
+        seed = parse_seed()
+    except ValueError:
+        return jsonify({
+            'error': 'Invalid parameter type',
+            'message': 'Count and seed must be valid integers'
+        }), 400
+    mode = request.args.get('mode', 'paragraph')
+    output_format = request.args.get('format', 'text')
+    pack = parse_pack()
+
+    if count < 1 or count > STREAM_MAX_COUNT:
+        return jsonify({
+            'error': 'Invalid count parameter',
+            'message': f'Count must be between 1 and {STREAM_MAX_COUNT}'
+        }), 400
+
+    if mode not in ['paragraph', 'sentence', 'word']:
+        return jsonify({
+            'error': 'Invalid mode parameter',
+            'message': 'Mode must be one of: paragraph, sentence, word'
+        }), 400
+
+    if output_format not in ['text', 'ndjson']:
+        return jsonify({
+            'error': 'Invalid format parameter',
+            'message': 'Format must be one of: text, ndjson'
+        }), 400
+
+    if pack is None:
+        return jsonify(invalid_pack_error()), 400
+
+    generator = local_generator(pack, seed)
+
+    if 'length' in request.args:
+        length, unit, error = parse_length(STREAM_MAX_LENGTH)
+        if error:
+            return error
+        logger.debug("API: Streaming exactly %s %s as %s", length, unit, output_format)
+        chunks = generator.iter_length(length, unit)
+        if output_format == 'ndjson':
+            return Response((dumps({'text': chunk}) + b'\n' for chunk in chunks),
+                            mimetype='application/x-ndjson')
+        # No trailing newline, so the body is exactly the requested size
+        return Response(chunks, mimetype='text/plain')
+    if mode == 'paragraph':
+        batches = generator.iter_paragraphs(count)
+    elif mode == 'sentence':
+        batches = generator.iter_sentences(count)
+    else:
+        batches = generator.iter_words(count)
+
+    logger.debug("API: Streaming %s %s units as %s", count, mode, output_format)
+
+    if output_format == 'ndjson':
+        def generate():
+            for batch in batches:
+                yield b''.join([dumps({'text': unit}) + b'\n' for unit in batch])
+        return Response(generate(), mimetype='application/x-ndjson')
+
+    separator = UNIT_SEPARATORS[mode]
+
+    def generate():
+        first = True
+        for batch in batches:
+            chunk = separator.join(batch)
+            yield chunk if first else separator + chunk
+            first = False
+        yield '\n'
+    return Response(generate(), mimetype='text/plain')
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Expose this process's metrics in the Prometheus text format."""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/v1/packs', methods=['GET'])
+def list_vocab_packs():
+    """List the vocabulary packs this process can serve."""
+    packs = []
+    for name in vocab_registry.names():
+        templates = vocab_registry.get(name)
+        packs.append({
+            'name': name,
+            'default': name == vocab_registry.default,
+            'words': len(templates.flat_words),
+            'patterns': len(templates.patterns),
+            'fingerprint': templates.fingerprint,
+            'grammar': templates.grammar,
+        })
+    return jsonify({'packs': packs})
+
+@app.route('/api/v1/gpt/cache', methods=['GET'])
+def gpt_cache_stats():
+    """Report hit/miss statistics for the GPT completion cache."""
+    return jsonify(gpt_cache.stats())
+
 @app.route('/api/v1/twitter/test', methods=['POST'])
 def test_twitter_post():
     """Test endpoint to manually trigger a Twitter post."""
@@ -216,7 +924,7 @@ def trigger_twitter_post():
         }), 503
 
     try:
-        # First generate the text
+        # The thread the bot has prepared, which is what gets posted
         generated_text = twitter_bot.generate_daily_post()
         if not generated_text:
             return jsonify({
@@ -247,5 +955,8 @@ def trigger_twitter_post():
             'message': error_message
         }), 500
 
+# Render the static pages at startup rather than on their first request
+page_cache.warm(['index.html', 'api.html', 'google_sheets.html'])
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
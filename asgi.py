@@ -0,0 +1,221 @@
+"""
+ASGI entry point, with async /generate and /api/v1/generate
+
+    SERVER_MODE=asgi python serve.py
+    uvicorn asgi:app --workers 4
+
+The two generation routes run as coroutines on the server's event loop.
+Template and n-gram text is generated inline in microseconds, and a GPT
+request awaits the shared dispatcher instead of holding a thread, so
+requests waiting on OpenAI don't take capacity from template requests.
+Every other route runs through the Flask app on a pool of THREADS threads.
+"""
+import asyncio
+import io
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import jsonify
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+import metrics
+from app import (TRUSTED_PROXY_HOPS, api_generate_text as api_generate_text_sync, app as flask_app,
+                 gpt_failure_response, gpt_generator, pooled_output, prepare_web_generation,
+                 web_generation_response)
+
+logger = logging.getLogger(__name__)
+
+
+async def generate_text():
+    """/generate, with GPT text awaited rather than waited for on a thread"""
+    try:
+        generation, response = prepare_web_generation()
+        if response is not None:
+            return response
+
+        try:
+            text = None
+            if generation.engine == 'gpt':
+                if generation.seed is None:
+                    _, text = pooled_output('gpt', generation.count, generation.mode, generation.tuning_params)
+                if text is None:
+                    text = await gpt_generator.generate_with_gpt_async(
+                        generation.count, generation.mode, generation.tuning_params)
+            return web_generation_response(generation, generation.engine, text)
+        except ValueError as ve:
+            return gpt_failure_response(generation, ve)
+
+    except ValueError as ve:
+        logger.error(f"Invalid parameter value: {str(ve)}")
+        return jsonify({'error': 'Invalid parameter value'}), 400
+    except Exception as e:
+        logger.error(f"Error generating text: {str(e)}")
+        metrics.record_error('web', e)
+        return jsonify({'error': 'Failed to generate text'}), 500
+
+
+async def api_generate_text():
+    """/api/v1/generate never waits on I/O, so it runs inline on the event loop"""
+    return api_generate_text_sync()
+
+
+ASYNC_ROUTES = {
+    '/generate': generate_text,
+    '/api/v1/generate': api_generate_text,
+}
+
+
+def wsgi_environ(scope, body=None):
+    """Build a WSGI environ for an ASGI request, with body as its input stream"""
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body or io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    server = scope.get('server') or ('localhost', 80)
+    environ['SERVER_NAME'] = server[0]
+    environ['SERVER_PORT'] = str(server[1] or 80)
+    client = scope.get('client')
+    if client:
+        environ['REMOTE_ADDR'] = client[0]
+        environ['REMOTE_PORT'] = str(client[1])
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f"HTTP_{name}"
+        value = value.decode('latin-1')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+# The async views don't go through flask_app.wsgi_app, so this applies its
+# ProxyFix rewrite to their environ and returns it
+trusted_environ = ProxyFix(lambda environ, start_response: environ,
+                           x_for=TRUSTED_PROXY_HOPS, x_proto=TRUSTED_PROXY_HOPS)
+
+
+async def run_async_view(view, scope, send):
+    """Run view in a Flask request context, with the app's before/after request hooks"""
+    with flask_app.request_context(trusted_environ(wsgi_environ(scope), None)):
+        try:
+            rv = flask_app.preprocess_request()
+            if rv is None:
+                rv = await view()
+            response = flask_app.finalize_request(rv)
+        except Exception as e:
+            response = flask_app.finalize_request(flask_app.handle_exception(e), from_error_handler=True)
+        body = b'' if scope['method'] == 'HEAD' else b''.join(response.iter_encoded())
+        headers = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                   for name, value in response.headers.items()]
+        response.close()
+    await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+# Threads for the Flask routes, as in wsgi mode
+wsgi_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('THREADS', 8)), thread_name_prefix='flask')
+
+
+def call_wsgi_app(environ, send, disconnected=None):
+    """Run the Flask app on the current thread, passing each chunk of its response to send.
+
+    Once the disconnected event is set, the response is closed at the next
+    chunk instead of being sent, so a streaming view stops its upstream work.
+    """
+    start = {}
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and 'sent' in start:
+            raise exc_info[1].with_traceback(exc_info[2])
+        start['message'] = {
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+        }
+
+    result = flask_app(environ, start_response)
+    try:
+        for chunk in result:
+            if disconnected is not None and disconnected.is_set():
+                logger.debug("Client disconnected; closing the response")
+                return
+            if not chunk:
+                continue
+            if 'sent' not in start:
+                send(start['message'])
+                start['sent'] = True
+            # Each chunk goes out as it is produced, so SSE streams aren't buffered
+            send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        if 'sent' not in start:
+            send(start['message'])
+        send({'type': 'http.response.body', 'body': b''})
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+
+
+async def run_wsgi_app(scope, receive, send):
+    """Serve a request with the Flask app on wsgi_executor.
+
+    Each request gets its own thread from the pool, so a long response such
+    as an SSE stream only holds up its own thread. The server's disconnect
+    message is watched for while the response runs, since sending to a
+    client that has gone away doesn't fail.
+    """
+    body = io.BytesIO()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+        body.write(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    body.seek(0)
+
+    loop = asyncio.get_running_loop()
+    disconnected = threading.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    def send_from_thread(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        await loop.run_in_executor(wsgi_executor, call_wsgi_app, wsgi_environ(scope, body),
+                                   send_from_thread, disconnected)
+    finally:
+        watcher.cancel()
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    view = ASYNC_ROUTES.get(scope['path']) if scope['type'] == 'http' else None
+    if view is None or scope['method'] not in ('GET', 'HEAD'):
+        return await run_wsgi_app(scope, receive, send)
+    await run_async_view(view, scope, send)
@@ -0,0 +1,163 @@
+"""
+Microbenchmarks for the generation hot paths, with stored baselines.
+
+Usage:
+    python benchmarks/bench_generation.py                  # run and print results
+    python benchmarks/bench_generation.py --save           # record results as the baseline
+    python benchmarks/bench_generation.py --check          # fail if slower than the baseline
+    python benchmarks/bench_generation.py --suite generator --threshold 0.15
+
+Results are median time per call. The baseline is a JSON file keyed by
+benchmark name, with an optional "thresholds" map to override --threshold
+for individual benchmarks. Baselines are machine-specific, so none is
+committed: CI records one with --save on the main branch, on the same runner
+class that runs --check, and keeps it as a build artifact for later runs.
+--check fails when a benchmark has no baseline entry, so a missing or stale
+baseline can't pass silently.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_THRESHOLD = 0.20  # fail when more than 20% slower than the baseline
+
+COUNTS = (1, 10, 100, 1000)
+ROUTE_COUNTS = (1, 10)
+
+
+def generator_benchmarks():
+    """Yield (name, callable) pairs for ButterTextGenerator methods"""
+    from text_generator import ButterTextGenerator
+
+    generator = ButterTextGenerator(seed=1234)
+    yield 'generate_sentence', generator.generate_sentence
+    for count in COUNTS:
+        yield f'generate_words[{count}]', lambda count=count: generator.generate_words(count)
+        yield f'generate_sentences[{count}]', lambda count=count: generator.generate_sentences(count)
+        if count <= 100:
+            yield f'generate_paragraphs[{count}]', lambda count=count: generator.generate_paragraphs(count)
+
+
+def route_benchmarks():
+    """Yield (name, callable) pairs for requests through the Flask test client"""
+    import logging
+
+    os.environ.setdefault('TWITTER_BOT_ENABLED', 'false')
+    from app import app
+
+    # Keep per-request log formatting out of the measurement
+    logging.disable(logging.CRITICAL)
+    client = app.test_client()
+
+    def get(url):
+        def call():
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} returned {response.status_code}")
+        return call
+
+    for mode in ('word', 'sentence', 'paragraph'):
+        for count in ROUTE_COUNTS:
+            yield f'GET /api/v1/generate[{mode},{count}]', get(f'/api/v1/generate?count={count}&mode={mode}')
+            yield f'GET /generate[{mode},{count}]', get(f'/generate?count={count}&mode={mode}')
+
+
+SUITES = {
+    'generator': generator_benchmarks,
+    'routes': route_benchmarks,
+}
+
+
+def measure(func, min_time=0.2, repeat=5):
+    """Return the median seconds per call over several timed runs"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    # Scale the loop so each run lasts at least min_time
+    number = max(1, int(number * min_time / max(timer.timeit(number), 1e-9)))
+    return statistics.median(t / number for t in timer.repeat(repeat=repeat, number=number))
+
+
+def format_time(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.0f} ns"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Butter Ipsum generation hot paths")
+    parser.add_argument('--suite', choices=['all'] + list(SUITES), default='all')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument('--save', action='store_true', help="Write results to the baseline file")
+    parser.add_argument('--check', action='store_true', help="Exit non-zero on regressions")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown as a fraction of the baseline (default 0.20)")
+    parser.add_argument('--filter', default='', help="Only run benchmarks whose name contains this")
+    args = parser.parse_args()
+
+    saved = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            saved = json.load(f)
+    baseline = saved.get('results', {})
+    # Optional per-benchmark overrides for noisy benchmarks
+    thresholds = saved.get('thresholds', {})
+
+    suites = list(SUITES) if args.suite == 'all' else [args.suite]
+    results = {}
+    regressions = []
+    missing = []
+    for suite in suites:
+        for name, func in SUITES[suite]():
+            if args.filter not in name:
+                continue
+            seconds = measure(func)
+            results[name] = seconds
+            line = f"{name:<40} {format_time(seconds)}"
+            if name in baseline:
+                change = seconds / baseline[name] - 1
+                line += f"  {change:+7.1%} vs baseline"
+                limit = thresholds.get(name, args.threshold)
+                if change > limit:
+                    line += "  REGRESSION"
+                    regressions.append(name)
+            else:
+                line += "  (no baseline)"
+                missing.append(name)
+            print(line)
+
+    if args.save:
+        baseline.update(results)
+        saved = {
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'unit': 'seconds per call',
+            'thresholds': thresholds,
+            'results': dict(sorted(baseline.items())),
+        }
+        with open(args.baseline, 'w') as f:
+            json.dump(saved, f, indent=2)
+            f.write('\n')
+        print(f"Saved {len(results)} results to {args.baseline}")
+
+    if args.check and missing and not args.save:
+        print(f"{len(missing)} benchmark(s) have no baseline in {args.baseline}; "
+              f"record one with --save: {', '.join(missing)}")
+    if args.check and regressions:
+        print(f"{len(regressions)} benchmark(s) regressed beyond the threshold: {', '.join(regressions)}")
+    if args.check and (regressions or (missing and not args.save)):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+"""
+End-to-end load test: serve the app against a fake OpenAI API and drive a mix of routes.
+
+Usage:
+    python benchmarks/load_test.py                                  # 32 clients for 30s
+    python benchmarks/load_test.py --concurrency 64 --mix api=5,template=3,gpt=1,static=1
+    python benchmarks/load_test.py --server-mode asgi --openai-latency 2 --openai-429-rate 0.1
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --mix static=1
+    python benchmarks/load_test.py --json results.json
+
+The app is started with serve.py (gunicorn) and pointed at a fake OpenAI
+server from fake_openai.py running in this process, whose latency, 500s and
+429s are set from the command line. With --url an already running server is
+used instead, and only its own OPENAI_BASE_URL decides where GPT requests go.
+
+Each client is a thread with its own keep-alive connection sending requests
+back to back, so --concurrency is the number of requests in flight. Every
+request picks a scenario from --mix by weight. Requests finishing in the
+--warmup period or after --duration aren't counted. A response is an error unless it is a 200;
+latency percentiles cover all responses. The client is plain Python and
+tops out at a few thousand requests per second, so give the server fewer
+cores than the machine has when measuring the fast routes.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_MIX = 'api=4,template=3,gpt=1,static=2'
+STATIC_PATHS = ('/', '/api/docs', '/static/css/style.css', '/static/js/main.js')
+READY_PATH = '/api/v1/packs'
+READY_TIMEOUT = 60
+
+
+def scenario_path(name, rng):
+    """Return the path for one request of the named scenario"""
+    if name == 'api':
+        return f"/api/v1/generate?count={rng.randint(1, 5)}&mode={rng.choice(('word', 'sentence', 'paragraph'))}"
+    if name == 'template':
+        return f"/generate?count={rng.randint(1, 5)}&mode={rng.choice(('sentence', 'paragraph'))}"
+    if name == 'gpt':
+        # Spread requests over tuning combinations so they aren't all coalesced into one call
+        return (f"/generate?engine=gpt&count={rng.randint(1, 3)}&mode=sentence"
+                f"&humor={rng.randint(1, 10)}&poetic={rng.randint(1, 10)}")
+    return rng.choice(STATIC_PATHS)
+
+
+SCENARIOS = ('api', 'template', 'gpt', 'static')
+
+
+def parse_mix(spec):
+    """Parse name=weight pairs into a dict"""
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}; expected one of {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("The mix needs at least one scenario with a positive weight")
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, openai_url):
+    """Start serve.py on a free port; returns (process, base_url, log_path)"""
+    port = free_port()
+    env = dict(os.environ)
+    env.update(SERVER_MODE=args.server_mode, HOST='127.0.0.1', PORT=str(port),
+               OPENAI_API_KEY='fake', OPENAI_BASE_URL=openai_url, TWITTER_BOT_ENABLED='false')
+    if args.workers:
+        env['WEB_CONCURRENCY'] = str(args.workers)
+    # Measure the OpenAI path rather than the per-IP limit and the completion cache,
+    # unless the caller's environment asks for them
+    env.setdefault('GPT_CLIENT_RATE', '0')
+    env.setdefault('GPT_CACHE_SIZE', '0')
+    env.setdefault('LOG_LEVEL', 'WARNING')
+    log = tempfile.NamedTemporaryFile(prefix='butter-load-', suffix='.log', delete=False)
+    process = subprocess.Popen([sys.executable, 'serve.py'], cwd=ROOT, env=env,
+                               stdout=log, stderr=subprocess.STDOUT)
+    return process, f"http://127.0.0.1:{port}", log.name
+
+
+def wait_until_ready(base_url, process=None):
+    """Poll the server until it answers, or raise RuntimeError"""
+    url = urlsplit(base_url)
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection(url.hostname, url.port, timeout=5)
+            conn.request('GET', READY_PATH)
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} not ready after {READY_TIMEOUT}s")
+
+
+def run_client(base_url, mix, seed, start_at, stop_at, results):
+    """Send requests back to back until stop_at, recording (scenario, seconds, status) for
+    each one finishing between start_at and stop_at"""
+    url = urlsplit(base_url)
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=120)
+    while time.perf_counter() < stop_at:
+        name = rng.choices(names, weights)[0]
+        path = scenario_path(name, rng)
+        began = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+            if response.will_close:
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            status = 'failed'
+            conn.close()
+        finished = time.perf_counter()
+        if start_at <= finished <= stop_at:
+            results.append((name, finished - began, status))
+
+
+def summarize(results, duration):
+    """Per-scenario (and total) request counts, throughput, error rate and latency percentiles"""
+    by_scenario = {}
+    for name, seconds, status in results:
+        by_scenario.setdefault(name, []).append((seconds, status))
+    by_scenario['total'] = [(seconds, status) for _, seconds, status in results]
+
+    summary = {}
+    for name, samples in by_scenario.items():
+        latencies = sorted(seconds for seconds, _ in samples)
+        statuses = Counter(str(status) for _, status in samples)
+        errors = sum(count for status, count in statuses.items() if status != '200')
+        if len(latencies) > 1:
+            cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+            p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+        else:
+            p50 = p95 = p99 = latencies[0] if latencies else float('nan')
+        summary[name] = {
+            'requests': len(samples),
+            'throughput': len(samples) / duration,
+            'error_rate': errors / len(samples) if samples else 0.0,
+            'p50_ms': p50 * 1000,
+            'p95_ms': p95 * 1000,
+            'p99_ms': p99 * 1000,
+            'statuses': dict(statuses),
+        }
+    return summary
+
+
+def print_summary(summary):
+    print(f"{'scenario':<10} {'requests':>9} {'req/s':>9} {'errors':>8} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  statuses")
+    for name in [name for name in SCENARIOS if name in summary] + ['total']:
+        row = summary[name]
+        statuses = ' '.join(f"{status}:{count}" for status, count in sorted(row['statuses'].items()))
+        print(f"{name:<10} {row['requests']:>9} {row['throughput']:>9.1f} {row['error_rate']:>8.1%} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}  {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help="Load an already running server instead of starting one")
+    parser.add_argument('--server-mode', choices=['wsgi', 'asgi'], default='wsgi')
+    parser.add_argument('--workers', type=int, help="Server worker processes (default: serve.py's)")
+    parser.add_argument('--concurrency', type=int, default=32, help="Requests in flight")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds measured, after the warmup")
+    parser.add_argument('--warmup', type=float, default=3, help="Seconds of load before measuring")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--openai-latency', type=float, default=0.5, help="Mean fake OpenAI response time")
+    parser.add_argument('--openai-jitter', type=float, default=0.2)
+    parser.add_argument('--openai-error-rate', type=float, default=0.0, help="Fraction answered with 500")
+    parser.add_argument('--openai-429-rate', type=float, default=0.0, help="Fraction answered with 429")
+    parser.add_argument('--json', help="Also write the settings and results to this file")
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    from fake_openai import FakeOpenAIConfig, start_fake_openai
+
+    config = fake_server = process = log_path = None
+    base_url = args.url
+    try:
+        if base_url is None:
+            config = FakeOpenAIConfig(latency=args.openai_latency, jitter=args.openai_jitter,
+                                      error_rate=args.openai_error_rate, rate_limit_rate=args.openai_429_rate,
+                                      seed=args.seed)
+            fake_server, openai_url = start_fake_openai(config)
+            process, base_url, log_path = start_server(args, openai_url)
+        wait_until_ready(base_url, process)
+
+        results = []
+        start_at = time.perf_counter() + args.warmup
+        stop_at = start_at + args.duration
+        clients = [threading.Thread(target=run_client, daemon=True,
+                                    args=(base_url, mix, args.seed * 100_003 + i, start_at, stop_at, results))
+                   for i in range(args.concurrency)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+    except RuntimeError as e:
+        if log_path:
+            print(f"Server log: {log_path}", file=sys.stderr)
+        sys.exit(str(e))
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if fake_server is not None:
+            fake_server.shutdown()
+    if log_path:
+        os.unlink(log_path)
+
+    summary = summarize(results, args.duration)
+    print(f"{args.concurrency} clients for {args.duration:g}s against {args.url or args.server_mode} "
+          f"(mix {args.mix})")
+    print_summary(summary)
+    openai_requests = config.requests if config else None
+    if config:
+        print(f"Fake OpenAI requests: {openai_requests}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'settings': vars(args), 'openai_requests': openai_requests,
+                       'results': summary}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
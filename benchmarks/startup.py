@@ -0,0 +1,67 @@
+"""
+Cold-start benchmark: time to import the app and serve its first request.
+
+Each run starts a fresh interpreter, so module caches from earlier runs don't
+hide import costs. Usage:
+
+    python benchmarks/startup.py [--runs 10] [--path /api/v1/generate?count=3&mode=sentence]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# SDKs that should stay unloaded until a request actually needs them
+HEAVY_MODULES = ('openai', 'httpx', 'tweepy', 'apscheduler', 'pytz')
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+response = client.get({path!r})
+served = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - start) * 1000,
+    'first_response_ms': (served - imported) * 1000,
+    'status': response.status_code,
+    'heavy_modules': [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def run_once(path):
+    """Start a fresh interpreter and return its timing report"""
+    env = dict(os.environ, TWITTER_BOT_ENABLED=os.environ.get('TWITTER_BOT_ENABLED', 'false'))
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE.format(path=path, heavy=HEAVY_MODULES)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default='/api/v1/generate?count=3&mode=sentence')
+    args = parser.parse_args()
+
+    reports = [run_once(args.path) for _ in range(args.runs)]
+    import_ms = [report['import_ms'] for report in reports]
+    first_ms = [report['first_response_ms'] for report in reports]
+
+    print(f"runs:               {args.runs}")
+    print(f"import (median):    {statistics.median(import_ms):.1f} ms")
+    print(f"first response:     {statistics.median(first_ms):.1f} ms (status {reports[-1]['status']})")
+    print(f"total (median):     {statistics.median(a + b for a, b in zip(import_ms, first_ms)):.1f} ms")
+    loaded = reports[-1]['heavy_modules']
+    print(f"heavy SDKs loaded:  {', '.join(loaded) if loaded else 'none'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Bulk export of butter text to files or stdout, generated in parallel shards
+
+    python bulk_export.py --count 5000000 --mode sentence --seed 42 -o sentences.txt
+    python bulk_export.py --count 100000 --mode paragraph --format ndjson | gzip > paragraphs.ndjson.gz
+
+Output is split into fixed-size shards, and each shard's seed is derived
+from the base seed and the shard's position alone. Shards are generated on
+a process pool and written in order, so the same seed produces
+byte-identical output whatever --workers is set to.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool
+
+SEPARATORS = {'paragraph': '\n\n', 'sentence': ' ', 'word': ' '}
+DEFAULT_SHARD_SIZE = {'paragraph': 2_000, 'sentence': 20_000, 'word': 100_000}
+WRITE_BUFFER_SIZE = 8 * 1024 * 1024
+
+
+def shard_seed(seed, index):
+    """Seed for one shard, from the base seed and shard index only"""
+    digest = hashlib.sha256(f"{seed}:{index}".encode()).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+def generate_shard(job):
+    """Generate one shard and return it encoded, ready to write"""
+    from text_generator import ButterTextGenerator
+
+    seed, index, size, mode, output_format, engine, pack = job
+    generator = ButterTextGenerator(seed=shard_seed(seed, index), engine=engine, pack=pack)
+    if generator.engine != engine:
+        raise RuntimeError(f"The {engine} engine is unavailable in this process")
+    units = generator.generate_units(size, mode)
+    if output_format == 'ndjson':
+        text = ''.join([json.dumps({'text': unit}) + '\n' for unit in units])
+    else:
+        text = SEPARATORS[mode].join(units)
+    return text.encode('utf-8')
+
+
+def shard_jobs(count, shard_size, seed, mode, output_format, engine, pack):
+    """Yield one job per shard; the last shard may be short"""
+    for index, start in enumerate(range(0, count, shard_size)):
+        yield seed, index, min(shard_size, count - start), mode, output_format, engine, pack
+
+
+def export(out, count, mode='sentence', seed=None, output_format='text', engine='template',
+           pack=None, workers=None, shard_size=None):
+    """Write count units to the binary file out; returns the number of bytes written"""
+    shard_size = shard_size or DEFAULT_SHARD_SIZE[mode]
+    jobs = shard_jobs(count, shard_size, seed, mode, output_format, engine, pack)
+    separator = b'' if output_format == 'ndjson' else SEPARATORS[mode].encode()
+    workers = workers or os.cpu_count() or 1
+
+    written = 0
+    pool = Pool(workers) if workers > 1 else None
+    try:
+        shards = pool.imap(generate_shard, jobs) if pool else map(generate_shard, jobs)
+        for index, shard in enumerate(shards):
+            if index and separator:
+                out.write(separator)
+                written += len(separator)
+            out.write(shard)
+            written += len(shard)
+        if output_format == 'text' and count:
+            out.write(b'\n')
+            written += 1
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export large amounts of Butter Ipsum text")
+    parser.add_argument('-n', '--count', type=int, required=True, help="Number of units to generate")
+    parser.add_argument('-m', '--mode', choices=['paragraph', 'sentence', 'word'], default='sentence')
+    parser.add_argument('-o', '--output', default='-', help="Output file (default stdout)")
+    parser.add_argument('--format', choices=['text', 'ndjson'], default='text')
+    parser.add_argument('--seed', type=int, help="Base seed; printed to stderr when omitted")
+    parser.add_argument('--engine', choices=['template', 'markov'], default='template')
+    parser.add_argument('--pack', help="Vocabulary pack for the template engine")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help="Worker processes (default: one per CPU)")
+    parser.add_argument('--shard-size', type=int,
+                        help="Units per shard; changing it changes the output for a seed")
+    args = parser.parse_args()
+
+    if args.count < 0:
+        parser.error("--count must not be negative")
+    seed = args.seed
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(63)
+        print(f"Using seed {seed}", file=sys.stderr)
+
+    start = time.perf_counter()
+    if args.output == '-':
+        written = export(sys.stdout.buffer, args.count, args.mode, seed, args.format,
+                         args.engine, args.pack, args.workers, args.shard_size)
+        sys.stdout.buffer.flush()
+    else:
+        with open(args.output, 'wb', buffering=WRITE_BUFFER_SIZE) as out:
+            written = export(out, args.count, args.mode, seed, args.format,
+                             args.engine, args.pack, args.workers, args.shard_size)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {args.count} {args.mode}(s), {written / 1e6:.1f} MB in {elapsed:.1f}s "
+          f"({args.count / max(elapsed, 1e-9):,.0f} units/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
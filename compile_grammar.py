@@ -0,0 +1,286 @@
+"""
+Precompute which words fit each pattern slot of a vocabulary pack, using spaCy
+
+    python -m spacy download en_core_web_sm
+    python compile_grammar.py              # every pack in vocab/
+    python compile_grammar.py butter --min-words 3
+
+Every word is tagged once inside a short carrier sentence, and every
+pattern is parsed once with placeholder words in its slots. From those
+tags each slot gets the indices of the words that fit it: verbs that agree
+with their subject, participles after "is", singular nouns after "a" or
+"each", descriptions that can follow "the", "a" or "an" to match the next
+word. The tables are written to vocab/<pack>.grammar.json.
+
+Serving processes only read that file and sample from the listed words, so
+spaCy is never imported there. Patterns with a slot that fewer than
+--min-words words fit are disabled. Rerun this whenever a pack changes;
+a table compiled from different words or patterns is ignored.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from string import Formatter
+
+from template_engine import SLOT_ALIASES, source_fingerprint
+from vocab_packs import DEFAULT_VOCAB_DIR, find_pack_files, grammar_path
+
+DEFAULT_MODEL = 'en_core_web_sm'
+DEFAULT_MIN_WORDS = 3
+BATCH_SIZE = 256
+
+# Only these components are run; NER, the lemmatizer and the rest are disabled
+PIPELINE_COMPONENTS = ('tok2vec', 'tagger', 'morphologizer', 'attribute_ruler', 'parser')
+
+# Stand-ins used when parsing patterns, one per word category
+PLACEHOLDERS = {
+    'nouns': 'bread',
+    'verbs': 'melts',
+    'adjectives': 'warm',
+    'descriptions': 'with care',
+}
+PARTICIPLE_PLACEHOLDER = 'melted'
+DEFAULT_PLACEHOLDER = 'thing'
+
+# Carrier sentences for tagging words outside any pattern
+NOUN_CARRIER = "I like the {}."
+VERB_CARRIER = "The butter {} slowly."
+PARTICIPLE_CARRIER = "The bread is {} slowly."
+DESCRIPTION_CARRIER = "It is {}."
+
+BE_FORMS = {'is', 'are', 'was', 'were', 'be', 'been', 'being'}
+SINGULAR_DETERMINERS = {'a', 'an', 'each', 'every', 'one', 'another', 'this', 'that'}
+PLURAL_DETERMINERS = {'these', 'those', 'many', 'several', 'both', 'few'}
+PLURAL_PRONOUNS = {'i', 'we', 'you', 'they'}
+# Verb forms that fix the number of their subject
+AGREEMENT = {'is': 'Sing', 'was': 'Sing', 'has': 'Sing', 'does': 'Sing',
+             'are': 'Plur', 'were': 'Plur', 'have': 'Plur', 'do': 'Plur'}
+# A description after "the" or a preposition has to read as a noun phrase
+NOUN_PHRASE_STARTS = {'NOUN', 'PROPN', 'ADJ', 'DET', 'NUM', 'PRON'}
+# Spelling is a poor guide to "a" versus "an" for words starting like these
+CONSONANT_SOUNDS = ('eu', 'uni', 'use', 'usu', 'one', 'once')
+VOWEL_SOUNDS = ('hour', 'honest', 'honor', 'honour', 'heir')
+
+
+def indefinite_article(word):
+    """'a' or 'an' for the word's first sound"""
+    lowered = word.lower()
+    if lowered.startswith(VOWEL_SOUNDS):
+        return 'an'
+    if lowered.startswith(CONSONANT_SOUNDS):
+        return 'a'
+    return 'an' if lowered[:1] in 'aeiou' else 'a'
+
+
+def load_nlp(model):
+    """Load a spaCy pipeline with only the components the tables need"""
+    import spacy
+
+    nlp = spacy.load(model)
+    nlp.select_pipes(enable=[name for name in nlp.pipe_names if name in PIPELINE_COMPONENTS])
+    return nlp
+
+
+def phrase_spans(nlp, carrier, phrases):
+    """Parse each phrase inside the carrier sentence; returns the phrase's span in each"""
+    offset = carrier.index('{}')
+    texts = [carrier.format(phrase) for phrase in phrases]
+    return [doc.char_span(offset, offset + len(phrase), alignment_mode='expand')
+            for phrase, doc in zip(phrases, nlp.pipe(texts, batch_size=BATCH_SIZE))]
+
+
+def tag_words(nlp, words):
+    """Grammatical features for every word, as {category: [features, ...]}"""
+    tags = {}
+    for category, pool in words.items():
+        features = [{'article': indefinite_article(word)} for word in pool]
+        if category == 'nouns':
+            for info, span in zip(features, phrase_spans(nlp, NOUN_CARRIER, pool)):
+                head = span[-1]
+                plural = head.tag_ in ('NNS', 'NNPS') or 'Plur' in head.morph.get('Number')
+                info['number'] = 'Plur' if plural else 'Sing'
+        elif category == 'verbs':
+            finite = phrase_spans(nlp, VERB_CARRIER, pool)
+            participle = phrase_spans(nlp, PARTICIPLE_CARRIER, pool)
+            for info, span, passive in zip(features, finite, participle):
+                info['tag'] = span[0].tag_
+                info['participle'] = passive[0].tag_ == 'VBN'
+                # "melts into", "drizzled over": can't be followed by another preposition
+                info['particle'] = len(span) > 1 and span[-1].pos_ in ('ADP', 'PART')
+        elif category == 'descriptions':
+            for info, span in zip(features, phrase_spans(nlp, DESCRIPTION_CARRIER, pool)):
+                info['pos'] = span[0].pos_
+        tags[category] = features
+    return tags
+
+
+def fill_pattern(pattern):
+    """Fill a pattern's slots with placeholders; returns (text, [(category, start, end), ...])"""
+    text = ''
+    slots = []
+    for literal, field, _, _ in Formatter().parse(pattern):
+        text += literal
+        if field is None:
+            continue
+        category = SLOT_ALIASES.get(field, field)
+        placeholder = PLACEHOLDERS.get(category, DEFAULT_PLACEHOLDER)
+        previous = re.findall(r"[\w'-]+", text)
+        if category == 'verbs' and previous and previous[-1].lower() in BE_FORMS:
+            placeholder = PARTICIPLE_PLACEHOLDER
+        slots.append((category, len(text), len(text) + len(placeholder)))
+        text += placeholder
+    return text, slots
+
+
+def subject_number(token, slot_of):
+    """Number the subject token must have to agree with the verb it depends on"""
+    verb = token.head
+    if verb.i in slot_of:
+        # Verb slots are filled with third-person singular forms
+        return 'Sing'
+    for child in verb.children:
+        if child.dep_ in ('aux', 'auxpass') and child.lower_ in AGREEMENT:
+            return AGREEMENT[child.lower_]
+    if verb.lower_ in AGREEMENT:
+        return AGREEMENT[verb.lower_]
+    return {'VBZ': 'Sing', 'VBP': 'Plur'}.get(verb.tag_)
+
+
+def slot_requirements(doc, spans, categories):
+    """What each slot of a parsed pattern demands of the word put in it"""
+    slot_of = {}
+    for number, span in enumerate(spans):
+        for token in span:
+            slot_of[token.i] = number
+
+    def category_at(i):
+        return categories[slot_of[i]] if i in slot_of else None
+
+    requirements = []
+    for span, category in zip(spans, categories):
+        previous = doc[span.start - 1] if span.start > 0 else None
+        following = doc[span.end] if span.end < len(doc) else None
+        need = {}
+        if previous is not None and previous.lower_ in ('a', 'an') and previous.i not in slot_of:
+            need['article'] = previous.lower_
+
+        if category == 'nouns':
+            # Look past adjectives to the determiner: "each {adj} {nouns}"
+            i = span.start - 1
+            while i >= 0 and (doc[i].pos_ == 'ADJ' or category_at(i) == 'adjectives'):
+                i -= 1
+            if i >= 0 and doc[i].lower_ in SINGULAR_DETERMINERS:
+                need['number'] = 'Sing'
+            elif i >= 0 and doc[i].lower_ in PLURAL_DETERMINERS:
+                need['number'] = 'Plur'
+            elif span.root.dep_ in ('nsubj', 'nsubjpass'):
+                agreement = subject_number(span.root, slot_of)
+                if agreement:
+                    need['number'] = agreement
+        elif category == 'verbs':
+            if previous is not None and previous.lower_ in BE_FORMS:
+                need['participle'] = True
+            else:
+                subjects = [child for child in span.root.children if child.dep_ in ('nsubj', 'nsubjpass')]
+                plural = (subjects and subjects[0].i not in slot_of
+                          and (subjects[0].tag_ in ('NNS', 'NNPS') or subjects[0].lower_ in PLURAL_PRONOUNS))
+                need['tag'] = 'VBP' if plural else 'VBZ'
+            if following is not None and (following.pos_ == 'ADP' or category_at(following.i) == 'descriptions'):
+                need['particle'] = False
+        elif category == 'descriptions':
+            if previous is not None and (previous.pos_ in ('DET', 'ADP', 'ADJ')
+                                         or category_at(previous.i) == 'adjectives'):
+                need['noun_phrase'] = True
+        requirements.append(need)
+    return requirements
+
+
+def fits(info, need):
+    """Whether a word with these features meets a slot's requirements"""
+    if 'article' in need and info['article'] != need['article']:
+        return False
+    if 'number' in need and info.get('number', need['number']) != need['number']:
+        return False
+    if need.get('participle') and not info.get('participle', True):
+        return False
+    if 'tag' in need and info.get('tag', need['tag']) != need['tag']:
+        return False
+    if need.get('particle') is False and info.get('particle'):
+        return False
+    if need.get('noun_phrase') and info.get('pos', 'NOUN') not in NOUN_PHRASE_STARTS:
+        return False
+    return True
+
+
+def compile_pack(nlp, pack, min_words=DEFAULT_MIN_WORDS):
+    """Build the grammar table for a pack; returns (table, [(pattern, reason), ...] disabled)"""
+    words = pack['words']
+    patterns = pack['patterns']
+    tags = tag_words(nlp, words)
+    filled = [fill_pattern(pattern) for pattern in patterns]
+    docs = nlp.pipe([text for text, _ in filled], batch_size=BATCH_SIZE)
+
+    tables = []
+    disabled = []
+    for pattern, (text, slots), doc in zip(patterns, filled, docs):
+        spans = [doc.char_span(start, end, alignment_mode='expand') for _, start, end in slots]
+        categories = [category for category, _, _ in slots]
+        table = []
+        for category, need in zip(categories, slot_requirements(doc, spans, categories)):
+            features = tags[category]
+            allowed = [i for i, info in enumerate(features) if fits(info, need)]
+            if len(allowed) < min(min_words, len(features)):
+                reason = ', '.join(f"{key}={value}" for key, value in need.items())
+                disabled.append((pattern, f"{len(allowed)} {category} fit {{{category}}} ({reason})"))
+                table = None
+                break
+            table.append(None if len(allowed) == len(features) else allowed)
+        tables.append(table)
+
+    return {
+        'pack': pack.get('name'),
+        'source_fingerprint': source_fingerprint(tuple(words), [words[c] for c in words], patterns),
+        'model': f"{nlp.meta.get('name')}-{nlp.meta.get('version')}",
+        'min_words': min_words,
+        'patterns': tables,
+    }, disabled
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile grammatical word/slot tables for vocabulary packs")
+    parser.add_argument('packs', nargs='*', help="Packs to compile (default: all)")
+    parser.add_argument('--vocab-dir', default=os.environ.get('VOCAB_DIR', DEFAULT_VOCAB_DIR))
+    parser.add_argument('--model', default=DEFAULT_MODEL, help="spaCy pipeline to tag with")
+    parser.add_argument('--min-words', type=int, default=DEFAULT_MIN_WORDS,
+                        help="Disable patterns with a slot that fewer words than this fit")
+    args = parser.parse_args()
+
+    files = find_pack_files(args.vocab_dir)
+    unknown = [name for name in args.packs if name not in files]
+    if unknown:
+        parser.error(f"Unknown pack(s): {', '.join(unknown)}")
+    try:
+        nlp = load_nlp(args.model)
+    except ImportError:
+        parser.error("spaCy is not installed")
+    except OSError:
+        parser.error(f"spaCy model {args.model!r} is not installed; run: python -m spacy download {args.model}")
+
+    for name in args.packs or files:
+        with open(files[name], encoding='utf-8') as f:
+            pack = json.load(f)
+        table, disabled = compile_pack(nlp, pack, args.min_words)
+        path = grammar_path(files[name])
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(table, f, indent=1)
+            f.write('\n')
+        enabled = sum(entry is not None for entry in table['patterns'])
+        print(f"{name}: {enabled}/{len(table['patterns'])} patterns enabled, written to {path}", file=sys.stderr)
+        for pattern, reason in disabled:
+            print(f"  disabled {pattern!r}: {reason}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""
+Local stand-in for the OpenAI chat completions API, for exercising the GPT path offline
+
+Run it and point the app at it:
+
+    python fake_openai.py --port 8089 --latency 0.8 --rate-limit-rate 0.2
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=fake python app.py
+
+Responses are butter text from the template engine. Latency, server errors,
+429 rate limits and quota exhaustion can be injected to see how the app
+behaves when OpenAI is slow or failing. Streaming requests get their text
+word by word as server-sent events, --token-interval apart.
+"""
+import argparse
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from butter_words import BUTTER_WORDS, SENTENCE_PATTERNS
+from template_engine import CompiledTemplates
+
+logger = logging.getLogger(__name__)
+
+PROMPT_SHAPE = re.compile(r'Generate (\d+) distinct (\w+)')
+STREAM_PIECE = re.compile(r'\s*\S+')
+
+
+class FakeOpenAIConfig:
+    """Failure and latency settings; may be changed while the server runs"""
+
+    def __init__(self, latency=0.5, jitter=0.2, error_rate=0.0, rate_limit_rate=0.0,
+                 quota_exhausted=False, seed=None, token_interval=0.02):
+        self.latency = latency
+        self.token_interval = token_interval
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.quota_exhausted = quota_exhausted
+        self.rng = random.Random(seed)
+        self.requests = 0
+        # Streams the client hung up on before the end
+        self.abandoned_streams = 0
+        self.lock = threading.Lock()
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    templates = CompiledTemplates(BUTTER_WORDS, SENTENCE_PATTERNS)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_body(self, status, error_type, code, message, headers=None):
+        self.send_json(status, {'error': {'message': message, 'type': error_type, 'code': code}}, headers)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return self.send_error_body(400, 'invalid_request_error', None, "Invalid JSON body")
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            return self.send_error_body(404, 'invalid_request_error', None, f"Unknown path {self.path}")
+
+        config = self.server.config
+        with config.lock:
+            config.requests += 1
+            delay = max(0.0, config.rng.gauss(config.latency, config.jitter))
+            roll = config.rng.random()
+            rng = random.Random(config.rng.getrandbits(64))
+        time.sleep(delay)
+
+        if config.quota_exhausted:
+            return self.send_error_body(429, 'insufficient_quota', 'insufficient_quota',
+                                        "You exceeded your current quota (insufficient_quota)")
+        if roll < config.rate_limit_rate:
+            return self.send_error_body(429, 'requests', 'rate_limit_exceeded',
+                                        "Rate limit reached for requests (rate_limit_exceeded)",
+                                        {'Retry-After': '1'})
+        if roll < config.rate_limit_rate + config.error_rate:
+            return self.send_error_body(500, 'server_error', None, "The server had an error")
+
+        content = self.completion_text(request, rng)
+        prompt_tokens = sum(len(m.get('content', '').split()) for m in request.get('messages', []))
+        completion_tokens = len(content.split())
+        usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+        }
+        if request.get('stream'):
+            return self.send_stream(request, content, usage)
+        self.send_json(200, {
+            'id': f"chatcmpl-{uuid.uuid4().hex}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'gpt-4o-mini'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': usage,
+        })
+
+    def send_stream(self, request, content, usage):
+        """Send the completion as chat.completion.chunk events, one word at a time"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        chunk = {
+            'id': f"chatcmpl-{uuid.uuid4().hex}",
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': request.get('model', 'gpt-4o-mini'),
+        }
+        events = [dict(chunk, choices=[{'index': 0, 'delta': {'role': 'assistant', 'content': piece},
+                                        'finish_reason': None}])
+                  for piece in STREAM_PIECE.findall(content)]
+        events.append(dict(chunk, choices=[{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]))
+        if (request.get('stream_options') or {}).get('include_usage'):
+            events.append(dict(chunk, choices=[], usage=usage))
+        config = self.server.config
+        try:
+            for event in events:
+                self.wfile.write(b'data: ' + json.dumps(event).encode('utf-8') + b'\n\n')
+                self.wfile.flush()
+                time.sleep(config.token_interval)
+            self.wfile.write(b'data: [DONE]\n\n')
+        except (BrokenPipeError, ConnectionResetError):
+            with config.lock:
+                config.abandoned_streams += 1
+            logger.debug("Client abandoned a stream")
+
+    def completion_text(self, request, rng):
+        """Produce text shaped like the prompt asks for"""
+        prompt = ' '.join(m.get('content', '') for m in request.get('messages', []) if m.get('role') == 'user')
+        match = PROMPT_SHAPE.search(prompt)
+        count, mode = (int(match.group(1)), match.group(2)) if match else (1, 'sentence')
+        if mode.startswith('paragraph'):
+            return '\n\n'.join(self.templates.paragraphs(count, rng))
+        if mode.startswith('word'):
+            return '\n'.join(f"{i}. {word}" for i, word in enumerate(self.templates.words(count, rng), 1))
+        return ' '.join(self.templates.sentences(count, rng))
+
+
+def start_fake_openai(config=None, host='127.0.0.1', port=0):
+    """Serve the fake API on a daemon thread; returns (server, base_url)"""
+    server = ThreadingHTTPServer((host, port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.config = config or FakeOpenAIConfig()
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake OpenAI chat completions server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.5, help="Mean response time in seconds")
+    parser.add_argument('--jitter', type=float, default=0.2, help="Standard deviation of response time")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument('--quota-exhausted', action='store_true', help="Answer every request with insufficient_quota")
+    parser.add_argument('--token-interval', type=float, default=0.02,
+                        help="Seconds between words of a streamed response")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    config = FakeOpenAIConfig(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                              rate_limit_rate=args.rate_limit_rate, quota_exhausted=args.quota_exhausted,
+                              seed=args.seed, token_interval=args.token_interval)
+    server = ThreadingHTTPServer((args.host, args.port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.config = config
+    print(f"Fake OpenAI API listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Local stand-in for the tweepy v2 client, for exercising the bot offline
+"""
+import itertools
+import threading
+
+
+class FakeResponse:
+    """Mimics tweepy.Response, which carries the created tweet in ``data``"""
+
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeTwitterClient:
+    """Records tweets instead of posting them.
+
+    Pass an instance as ``client`` to ButterTwitterBot or create_twitter_bot.
+    Posted tweets are appended to ``tweets`` as dicts with id, text and
+    in_reply_to_tweet_id. Set ``fail_after`` to make every call after that
+    many tweets raise ``error`` (a tweepy exception, for example).
+    """
+
+    def __init__(self, fail_after=None, error=None):
+        self.tweets = []
+        self.fail_after = fail_after
+        self.error = error or RuntimeError("Fake Twitter API failure")
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def create_tweet(self, text, in_reply_to_tweet_id=None, **kwargs):
+        with self._lock:
+            if self.fail_after is not None and len(self.tweets) >= self.fail_after:
+                raise self.error
+            tweet = {
+                'id': str(next(self._ids)),
+                'text': text,
+                'in_reply_to_tweet_id': in_reply_to_tweet_id,
+            }
+            self.tweets.append(tweet)
+            return FakeResponse({'id': tweet['id'], 'text': text})
+
+    def threads(self):
+        """Return posted tweets grouped into threads, oldest first"""
+        threads = []
+        by_id = {}
+        for tweet in self.tweets:
+            parent = by_id.get(tweet['in_reply_to_tweet_id'])
+            thread = parent if parent is not None else []
+            if parent is None:
+                threads.append(thread)
+            thread.append(tweet['text'])
+            by_id[tweet['id']] = thread
+        return threads
@@ -0,0 +1,220 @@
+"""
+Fake database records built from butter text, streamed as CSV, Postgres COPY or SQLite inserts
+
+Describe columns as name:kind[:count], where kind is serial, word, title,
+sentence or paragraph:
+
+    python fixtures.py --rows 1000000 --table posts \\
+        --column id:serial --column title:title:5 --column summary:sentence:2 \\
+        --column body:paragraph:3 --format copy | psql mydb
+
+or take the columns from a SQLAlchemy (or Flask-SQLAlchemy) model:
+
+    python fixtures.py --rows 50000 --model myapp.models:Post --format sqlite -o fixtures.db
+
+Rows are generated and written in fixed-size batches, so memory use does
+not grow with --rows.
+"""
+import argparse
+import csv
+import importlib
+import sqlite3
+import sys
+import time
+
+KINDS = ('serial', 'word', 'title', 'sentence', 'paragraph')
+DEFAULT_COUNTS = {'word': 3, 'title': 3, 'sentence': 2, 'paragraph': 2}
+BATCH_SIZE = 5_000
+
+# Column-name hints used when mapping a model's text columns to a kind
+NAME_HINTS = (
+    (('title', 'name', 'headline', 'subject', 'label', 'slug'), 'title'),
+    (('summary', 'description', 'excerpt', 'caption', 'comment', 'bio'), 'sentence'),
+    (('body', 'content', 'text', 'article', 'notes'), 'paragraph'),
+)
+
+
+class Column:
+    """One generated column: a kind, how many units per value, and an optional length limit"""
+
+    def __init__(self, name, kind, count=None, max_length=None):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown column kind {kind!r}; expected one of {', '.join(KINDS)}")
+        if count is not None and count < 1:
+            raise ValueError(f"Column {name!r} count must be positive, not {count}")
+        self.name = name
+        self.kind = kind
+        self.count = count or DEFAULT_COUNTS.get(kind, 1)
+        self.max_length = max_length
+
+    @classmethod
+    def parse(cls, spec):
+        """Parse name:kind[:count]"""
+        parts = spec.split(':')
+        if len(parts) not in (2, 3) or not parts[0]:
+            raise ValueError(f"Invalid column spec {spec!r}; expected name:kind[:count]")
+        count = None
+        if len(parts) == 3:
+            try:
+                count = int(parts[2])
+            except ValueError:
+                raise ValueError(f"Invalid column spec {spec!r}; count must be an integer") from None
+        return cls(parts[0], parts[1], count)
+
+
+def columns_from_model(model):
+    """Build columns from a SQLAlchemy model class or Table.
+
+    Integer primary keys become serials; string and text columns get a kind
+    from their name (titles, summaries, bodies), falling back to sentences
+    for Text and words for String, and are cut to the column's length.
+    Other columns are left to their database defaults.
+    """
+    from sqlalchemy import Integer, String, Text
+
+    table = getattr(model, '__table__', model)
+    columns = []
+    for column in table.columns:
+        if column.primary_key and isinstance(column.type, Integer):
+            columns.append(Column(column.name, 'serial'))
+        elif isinstance(column.type, String):
+            kind = None
+            lowered = column.name.lower()
+            for hints, hinted_kind in NAME_HINTS:
+                if any(hint in lowered for hint in hints):
+                    kind = hinted_kind
+                    break
+            if kind is None:
+                kind = 'sentence' if isinstance(column.type, Text) else 'word'
+            length = getattr(column.type, 'length', None)
+            if length and kind in ('sentence', 'paragraph') and length < 500:
+                kind = 'title' if length < 100 else 'sentence'
+            columns.append(Column(column.name, kind, max_length=length))
+        elif not column.nullable and column.default is None and column.server_default is None:
+            raise ValueError(f"Column {column.name!r} ({column.type}) is required but can't be generated")
+    return table.name, columns
+
+
+def load_model(path):
+    """Import module:attribute"""
+    module_name, _, attribute = path.partition(':')
+    if not attribute:
+        raise ValueError(f"Model must be given as module:ClassName, not {path!r}")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def column_values(generator, column, rows, first_id):
+    """Generate one column's values for a batch of rows"""
+    if column.kind == 'serial':
+        return range(first_id, first_id + rows)
+    mode = 'word' if column.kind == 'title' else column.kind
+    # One batched draw per column per batch, then sliced into rows
+    units = generator.generate_units(rows * column.count, mode)
+    separator = '\n\n' if mode == 'paragraph' else ' '
+    values = [separator.join(units[i:i + column.count]) for i in range(0, len(units), column.count)]
+    if column.kind == 'title':
+        values = [value.title() for value in values]
+    if column.max_length:
+        values = [value[:column.max_length].rstrip() for value in values]
+    return values
+
+
+def iter_batches(columns, rows, seed=None, pack=None, batch_size=BATCH_SIZE):
+    """Yield lists of row tuples, batch_size rows at a time"""
+    from text_generator import ButterTextGenerator
+
+    generator = ButterTextGenerator(seed=seed, pack=pack)
+    for start in range(0, rows, batch_size):
+        size = min(batch_size, rows - start)
+        yield list(zip(*[column_values(generator, column, size, start + 1) for column in columns]))
+
+
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def write_copy(out, table, columns, batches):
+    """Write a psql script that bulk-loads the rows with COPY ... FROM stdin"""
+    names = ', '.join(column.name for column in columns)
+    out.write(f"COPY {table} ({names}) FROM stdin;\n")
+    for batch in batches:
+        out.write(''.join([
+            '\t'.join([str(value).translate(COPY_ESCAPES) for value in row]) + '\n'
+            for row in batch
+        ]))
+    out.write("\\.\n")
+
+
+def write_csv(out, columns, batches):
+    """Write rows as CSV with a header line"""
+    writer = csv.writer(out)
+    writer.writerow([column.name for column in columns])
+    for batch in batches:
+        writer.writerows(batch)
+
+
+def load_sqlite(path, table, columns, batches):
+    """Insert rows into table in a SQLite database, creating the table if needed"""
+    connection = sqlite3.connect(path)
+    try:
+        # Durability doesn't matter for throwaway fixtures; skip the journal and fsyncs
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        definitions = ', '.join(
+            f'"{column.name}" INTEGER PRIMARY KEY' if column.kind == 'serial' else f'"{column.name}" TEXT'
+            for column in columns)
+        connection.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({definitions})')
+        placeholders = ', '.join('?' for _ in columns)
+        names = ', '.join(f'"{column.name}"' for column in columns)
+        insert = f'INSERT INTO "{table}" ({names}) VALUES ({placeholders})'
+        with connection:
+            for batch in batches:
+                connection.executemany(insert, batch)
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate fake records from Butter Ipsum text")
+    parser.add_argument('--rows', type=int, required=True, help="Number of records")
+    parser.add_argument('--column', action='append', default=[], metavar='NAME:KIND[:COUNT]',
+                        help=f"Column to generate; kind is one of {', '.join(KINDS)}")
+    parser.add_argument('--model', help="SQLAlchemy model to take the table and columns from (module:ClassName)")
+    parser.add_argument('--table', help="Table name (default: the model's table, or 'records')")
+    parser.add_argument('--format', choices=['copy', 'csv', 'sqlite'], default='csv')
+    parser.add_argument('-o', '--output', default='-', help="Output file, or the database for --format sqlite")
+    parser.add_argument('--seed', type=int, help="Seed for reproducible records")
+    parser.add_argument('--pack', help="Vocabulary pack")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    try:
+        if args.model:
+            table, columns = columns_from_model(load_model(args.model))
+        else:
+            table, columns = 'records', [Column.parse(spec) for spec in args.column]
+    except (ImportError, AttributeError, ValueError) as e:
+        parser.error(str(e))
+    if not columns:
+        parser.error("Give at least one --column, or --model")
+    table = args.table or table
+
+    start = time.perf_counter()
+    batches = iter_batches(columns, args.rows, args.seed, args.pack, args.batch_size)
+    if args.format == 'sqlite':
+        if args.output == '-':
+            parser.error("--format sqlite needs -o/--output set to a database file")
+        load_sqlite(args.output, table, columns, batches)
+    elif args.output == '-':
+        (write_copy(sys.stdout, table, columns, batches) if args.format == 'copy'
+         else write_csv(sys.stdout, columns, batches))
+    else:
+        with open(args.output, 'w', encoding='utf-8', newline='', buffering=8 * 1024 * 1024) as out:
+            (write_copy(out, table, columns, batches) if args.format == 'copy'
+             else write_csv(out, columns, batches))
+    elapsed = time.perf_counter() - start
+    print(f"Generated {args.rows} {table} rows in {elapsed:.1f}s "
+          f"({args.rows / max(elapsed, 1e-9):,.0f} rows/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
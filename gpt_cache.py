@@ -0,0 +1,105 @@
+"""
+Bounded LRU + TTL cache for GPT completions
+"""
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import gpt_cache_hits, gpt_cache_misses
+
+logger = logging.getLogger(__name__)
+
+
+class GPTCompletionCache:
+    """Cache GPT completions keyed by tuning parameters, mode and count.
+
+    Each key holds up to ``variants`` distinct completions. Until a key has
+    that many, lookups miss so the caller fetches (and stores) another
+    variant; after that, lookups return one of the stored variants at random
+    so repeated requests still look fresh. Entries expire ``ttl`` seconds
+    after they were stored, and the least recently used key is evicted once
+    more than ``maxsize`` keys are held.
+    """
+
+    def __init__(self, maxsize=256, ttl=3600, variants=3, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.variants = max(1, variants)
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(tuning_params, mode, count, model):
+        """Build a cache key from normalized tuning parameters and request shape"""
+        tuning = tuple(sorted((name, int(value)) for name, value in tuning_params.items()))
+        return (tuning, mode, int(count), model)
+
+    def get(self, key):
+        """Return a cached completion for key, or None on a miss"""
+        now = self._clock()
+        with self._lock:
+            variants = self._entries.get(key)
+            if variants is not None:
+                variants[:] = [(text, expires) for text, expires in variants if expires > now]
+                if not variants:
+                    del self._entries[key]
+                    variants = None
+            if variants is None or len(variants) < self.variants:
+                self.misses += 1
+                gpt_cache_misses.inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            gpt_cache_hits.inc()
+            return random.choice(variants)[0]
+
+    def put(self, key, text):
+        """Store a completion as another variant for key"""
+        expires = self._clock() + self.ttl
+        with self._lock:
+            variants = self._entries.setdefault(key, [])
+            # Coalesced requests all store the same completion; keep one copy
+            variants[:] = [(cached, cached_expires) for cached, cached_expires in variants if cached != text]
+            variants.append((text, expires))
+            # Keep only the newest variants for this key
+            del variants[:-self.variants]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all cached completions"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'keys': len(self._entries),
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+def create_gpt_cache():
+    """Create the process-wide GPT cache from environment settings"""
+    maxsize = int(os.environ.get('GPT_CACHE_SIZE', 256))
+    ttl = float(os.environ.get('GPT_CACHE_TTL', 3600))
+    variants = int(os.environ.get('GPT_CACHE_VARIANTS', 3))
+    logger.debug(f"GPT cache: size={maxsize}, ttl={ttl}s, variants={variants}")
+    return GPTCompletionCache(maxsize=maxsize, ttl=ttl, variants=variants)
+
+
+gpt_cache = create_gpt_cache()
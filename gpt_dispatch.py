@@ -0,0 +1,301 @@
+"""
+Asynchronous OpenAI dispatcher with request coalescing, deadlines and admission control
+"""
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+
+from admission import CircuitOpenError, QueueFullError, create_circuit_breaker
+from metrics import gpt_rejections, openai_request_duration, openai_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class GPTDispatcher:
+    """Run OpenAI chat completions on a shared asyncio loop.
+
+    Worker threads submit requests with ``complete`` and block only until
+    their own deadline. At most ``max_concurrency`` upstream calls run at
+    once, and at most ``max_queue`` more may wait for a slot; beyond that,
+    requests are rejected immediately with QueueFullError. Identical
+    in-flight requests (same model, prompts and sampling settings) share a
+    single upstream call. An upstream call is cancelled once every request
+    waiting on it has given up. While ``breaker`` is open, requests fail
+    fast with CircuitOpenError instead of waiting on a failing upstream.
+
+    ``stream`` yields a completion's text as it arrives instead. Streams
+    are admitted the same way but never coalesced.
+    """
+
+    def __init__(self, max_concurrency=8, timeout=30.0, max_queue=32, breaker=None):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_queue = max_queue
+        self.breaker = breaker
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._loop = None
+        self._client = None
+        self._semaphore = None
+        self._inflight = {}  # key -> [task, waiter count]; only touched on the loop thread
+        self._start_lock = threading.Lock()
+
+    @staticmethod
+    def available():
+        """Return True if an OpenAI API key is configured"""
+        return bool(os.environ.get("OPENAI_API_KEY"))
+
+    def _ensure_loop(self):
+        """Start the background event loop thread on first use"""
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="gpt-dispatch", daemon=True)
+                thread.start()
+                self._loop = loop
+                logger.debug("Started GPT dispatch event loop")
+        return self._loop
+
+    def _get_client(self):
+        """Return the shared AsyncOpenAI client; called on the loop thread"""
+        if self._client is None:
+            api_key = os.environ.get("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OpenAI API key not found in environment variables")
+            # Imported here so processes that never call GPT don't pay for the SDK
+            import httpx
+            from openai import AsyncOpenAI
+            http_client = httpx.AsyncClient(limits=httpx.Limits(
+                max_connections=int(os.environ.get("OPENAI_MAX_CONNECTIONS", 20)),
+                max_keepalive_connections=int(os.environ.get("OPENAI_MAX_KEEPALIVE", 20)),
+                keepalive_expiry=float(os.environ.get("OPENAI_KEEPALIVE_EXPIRY", 120)),
+            ))
+            # OPENAI_BASE_URL, if set, is honoured by the SDK (e.g. to use fake_openai.py)
+            # OPENAI_MAX_RETRIES bounds the SDK's own retries so the breaker sees failures promptly
+            self._client = AsyncOpenAI(api_key=api_key, http_client=http_client,
+                                       max_retries=int(os.environ.get("OPENAI_MAX_RETRIES", 2)))
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            logger.info("OpenAI client initialized successfully")
+        return self._client
+
+    async def _call_upstream(self, request):
+        """Make one OpenAI call once a concurrency slot is free"""
+        client = self._get_client()
+        async with self._semaphore:
+            start = time.perf_counter()
+            outcome = 'error'
+            try:
+                response = await client.chat.completions.create(**request)
+                outcome = 'success'
+            except asyncio.CancelledError:
+                outcome = 'cancelled'
+                raise
+            finally:
+                openai_request_duration.observe(time.perf_counter() - start, outcome)
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            openai_tokens.inc('prompt', amount=usage.prompt_tokens or 0)
+            openai_tokens.inc('completion', amount=usage.completion_tokens or 0)
+        return response.choices[0].message.content
+
+    async def _dispatch(self, key, request, timeout):
+        """Join or start the upstream call for key and wait up to timeout"""
+        entry = self._inflight.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(self._call_upstream(request))
+            entry = [task, 0]
+            self._inflight[key] = entry
+            task.add_done_callback(lambda _: self._forget(key, entry))
+        else:
+            logger.debug("Joining in-flight GPT request")
+        task = entry[0]
+        entry[1] += 1
+        try:
+            # Shield the shared task so one waiter's deadline doesn't cancel it for the rest
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not task.done():
+                # Forget the call before cancelling it, so a request for the same key
+                # arriving before the cancellation lands starts a new call
+                self._forget(key, entry)
+                task.cancel()
+
+    def _forget(self, key, entry):
+        """Drop entry from the in-flight map unless a newer call for key has replaced it"""
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
+
+    async def _stream_upstream(self, request, put):
+        """Make one streaming OpenAI call, passing text deltas to put and None at the end"""
+        try:
+            client = self._get_client()
+            async with self._semaphore:
+                start = time.perf_counter()
+                outcome = 'error'
+                try:
+                    stream = await client.chat.completions.create(**request)
+                    # Leaving the block closes the HTTP response, which is how a
+                    # cancelled stream stops the upstream generating
+                    async with stream:
+                        async for chunk in stream:
+                            if chunk.usage is not None:
+                                openai_tokens.inc('prompt', amount=chunk.usage.prompt_tokens or 0)
+                                openai_tokens.inc('completion', amount=chunk.usage.completion_tokens or 0)
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                put(chunk.choices[0].delta.content)
+                    outcome = 'success'
+                except asyncio.CancelledError:
+                    outcome = 'cancelled'
+                    raise
+                finally:
+                    openai_request_duration.observe(time.perf_counter() - start, outcome)
+        finally:
+            put(None)
+
+    def _admit(self):
+        """Reserve a place for one request, or raise if it should fail fast"""
+        # Check the queue first, so a rejected request never takes the breaker's trial
+        with self._pending_lock:
+            if self._pending >= self.max_concurrency + self.max_queue:
+                gpt_rejections.inc('queue_full')
+                raise QueueFullError(f"{self._pending} GPT requests already pending")
+            self._pending += 1
+        if self.breaker is not None and not self.breaker.allow():
+            with self._pending_lock:
+                self._pending -= 1
+            gpt_rejections.inc('circuit_open')
+            raise CircuitOpenError(self.breaker.retry_after())
+
+    def _abandon(self):
+        """A request ended without an outcome (cancelled or closed early); free the breaker's trial"""
+        if self.breaker is not None:
+            self.breaker.release_trial()
+
+    def complete(self, model, messages, max_tokens, temperature, timeout=None):
+        """Return completion text, raising TimeoutError past the deadline"""
+        self._admit()
+        try:
+            text = self._complete(model, messages, max_tokens, temperature, timeout)
+        except Exception as e:
+            if self.breaker is not None:
+                self.breaker.record_failure(e)
+            raise
+        except BaseException:
+            self._abandon()
+            raise
+        finally:
+            with self._pending_lock:
+                self._pending -= 1
+        if self.breaker is not None:
+            self.breaker.record_success()
+        return text
+
+    def stream(self, model, messages, max_tokens, temperature, timeout=None):
+        """Yield completion text as it arrives.
+
+        Raises TimeoutError if no text arrives for timeout seconds. Closing
+        the generator early, as WSGI servers do when the client disconnects,
+        cancels the upstream call.
+        """
+        self._admit()
+        timeout = self.timeout if timeout is None else timeout
+        request = {
+            'model': model,
+            'messages': messages,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'timeout': timeout,
+            'stream': True,
+            'stream_options': {'include_usage': True},
+        }
+        deltas = queue.SimpleQueue()
+        future = asyncio.run_coroutine_threadsafe(self._stream_upstream(request, deltas.put), self._ensure_loop())
+        try:
+            while True:
+                try:
+                    text = deltas.get(timeout=timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"GPT stream sent nothing for {timeout:g}s")
+                if text is None:
+                    break
+                yield text
+            # Re-raise whatever ended the upstream call early
+            future.result()
+        except Exception as e:
+            if self.breaker is not None:
+                self.breaker.record_failure(e)
+            raise
+        except BaseException:
+            # GeneratorExit when the client disconnects
+            self._abandon()
+            raise
+        else:
+            if self.breaker is not None:
+                self.breaker.record_success()
+        finally:
+            future.cancel()
+            with self._pending_lock:
+                self._pending -= 1
+
+    async def complete_async(self, model, messages, max_tokens, temperature, timeout=None):
+        """Awaitable complete() for callers running their own event loop, such as an ASGI server"""
+        self._admit()
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            try:
+                text = await asyncio.wrap_future(self._submit(model, messages, max_tokens, temperature, timeout))
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"GPT request exceeded its {timeout:g}s deadline")
+        except Exception as e:
+            if self.breaker is not None:
+                self.breaker.record_failure(e)
+            raise
+        except BaseException:
+            # CancelledError when the ASGI request is dropped
+            self._abandon()
+            raise
+        finally:
+            with self._pending_lock:
+                self._pending -= 1
+        if self.breaker is not None:
+            self.breaker.record_success()
+        return text
+
+    def _complete(self, model, messages, max_tokens, temperature, timeout):
+        timeout = self.timeout if timeout is None else timeout
+        future = self._submit(model, messages, max_tokens, temperature, timeout)
+        try:
+            return future.result()
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"GPT request exceeded its {timeout:g}s deadline")
+
+    def _submit(self, model, messages, max_tokens, temperature, timeout):
+        """Start or join the upstream call on the dispatcher loop; returns a concurrent future"""
+        request = {
+            'model': model,
+            'messages': messages,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'timeout': timeout,
+        }
+        key = (model, tuple((m['role'], m['content']) for m in messages), max_tokens, temperature)
+        return asyncio.run_coroutine_threadsafe(self._dispatch(key, request, timeout), self._ensure_loop())
+
+
+def create_gpt_dispatcher():
+    """Create the process-wide dispatcher from environment settings"""
+    return GPTDispatcher(
+        max_concurrency=int(os.environ.get("GPT_MAX_CONCURRENCY", 8)),
+        timeout=float(os.environ.get("GPT_TIMEOUT", 30)),
+        max_queue=int(os.environ.get("GPT_MAX_QUEUE", 32)),
+        breaker=create_circuit_breaker(),
+    )
+
+
+gpt_dispatcher = create_gpt_dispatcher()
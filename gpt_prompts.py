@@ -41,3 +41,11 @@ def create_user_prompt(count, mode):
            "- Focus on different aspects of butter (taste, cooking, history, etc.)\n" + \
            "- Vary in length and structure\n" + \
            "- Be suitable for use as placeholder text"
+
+# Completion budget: generous per-unit token estimates plus room for list markers
+TOKENS_PER_UNIT = {"word": 8, "sentence": 60, "paragraph": 300}
+TOKEN_OVERHEAD = 40
+
+def completion_token_budget(count, mode):
+    """Return max_tokens for count units of mode, so the budget grows with the request"""
+    return TOKEN_OVERHEAD + count * TOKENS_PER_UNIT.get(mode.rstrip('s'), TOKENS_PER_UNIT["paragraph"])
@@ -0,0 +1,213 @@
+"""
+Leader election so singleton jobs run in exactly one process
+"""
+import logging
+import os
+import tempfile
+import threading
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+class FileLeaderLock:
+    """Leader lock backed by an exclusive flock on a local file.
+
+    Covers every worker process on one host. The OS releases the lock when
+    the holding process exits, so a replacement worker can take over.
+    """
+
+    def __init__(self, name, lock_dir=None):
+        lock_dir = lock_dir or os.environ.get('LEADER_LOCK_DIR') or tempfile.gettempdir()
+        self.path = os.path.join(lock_dir, f"butter-ipsum-{name}.lock")
+        self._file = None
+
+    def acquire(self):
+        """Try to become leader without blocking; return True on success"""
+        import fcntl
+
+        if self._file is not None:
+            return True
+        lock_file = open(self.path, 'a+')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._file = lock_file
+        return True
+
+    def release(self):
+        """Give up leadership"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def is_held(self):
+        """Return True while this process holds the lock; a flock lasts as long as the file is open"""
+        return self._file is not None
+
+
+class PostgresLeaderLock:
+    """Leader lock backed by a Postgres session-level advisory lock.
+
+    Covers every process and instance that shares the database. The lock is
+    held for as long as this connection stays open, and Postgres releases it
+    if the holder dies. If the connection drops, the server releases the
+    lock too, so is_held asks the server before trusting it.
+    """
+
+    def __init__(self, name, database_url):
+        self.database_url = database_url
+        self.key = zlib.crc32(f"butter-ipsum:{name}".encode())
+        self._connection = None
+
+    def acquire(self):
+        """Try to become leader without blocking; return True on success"""
+        import psycopg2
+
+        if self._connection is not None:
+            return True
+        # Keepalives let a dead connection be noticed instead of hanging the check
+        connection = psycopg2.connect(self.database_url, connect_timeout=10, keepalives=1,
+                                      keepalives_idle=30, keepalives_interval=10, keepalives_count=3)
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (self.key,))
+            acquired = cursor.fetchone()[0]
+        if not acquired:
+            connection.close()
+            return False
+        self._connection = connection
+        return True
+
+    def release(self):
+        """Give up leadership"""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def is_held(self):
+        """Return True if the server confirms this session still holds the lock.
+
+        A failed check releases the connection, so the next acquire starts over.
+        """
+        if self._connection is None:
+            return False
+        try:
+            with self._connection.cursor() as cursor:
+                # A single bigint key is stored with its low 32 bits in objid and objsubid 1
+                cursor.execute(
+                    "SELECT 1 FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid()"
+                    " AND objid::bigint = %s AND objsubid = 1 AND granted",
+                    (self.key,))
+                held = cursor.fetchone() is not None
+        except Exception as e:
+            logger.error(f"Leader lock check failed: {str(e)}")
+            held = False
+        if not held:
+            self.release()
+        return held
+
+
+def create_leader_lock(name):
+    """Use Postgres when DATABASE_URL points at it, otherwise a local file lock"""
+    database_url = os.environ.get('DATABASE_URL', '')
+    if database_url.startswith(('postgres://', 'postgresql://')):
+        return PostgresLeaderLock(name, database_url)
+    return FileLeaderLock(name)
+
+
+class LeaderElection:
+    """Hold lock while it can be held, calling on_elected and on_lost as leadership changes.
+
+    A process that isn't leader retries every retry_interval seconds, so a
+    new leader is chosen when the current one exits. The leader checks the
+    lock every check_interval seconds, and callers should also call check()
+    before acting as leader. If the lock has been lost, for example because
+    the Postgres session dropped, on_lost is called and the election resumes.
+    """
+
+    def __init__(self, lock, on_elected, on_lost=None, retry_interval=None, check_interval=None):
+        if retry_interval is None:
+            retry_interval = float(os.environ.get('LEADER_RETRY_SECONDS', 60))
+        if check_interval is None:
+            check_interval = float(os.environ.get('LEADER_CHECK_SECONDS', 30))
+        self.lock = lock
+        self.on_elected = on_elected
+        self.on_lost = on_lost
+        self.retry_interval = retry_interval
+        self.check_interval = check_interval
+        self.is_leader = False
+        self._state_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _try_acquire(self):
+        try:
+            return self.lock.acquire()
+        except Exception as e:
+            logger.error(f"Leader election failed: {str(e)}")
+            return False
+
+    def _elect(self, message):
+        with self._state_lock:
+            if self.is_leader or not self._try_acquire():
+                return False
+            self.is_leader = True
+        logger.info(f"{message} (pid {os.getpid()})")
+        self.on_elected()
+        return True
+
+    def check(self):
+        """Return True if this process is still leader, stepping down if the lock was lost"""
+        with self._state_lock:
+            if not self.is_leader:
+                return False
+            if self.lock.is_held():
+                return True
+            self.is_leader = False
+        logger.warning(f"Lost the leader lock; pid {os.getpid()} is stepping down")
+        if self.on_lost is not None:
+            self.on_lost()
+        return False
+
+    def start(self):
+        """Run the first election and start the background thread; return True if elected"""
+        if not self._elect("Elected leader"):
+            if self.retry_interval > 0:
+                logger.info(f"Another process is leader; pid {os.getpid()} will retry every {self.retry_interval:g}s")
+            else:
+                logger.info("Another process is leader")
+        if self.retry_interval > 0 or self.check_interval > 0:
+            self._thread = threading.Thread(target=self._run, name="leader-election", daemon=True)
+            self._thread.start()
+        return self.is_leader
+
+    def _run(self):
+        while True:
+            interval = self.check_interval if self.is_leader else self.retry_interval
+            if self._stopped.wait(interval if interval > 0 else None):
+                return
+            if self.is_leader:
+                self.check()
+            else:
+                self._elect("Took over as leader")
+
+    def stop(self):
+        """Stop the background thread and give up leadership"""
+        self._stopped.set()
+        with self._state_lock:
+            self.is_leader = False
+            self.lock.release()
+
+
+def elect_leader(lock, on_elected, on_lost=None, retry_interval=None, check_interval=None):
+    """Start a LeaderElection for lock and return it; its is_leader says whether this process won"""
+    election = LeaderElection(lock, on_elected, on_lost, retry_interval, check_interval)
+    election.start()
+    return election
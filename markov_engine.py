@@ -0,0 +1,264 @@
+"""
+Array-backed n-gram (Markov) text engine with a memory-mappable model file
+
+Train a model from any plain-text corpus (saved GPT outputs work well):
+
+    python markov_engine.py train corpus.txt [more.txt ...] -o models/butter.ngram
+
+The model file holds sorted context keys, per-context offsets, successor ids
+and cumulative successor counts as flat little-endian arrays. Loading it
+memory-maps the file, so every worker shares the same pages and startup
+does not depend on model size.
+"""
+import argparse
+import bisect
+import hashlib
+import logging
+import mmap
+import os
+import random
+import re
+import struct
+import sys
+import threading
+from array import array
+from collections import Counter, defaultdict
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'BUTRNGM1'
+# order, vocab size, states, transitions, vocab byte length, then a 16-byte fingerprint
+HEADER = struct.Struct('<8sIIIII16s')
+HEADER_SIZE = 64  # header padded so the arrays after it stay 8-byte aligned
+
+# Resolved against this file, so the default works from any working directory
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'butter.ngram')
+
+BOS = 0  # sentence start marker
+EOS = 1  # sentence end marker
+RESERVED_TOKENS = ['<s>', '</s>']
+
+MAX_SENTENCE_TOKENS = 48
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+
+
+def tokenize_sentences(text):
+    """Split text into sentences of whitespace-separated tokens"""
+    for line in text.splitlines():
+        line = line.strip().lstrip('-*0123456789. ').strip()
+        for sentence in SENTENCE_SPLIT.split(line):
+            tokens = sentence.split()
+            if len(tokens) >= 3:
+                yield tokens
+
+
+def train(texts, order=2):
+    """Count n-gram transitions over texts and return the encoded model bytes"""
+    if order < 1 or order > 2:
+        raise ValueError("Only order 1 and 2 models are supported")
+    vocab = list(RESERVED_TOKENS)
+    ids = {token: i for i, token in enumerate(vocab)}
+    transitions = defaultdict(Counter)
+
+    for text in texts:
+        for tokens in tokenize_sentences(text):
+            encoded = []
+            for token in tokens:
+                token_id = ids.get(token)
+                if token_id is None:
+                    token_id = ids[token] = len(vocab)
+                    vocab.append(token)
+                encoded.append(token_id)
+            history = [BOS] * order + encoded + [EOS]
+            for i in range(order, len(history)):
+                context = history[i - order:i]
+                key = context[-1] if order == 1 else (context[0] << 32) | context[1]
+                transitions[key][history[i]] += 1
+
+    if not transitions:
+        raise ValueError("Corpus contains no usable sentences")
+
+    keys = array('Q')
+    offsets = array('I', [0])
+    successors = array('I')
+    cumulative = array('I')
+    for key in sorted(transitions):
+        keys.append(key)
+        total = 0
+        for successor, count in transitions[key].most_common():
+            total += count
+            successors.append(successor)
+            cumulative.append(total)
+        offsets.append(len(successors))
+
+    vocab_bytes = '\n'.join(vocab).encode('utf-8')
+    body = b''.join(a.tobytes() for a in (keys, offsets, successors, cumulative))
+    fingerprint = hashlib.sha256(body + vocab_bytes).digest()[:16]
+    header = HEADER.pack(MAGIC, order, len(vocab), len(keys), len(successors), len(vocab_bytes), fingerprint)
+    if sys.byteorder != 'little':
+        raise RuntimeError("Model files are written in little-endian order")
+    return header.ljust(HEADER_SIZE, b'\0') + body + vocab_bytes
+
+
+class MarkovModel:
+    """A trained n-gram model backed by a read-only memory map"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, order, vocab_size, states, transitions, vocab_len, fingerprint = \
+            HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a Butter Ipsum n-gram model")
+        self.order = order
+        self.fingerprint = fingerprint.hex()
+
+        view = memoryview(self._mmap)
+        position = HEADER_SIZE
+
+        def take(nbytes, fmt):
+            nonlocal position
+            segment = view[position:position + nbytes].cast(fmt)
+            position += nbytes
+            return segment
+
+        self.keys = take(8 * states, 'Q')
+        self.offsets = take(4 * (states + 1), 'I')
+        self.successors = take(4 * transitions, 'I')
+        self.cumulative = take(4 * transitions, 'I')
+        self.vocab = bytes(view[position:position + vocab_len]).decode('utf-8').split('\n')
+        if len(self.vocab) != vocab_size:
+            raise ValueError(f"{path} is corrupt: vocabulary size mismatch")
+        logger.info(f"Loaded n-gram model {path} ({states} contexts, {transitions} transitions)")
+
+    def _next_token(self, key, rng, explore):
+        """Sample the successor of a context, or EOS for unseen contexts"""
+        index = bisect.bisect_left(self.keys, key)
+        if index == len(self.keys) or self.keys[index] != key:
+            return EOS
+        lo = self.offsets[index]
+        hi = self.offsets[index + 1]
+        if explore and rng.random() < explore:
+            # Flatten the distribution: any observed successor is equally likely
+            return self.successors[rng.randrange(lo, hi)]
+        total = self.cumulative[hi - 1]
+        return self.successors[bisect.bisect_right(self.cumulative, rng.randrange(total), lo, hi)]
+
+    def sentence_tokens(self, rng, explore=0.0):
+        """Return one sentence as a list of token strings"""
+        previous, current = BOS, BOS
+        tokens = []
+        for _ in range(MAX_SENTENCE_TOKENS):
+            key = current if self.order == 1 else (previous << 32) | current
+            token = self._next_token(key, rng, explore)
+            if token == EOS:
+                break
+            tokens.append(self.vocab[token])
+            previous, current = current, token
+        return tokens
+
+    def sentences(self, count, rng, explore=0.0):
+        """Return count sentences, capitalized and punctuated"""
+        sentences = []
+        while len(sentences) < count:
+            tokens = self.sentence_tokens(rng, explore)
+            if not tokens:
+                continue
+            sentence = ' '.join(tokens)
+            if sentence[-1] not in '.!?':
+                sentence += '.'
+            sentences.append(sentence[0].upper() + sentence[1:])
+        return sentences
+
+    def words(self, count, rng, explore=0.0):
+        """Return count words drawn from generated sentences"""
+        words = []
+        while len(words) < count:
+            for token in self.sentence_tokens(rng, explore):
+                word = token.strip('.,;:!?"()')
+                if word:
+                    words.append(word)
+        return words[:count]
+
+    def paragraphs(self, count, rng, explore=0.0, min_sentences=4, max_sentences=8):
+        """Return count paragraphs of 4-8 sentences each"""
+        return [" ".join(self.sentences(rng.randint(min_sentences, max_sentences), rng, explore))
+                for _ in range(count)]
+
+
+def explore_from_tuning(tuning_params):
+    """Map playfulness (1-10) to how often successors are sampled uniformly"""
+    playfulness = tuning_params.get('playfulness', 7)
+    return max(0.0, min(1.0, (playfulness - 1) / 9)) * 0.5
+
+
+_models = {}
+_missing = set()
+_models_lock = threading.Lock()
+
+def get_markov_model(path=None):
+    """Return the shared model for path (default MARKOV_MODEL_PATH), or None if missing
+
+    A missing model is looked for again on the next call, so one trained
+    while the app runs is picked up.
+    """
+    configured = path or os.environ.get('MARKOV_MODEL_PATH')
+    path = configured or DEFAULT_MODEL_PATH
+    model = _models.get(path)
+    if model is None:
+        with _models_lock:
+            model = _models.get(path)
+            if model is None:
+                if not os.path.exists(path):
+                    if path not in _missing:
+                        _missing.add(path)
+                        if configured:
+                            logger.warning(f"n-gram model {path} not found; engine=markov is unavailable")
+                        else:
+                            logger.info("n-gram engine not configured (train a model or set MARKOV_MODEL_PATH)")
+                    return None
+                _missing.discard(path)
+                model = _models[path] = MarkovModel(path)
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or sample a Butter Ipsum n-gram model")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    train_parser = subcommands.add_parser('train', help="Train a model from text files")
+    train_parser.add_argument('corpus', nargs='+', help="Plain-text corpus files")
+    train_parser.add_argument('-o', '--output', default=DEFAULT_MODEL_PATH)
+    train_parser.add_argument('--order', type=int, default=2, choices=[1, 2])
+
+    sample_parser = subcommands.add_parser('sample', help="Print sentences from a model")
+    sample_parser.add_argument('model')
+    sample_parser.add_argument('-n', '--count', type=int, default=5)
+    sample_parser.add_argument('--playfulness', type=int, default=7)
+    sample_parser.add_argument('--seed', type=int)
+
+    args = parser.parse_args()
+    if args.command == 'train':
+        texts = []
+        for corpus_path in args.corpus:
+            with open(corpus_path, encoding='utf-8') as f:
+                texts.append(f.read())
+        data = train(texts, order=args.order)
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        # Write then rename, so running workers never map a half-written file
+        temp_path = args.output + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, args.output)
+        print(f"Wrote {args.output} ({len(data)} bytes)")
+    else:
+        model = MarkovModel(args.model)
+        rng = random.Random(args.seed)
+        explore = explore_from_tuning({'playfulness': args.playfulness})
+        for sentence in model.sentences(args.count, rng, explore):
+            print(sentence)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+"""
+Lightweight in-process metrics with Prometheus text exposition
+
+With several worker processes, set PROMETHEUS_MULTIPROC_DIR (serve.py does)
+to a directory they share. Each process writes a snapshot of its metrics
+there every METRICS_FLUSH_SECONDS, and /metrics, whichever worker serves
+it, adds up the snapshots of every process that has run. Gauges are
+reported per live process, with a pid label.
+"""
+import atexit
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from sub-millisecond template work to slow GPT calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def snapshot(self):
+        """Return {labelvalues: value}"""
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(snapshots):
+        """Add up the snapshots of several processes, given as {pid: snapshot}"""
+        totals = {}
+        for snapshot in snapshots.values():
+            for labelvalues, value in snapshot.items():
+                totals[labelvalues] = totals.get(labelvalues, 0) + value
+        return totals
+
+    def samples(self, values=None):
+        items = sorted((self.snapshot() if values is None else values).items())
+        for labelvalues, value in items:
+            yield self.name, _format_labels(self.labelnames, labelvalues), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by labels"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labelvalues -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        """Return {labelvalues: [bucket counts..., +Inf count, sum]}"""
+        with self._lock:
+            return {labels: list(series) for labels, series in self._series.items()}
+
+    @staticmethod
+    def merge(snapshots):
+        """Add up the snapshots of several processes, bucket by bucket"""
+        totals = {}
+        for snapshot in snapshots.values():
+            for labelvalues, series in snapshot.items():
+                total = totals.get(labelvalues)
+                totals[labelvalues] = series if total is None else [a + b for a, b in zip(total, series)]
+        return totals
+
+    def samples(self, values=None):
+        items = sorted((self.snapshot() if values is None else values).items())
+        for labelvalues, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, labelvalues, [('le', _format_value(bound))])
+                yield f'{self.name}_bucket', labels, cumulative
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f'{self.name}_sum', labels, series[-1]
+            yield f'{self.name}_count', labels, cumulative
+
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, callback):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def snapshot(self):
+        return {(): self.callback()}
+
+    @staticmethod
+    def merge(snapshots):
+        """Keep each live process's value, labelled with its pid"""
+        return {(str(pid),): value for pid, snapshot in snapshots.items() if process_alive(pid)
+                for value in snapshot.values()}
+
+    def samples(self, values=None):
+        if values is None:
+            yield self.name, '', self.callback()
+            return
+        for labelvalues, value in sorted(values.items()):
+            yield self.name, _format_labels(('pid',), labelvalues), value
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Registry:
+    """Holds metrics and renders them in the Prometheus text format"""
+
+    def __init__(self, multiproc_dir=None, flush_interval=5.0):
+        self._metrics = []
+        self.multiproc_dir = multiproc_dir
+        self.flush_interval = flush_interval
+        self._flusher_pid = None
+        self._flusher_lock = threading.Lock()
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, callback):
+        return self.register(Gauge(name, documentation, callback))
+
+    def write_snapshot(self):
+        """Write this process's metrics to multiproc_dir, replacing its previous snapshot"""
+        data = {metric.name: [[list(labels), value] for labels, value in metric.snapshot().items()]
+                for metric in self._metrics}
+        path = os.path.join(self.multiproc_dir, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(data, f)
+        os.replace(path + '.tmp', path)
+
+    def read_snapshots(self):
+        """Return {metric name: {pid: snapshot}} from every process's file in multiproc_dir"""
+        snapshots = {metric.name: {} for metric in self._metrics}
+        for path in glob.glob(os.path.join(self.multiproc_dir, '*.json')):
+            try:
+                pid = int(os.path.basename(path)[:-len('.json')])
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable metrics snapshot {path}: {str(e)}")
+                continue
+            for name, items in data.items():
+                if name in snapshots:
+                    snapshots[name][pid] = {tuple(labels): value for labels, value in items}
+        return snapshots
+
+    def ensure_flusher(self):
+        """Start writing this process's snapshot every flush_interval seconds, once per process"""
+        if not self.multiproc_dir or self._flusher_pid == os.getpid():
+            return
+        with self._flusher_lock:
+            if self._flusher_pid != os.getpid():
+                threading.Thread(target=self._flush, name="metrics-flush", daemon=True).start()
+                if self._flusher_pid is None:
+                    atexit.register(self.write_snapshot)
+                self._flusher_pid = os.getpid()
+
+    def _flush(self):
+        stopped = threading.Event()
+        while not stopped.wait(self.flush_interval):
+            try:
+                self.write_snapshot()
+            except Exception as e:
+                logger.warning(f"Could not write metrics snapshot: {str(e)}")
+
+    def render(self):
+        values = {}
+        if self.multiproc_dir:
+            # Include this process's latest numbers, then add up every process
+            self.write_snapshot()
+            snapshots = self.read_snapshots()
+            values = {metric.name: metric.merge(snapshots[metric.name]) for metric in self._metrics}
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples(values.get(metric.name)):
+                lines.append(f'{name}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry(multiproc_dir=os.environ.get('PROMETHEUS_MULTIPROC_DIR') or None,
+                    flush_interval=float(os.environ.get('METRICS_FLUSH_SECONDS', 5)))
+
+http_requests = registry.counter(
+    'butter_http_requests_total', 'HTTP requests by route, method and status',
+    ('route', 'method', 'status'))
+http_request_duration = registry.histogram(
+    'butter_http_request_duration_seconds', 'Time to build a response, by route',
+    ('route', 'method'))
+generation_duration = registry.histogram(
+    'butter_generation_duration_seconds', 'Text generation time by mode and engine',
+    ('mode', 'engine'))
+openai_request_duration = registry.histogram(
+    'butter_openai_request_duration_seconds', 'Upstream OpenAI request latency',
+    ('outcome',))
+openai_tokens = registry.counter(
+    'butter_openai_tokens_total', 'OpenAI tokens used, from the response usage field',
+    ('type',))
+errors = registry.counter(
+    'butter_errors_total', 'Errors by component and exception class',
+    ('component', 'type'))
+twitter_job_duration = registry.histogram(
+    'butter_twitter_job_duration_seconds', 'Duration of Twitter posting jobs',
+    ('outcome',))
+gpt_rejections = registry.counter(
+    'butter_gpt_rejections_total', 'GPT requests refused without calling OpenAI, by reason',
+    ('reason',))
+gpt_cache_hits = registry.counter(
+    'butter_gpt_cache_hits_total', 'GPT completion cache lookups answered from the cache')
+gpt_cache_misses = registry.counter(
+    'butter_gpt_cache_misses_total', 'GPT completion cache lookups that went to OpenAI')
+text_pool_requests = registry.counter(
+    'butter_text_pool_requests_total', 'Requests for pre-generated text, by pool and outcome',
+    ('pool', 'outcome'))
+text_pool_refill_duration = registry.histogram(
+    'butter_text_pool_refill_duration_seconds', 'Time spent refilling text pools in the background, by pool',
+    ('pool',))
+
+
+def record_error(component, error):
+    """Count an exception under its class name"""
+    errors.inc(component, type(error).__name__)
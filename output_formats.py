@@ -0,0 +1,58 @@
+"""
+Output formats for generated text, rendered straight from lists of units
+"""
+import html
+import json
+import re
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # optional speedup; the stdlib encoder is used otherwise
+    orjson = None
+
+# 'json' is the default {"text": ..., "metadata": ...} envelope
+OUTPUT_FORMATS = ['json', 'plain', 'html', 'markdown', 'json-array']
+UNIT_SEPARATORS = {'paragraph': '\n\n', 'sentence': ' ', 'word': ' '}
+
+MIMETYPES = {
+    'plain': 'text/plain',
+    'html': 'text/html',
+    'markdown': 'text/markdown',
+    'json-array': 'application/json',
+}
+
+# Characters that would start emphasis, code, links or raw HTML in Markdown
+MARKDOWN_SPECIAL = re.compile(r'([\\`*_\[\]<>])')
+
+
+def dumps(obj):
+    """Encode obj as compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(obj, status=200):
+    """Build a JSON response with the fast encoder, in place of jsonify"""
+    return Response(dumps(obj), status=status, mimetype='application/json')
+
+
+def render_units(units, mode, output_format):
+    """Render a list of words, sentences or paragraphs as (body, mimetype)"""
+    if output_format == 'json-array':
+        body = dumps(units)
+    elif output_format == 'html':
+        if mode == 'paragraph':
+            body = ''.join([f'<p>{html.escape(unit, quote=False)}</p>\n' for unit in units])
+        else:
+            body = f'<p>{html.escape(" ".join(units), quote=False)}</p>\n'
+    elif output_format == 'markdown':
+        escaped = [MARKDOWN_SPECIAL.sub(r'\\\1', unit) for unit in units]
+        body = UNIT_SEPARATORS[mode].join(escaped) + '\n'
+    elif output_format == 'plain':
+        body = UNIT_SEPARATORS[mode].join(units) + '\n'
+    else:
+        raise ValueError(f"Unknown output format: {output_format}")
+    return body, MIMETYPES[output_format]
@@ -0,0 +1,103 @@
+"""
+Production server entry point: gunicorn with several worker processes
+
+    python serve.py                    # Flask app on threaded (gthread) workers
+    SERVER_MODE=asgi python serve.py   # asgi:app on uvicorn workers
+
+Settings come from the environment: PORT, HOST, WEB_CONCURRENCY (worker
+processes), THREADS (per gthread worker), KEEP_ALIVE, WORKER_TIMEOUT,
+GRACEFUL_TIMEOUT, MAX_REQUESTS and ACCESS_LOG. Each worker has its own GPT
+dispatcher, so OpenAI concurrency is WEB_CONCURRENCY x GPT_MAX_CONCURRENCY.
+Workers share metrics through PROMETHEUS_MULTIPROC_DIR, a temporary
+directory unless set.
+"""
+import glob
+import logging
+import multiprocessing
+import os
+import tempfile
+
+from gunicorn.app.base import BaseApplication
+
+logger = logging.getLogger(__name__)
+
+SERVER_MODES = ('wsgi', 'asgi')
+
+
+def default_workers():
+    """gunicorn's usual starting point of two workers per CPU, plus one"""
+    return multiprocessing.cpu_count() * 2 + 1
+
+
+def server_options():
+    """Return (mode, gunicorn settings) from environment variables"""
+    mode = os.environ.get('SERVER_MODE', 'wsgi')
+    if mode not in SERVER_MODES:
+        raise ValueError(f"SERVER_MODE must be one of: {', '.join(SERVER_MODES)}")
+    max_requests = int(os.environ.get('MAX_REQUESTS', 0))
+    options = {
+        'bind': f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', 5000)}",
+        'workers': int(os.environ.get('WEB_CONCURRENCY', default_workers())),
+        # Seconds an idle keep-alive connection stays open
+        'keepalive': int(os.environ.get('KEEP_ALIVE', 5)),
+        # Workers that stop reporting in for this long are restarted
+        'timeout': int(os.environ.get('WORKER_TIMEOUT', 60)),
+        'graceful_timeout': int(os.environ.get('GRACEFUL_TIMEOUT', 30)),
+        # Recycle workers after this many requests (0 never does)
+        'max_requests': max_requests,
+        'max_requests_jitter': max_requests // 10,
+        'accesslog': '-' if os.environ.get('ACCESS_LOG', '').lower() == 'true' else None,
+    }
+    if mode == 'asgi':
+        options['worker_class'] = 'uvicorn.workers.UvicornWorker'
+    else:
+        # Threads keep a worker serving template requests while others wait on OpenAI
+        options['worker_class'] = 'gthread'
+        options['threads'] = int(os.environ.get('THREADS', 8))
+    return mode, options
+
+
+def prepare_metrics_dir():
+    """Give the workers an empty directory to share metrics snapshots through"""
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not path:
+        path = os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='butter-metrics-')
+    os.makedirs(path, exist_ok=True)
+    # Snapshots from a previous run would be added to this one's counters
+    for stale in glob.glob(os.path.join(path, '*.json')):
+        os.remove(stale)
+    return path
+
+
+class ButterServer(BaseApplication):
+    """Run gunicorn with settings from code instead of the command line"""
+
+    def __init__(self, mode, options):
+        self.mode = mode
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # Imported in each worker, after the fork
+        if self.mode == 'asgi':
+            from asgi import app
+        else:
+            from app import app
+        return app
+
+
+def main():
+    logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper())
+    mode, options = server_options()
+    metrics_dir = prepare_metrics_dir()
+    logger.info(f"Workers share metrics through {metrics_dir}")
+    logger.info(f"Starting {options['workers']} {mode} workers on {options['bind']}")
+    ButterServer(mode, options).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,48 +1,158 @@
+const BUTTERIPSUM_API_URL = "https://butteripsum.com/api/v1/generate/batch";
+const BUTTERIPSUM_CACHE_SECONDS = 21600; // 6 hours, the CacheService maximum
+const BUTTERIPSUM_BATCH_SIZE = 1000; // the API's limit on requests per batch
+
 /**
  * Generate butter-themed placeholder text directly in Google Sheets.
- * 
- * @param {number} count The number of units to generate (1-10)
- * @param {string} mode The generation mode: "paragraph", "sentence", or "word"
- * @return The generated butter-themed text
+ *
+ * Any argument may be a range; ranges given together must be the same size.
+ * Every cell in the range gets its own text, fetched with one API request
+ * per 1000 cells. A cell with invalid arguments shows an #ERROR message
+ * without failing the rest of the range.
+ *
+ * @param {number|Array} count The number of units to generate (1-10), or a range of counts
+ * @param {string|Array} mode The generation mode: "paragraph", "sentence", or "word", or a range of modes
+ * @param {number|Array} seed Optional seed for reproducible text, or a range of seeds
+ * @return The generated butter-themed text, or a 2D array of texts for ranges
  * @customfunction
  */
-function BUTTERIPSUM(count = 1, mode = "paragraph") {
+function BUTTERIPSUM(count = 1, mode = "paragraph", seed = "") {
+  const ranges = [count, mode, seed].filter(Array.isArray);
+  const isRange = ranges.length > 0;
+  // Cells are matched up by position, so every range argument must be the same size
+  const size = range => range.length + "x" + range[0].length;
+  if (ranges.some(range => size(range) !== size(ranges[0]))) {
+    throw new Error("Count, mode and seed ranges must be the same size (got " + ranges.map(size).join(", ") + ")");
+  }
+  const rows = Array.isArray(count) ? count : Array.isArray(mode) ? mode : Array.isArray(seed) ? seed : [[count]];
+
+  // Build one request spec per output cell
+  const specs = [];
+  rows.forEach((row, r) => {
+    row.forEach((_, c) => {
+      const cellCount = Array.isArray(count) ? count[r][c] : count;
+      const cellMode = Array.isArray(mode) ? mode[r][c] : mode;
+      let cellSeed = Array.isArray(seed) ? seed[r][c] : seed;
+      // A single seed across a range still gives each cell distinct, reproducible text
+      if (cellSeed !== "" && !Array.isArray(seed) && isRange) {
+        cellSeed = Number(cellSeed) + specs.length;
+      }
+      try {
+        specs.push(buildSpec_(cellCount, cellMode, cellSeed));
+      } catch (error) {
+        if (!isRange) {
+          throw error;
+        }
+        specs.push({ error: error.message });
+      }
+    });
+  });
+
+  const texts = fetchButterIpsum_(specs);
+
+  if (!isRange) {
+    return texts[0];
+  }
+  let index = 0;
+  return rows.map(row => row.map(() => texts[index++]));
+}
+
+/**
+ * Validate one cell's parameters and turn them into an API request spec.
+ */
+function buildSpec_(count, mode, seed) {
+  count = Number(count === "" ? 1 : count);
+  mode = String(mode === "" ? "paragraph" : mode).toLowerCase();
+
   // Validate parameters
-  if (count < 1 || count > 10) {
+  if (!(count >= 1 && count <= 10)) {
     throw new Error("Count must be between 1 and 10");
   }
-  
+
   const validModes = ["paragraph", "sentence", "word"];
-  if (!validModes.includes(mode.toLowerCase())) {
+  if (!validModes.includes(mode)) {
     throw new Error("Mode must be one of: paragraph, sentence, word");
   }
-  
-  // Call the Butter Ipsum API
-  const apiUrl = "https://butteripsum.com/api/v1/generate" +
-                "?count=" + encodeURIComponent(count) +
-                "&mode=" + encodeURIComponent(mode.toLowerCase());
-  
+
+  const spec = { count: count, mode: mode };
+  if (seed !== "" && seed !== null && seed !== undefined) {
+    spec.seed = Math.floor(Number(seed));
+  }
+  return spec;
+}
+
+/**
+ * Fetch text for all specs, in batches of up to BUTTERIPSUM_BATCH_SIZE.
+ * Seeded specs always produce the same text, so they are served from
+ * CacheService when possible. Invalid specs get their error message.
+ */
+function fetchButterIpsum_(specs) {
+  const cache = CacheService.getScriptCache();
+  const cacheKeys = specs.map(spec =>
+    spec.error !== undefined || spec.seed === undefined
+      ? null : ["butteripsum", spec.count, spec.mode, spec.seed].join(":"));
+  const cached = cache.getAll(cacheKeys.filter(key => key !== null));
+
+  const texts = new Array(specs.length);
+  const missing = [];
+  specs.forEach((spec, i) => {
+    const key = cacheKeys[i];
+    if (spec.error !== undefined) {
+      texts[i] = "#ERROR: " + spec.error;
+    } else if (key !== null && cached[key] !== undefined) {
+      texts[i] = cached[key];
+    } else {
+      missing.push(i);
+    }
+  });
+
+  if (missing.length === 0) {
+    return texts;
+  }
+
+  // Call the Butter Ipsum API for the uncached cells, one batch per chunk, in parallel
+  const chunks = [];
+  for (let start = 0; start < missing.length; start += BUTTERIPSUM_BATCH_SIZE) {
+    chunks.push(missing.slice(start, start + BUTTERIPSUM_BATCH_SIZE));
+  }
   try {
-    const response = UrlFetchApp.fetch(apiUrl, {
-      muteHttpExceptions: true,
-      timeout: 30
+    const responses = UrlFetchApp.fetchAll(chunks.map(chunk => ({
+      url: BUTTERIPSUM_API_URL,
+      method: "post",
+      contentType: "application/json",
+      payload: JSON.stringify({ requests: chunk.map(i => specs[i]) }),
+      muteHttpExceptions: true
+    })));
+
+    const toCache = {};
+    responses.forEach((response, c) => {
+      const chunk = chunks[c];
+      const responseCode = response.getResponseCode();
+      if (responseCode !== 200) {
+        throw new Error(`HTTP Error ${responseCode}: Failed to fetch text from API`);
+      }
+
+      const data = JSON.parse(response.getContentText());
+      if (data.error) {
+        throw new Error(data.message || "API returned an error");
+      }
+
+      if (!Array.isArray(data.results) || data.results.length !== chunk.length) {
+        throw new Error("API response missing text content");
+      }
+
+      data.results.forEach((result, j) => {
+        const i = chunk[j];
+        texts[i] = result.error ? "#ERROR: " + (result.message || result.error) : result.text;
+        if (!result.error && cacheKeys[i] !== null) {
+          toCache[cacheKeys[i]] = result.text;
+        }
+      });
     });
-    
-    const responseCode = response.getResponseCode();
-    if (responseCode !== 200) {
-      throw new Error(`HTTP Error ${responseCode}: Failed to fetch text from API`);
-    }
-    
-    const data = JSON.parse(response.getContentText());
-    if (data.error) {
-      throw new Error(data.message || "API returned an error");
-    }
-    
-    if (!data.text) {
-      throw new Error("API response missing text content");
+    if (Object.keys(toCache).length > 0) {
+      cache.putAll(toCache, BUTTERIPSUM_CACHE_SECONDS);
     }
-    
-    return data.text;
+    return texts;
   } catch (error) {
     // Handle specific error types
     if (error.message.includes("Invalid JSON")) {
@@ -54,7 +164,9 @@ function BUTTERIPSUM(count = 1, mode = "paragraph") {
 
 /**
  * Example usage in Google Sheets:
- * =BUTTERIPSUM(2, "paragraph")  // Generates 2 paragraphs
- * =BUTTERIPSUM(3, "sentence")   // Generates 3 sentences
- * =BUTTERIPSUM(5, "word")       // Generates 5 words
+ * =BUTTERIPSUM(2, "paragraph")       // Generates 2 paragraphs
+ * =BUTTERIPSUM(3, "sentence")        // Generates 3 sentences
+ * =BUTTERIPSUM(5, "word")            // Generates 5 words
+ * =BUTTERIPSUM(5, "word", 42)        // Always generates the same 5 words
+ * =BUTTERIPSUM(A1:A5000, "sentence") // One cell of text per count in A1:A5000, in five requests
  */
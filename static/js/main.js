@@ -44,6 +44,9 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
+    // The GPT stream in progress, if any; aborting it also cancels its OpenAI request
+    let activeStream = null;
+
     generateForm.addEventListener('submit', async function(e) {
         e.preventDefault();
         
@@ -60,11 +63,14 @@ document.addEventListener('DOMContentLoaded', function() {
         // Build URL with parameters
         let url = `/generate?count=${count}&mode=${mode}&use_gpt=${useGpt}`;
         
-        // Add tuning parameters if GPT is enabled
+        // GPT text is streamed with tuning parameters, falling back to template text if GPT is unavailable
         if (useGpt) {
+            url = `/generate/stream?count=${count}&mode=${mode}&fallback=template`;
             sliders.forEach(param => {
                 url += `&${param}=${document.getElementById(param).value}`;
             });
+            await streamText(url, submitButton);
+            return;
         }
         
         try {
@@ -72,22 +78,11 @@ document.addEventListener('DOMContentLoaded', function() {
             const data = await response.json();
             
             if (data.error) {
-                if (data.fallback_available) {
-                    // If fallback is available, show an option to retry without GPT
-                    const retry = confirm(data.error + "\n\nWould you like to try again without GPT?");
-                    if (retry) {
-                        document.getElementById('useGpt').checked = false;
-                        tuningParams.style.display = 'none';
-                        generateForm.dispatchEvent(new Event('submit'));
-                    }
-                } else {
-                    showToast(data.error);
-                }
+                handleError(data);
                 return;
             }
             
-            // Convert newlines to <br> tags and set as HTML
-            outputDiv.innerHTML = data.text.replace(/\n/g, '<br><br>');
+            renderText(data.text);
             copyButton.style.display = 'block';
         } catch (error) {
             showToast('Failed to generate text. Please try again.');
@@ -98,6 +93,93 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
+    // Render GPT text as it arrives over Server-Sent Events
+    async function streamText(url, submitButton) {
+        if (activeStream) {
+            activeStream.abort();
+        }
+        const controller = new AbortController();
+        activeStream = controller;
+        let text = '';
+        
+        try {
+            const response = await fetch(url, { signal: controller.signal });
+            if (!(response.headers.get('Content-Type') || '').startsWith('text/event-stream')) {
+                handleError(await response.json());
+                return;
+            }
+            
+            const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) {
+                    break;
+                }
+                buffer += value;
+                const events = buffer.split('\n\n');
+                buffer = events.pop();
+                events.forEach(raw => {
+                    const event = parseEvent(raw);
+                    if (event.type === 'message') {
+                        // First text has arrived; stop the spinner and show text from here on
+                        submitButton.classList.remove('loading');
+                        text += event.data.text;
+                        renderText(text);
+                        copyButton.style.display = 'block';
+                    } else if (event.type === 'fallback') {
+                        showToast(event.data.reason + ' - showing classic butter text instead.');
+                    } else if (event.type === 'error') {
+                        showToast(event.data.error);
+                    }
+                });
+            }
+        } catch (error) {
+            if (error.name !== 'AbortError') {
+                showToast('Failed to generate text. Please try again.');
+                console.error('Error:', error);
+            }
+        } finally {
+            if (activeStream === controller) {
+                activeStream = null;
+                submitButton.classList.remove('loading');
+            }
+        }
+    }
+
+    function parseEvent(raw) {
+        const event = { type: 'message', data: '' };
+        raw.split('\n').forEach(line => {
+            if (line.startsWith('event: ')) {
+                event.type = line.slice(7);
+            } else if (line.startsWith('data: ')) {
+                event.data += line.slice(6);
+            }
+        });
+        event.data = event.data ? JSON.parse(event.data) : {};
+        return event;
+    }
+
+    function handleError(data) {
+        if (data.fallback_available) {
+            // If fallback is available, show an option to retry without GPT
+            const retry = confirm(data.error + "\n\nWould you like to try again without GPT?");
+            if (retry) {
+                document.getElementById('useGpt').checked = false;
+                tuningParams.style.display = 'none';
+                generateForm.dispatchEvent(new Event('submit'));
+            }
+        } else {
+            showToast(data.error);
+        }
+    }
+
+    function renderText(text) {
+        // Escape the text, then convert newlines to <br> tags
+        const escaped = text.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+        outputDiv.innerHTML = escaped.replace(/\n/g, '<br><br>');
+    }
+
     copyButton.addEventListener('click', function() {
         const text = outputDiv.textContent;
         navigator.clipboard.writeText(text).then(
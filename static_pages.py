@@ -0,0 +1,148 @@
+"""
+Prerendered, precompressed HTML pages and content-hashed static asset URLs
+"""
+import gzip
+import hashlib
+import logging
+import os
+import threading
+
+from flask import Response, render_template, request
+
+try:
+    import brotli
+except ImportError:  # a dependency, but pages can still be served gzip-compressed without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Hashed asset URLs change whenever the file does, so they can be cached forever
+IMMUTABLE_MAX_AGE = 31536000
+# Pages keep stable URLs; browsers revalidate them cheaply with the ETag
+PAGE_MAX_AGE = 300
+
+
+class RenderedPage:
+    """One rendered template held as identity, gzip and (optionally) brotli bytes"""
+
+    def __init__(self, html):
+        self.body = html.encode('utf-8')
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.encodings = {'gzip': gzip.compress(self.body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.encodings['br'] = brotli.compress(self.body, quality=11)
+
+    def respond(self):
+        """Build the response for the current request, negotiating compression"""
+        encoding = None
+        for candidate in ('br', 'gzip'):
+            if candidate in self.encodings and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+        # Each encoding is a different representation, so it needs its own strong ETag
+        etag = f"{self.etag}-{encoding}" if encoding else self.etag
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            body = self.encodings[encoding] if encoding else self.body
+            response = Response(body, mimetype='text/html')
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.max_age = PAGE_MAX_AGE
+        return response
+
+
+class PageCache:
+    """Render static templates once and serve the stored bytes after that.
+
+    Canonical links are built from ``site_url`` rather than the request's
+    Host header, so every host shares one copy of each page. Without a
+    site URL the links are root-relative.
+    """
+
+    def __init__(self, app, site_url=None):
+        self.app = app
+        self.site_root = site_url.rstrip('/') + '/' if site_url else '/'
+        self._pages = {}  # template -> RenderedPage
+        self._lock = threading.Lock()
+
+    def render(self, template):
+        """Render and compress template"""
+        return RenderedPage(render_template(template, site_root=self.site_root))
+
+    def warm(self, templates):
+        """Render templates now, so no request pays for it"""
+        # The pages don't depend on the request, but url_for needs one
+        with self.app.test_request_context('/'):
+            pages = {template: self.render(template) for template in templates}
+        with self._lock:
+            self._pages.update(pages)
+        logger.debug("Prerendered %s", ', '.join(templates))
+
+    def respond(self, template):
+        """Serve template, rendering it on the first request for it if it wasn't warmed"""
+        if self.app.debug:
+            # Pick up template edits while developing
+            return self.render(template).respond()
+        page = self._pages.get(template)
+        if page is None:
+            with self._lock:
+                page = self._pages.get(template)
+                if page is None:
+                    page = self._pages[template] = self.render(template)
+                    logger.debug("Prerendered %s (%s bytes)", template, len(page.body))
+        return page.respond()
+
+
+def create_page_cache(app):
+    """Create the page cache, with canonical links under SITE_URL if it is set"""
+    return PageCache(app, site_url=os.environ.get('SITE_URL'))
+
+
+class AssetVersions:
+    """Content hashes for files under the static folder, recomputed when a file changes"""
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self._versions = {}  # filename -> (mtime, hash)
+
+    def version(self, filename):
+        path = os.path.join(self.static_folder, filename)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        cached = self._versions.get(filename)
+        if cached is None or cached[0] != mtime:
+            with open(path, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()[:12]
+            cached = self._versions[filename] = (mtime, digest)
+        return cached[1]
+
+
+def init_static_caching(app):
+    """Add ?v=<content hash> to static URLs and serve those URLs as immutable"""
+    versions = AssetVersions(app.static_folder)
+
+    @app.url_defaults
+    def add_asset_version(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            version = versions.version(values['filename'])
+            if version:
+                values['v'] = version
+
+    @app.after_request
+    def cache_versioned_assets(response):
+        # Only a URL carrying the current hash is safe to cache forever
+        if (request.endpoint == 'static' and response.status_code in (200, 304)
+                and request.args.get('v') == versions.version(request.view_args.get('filename', ''))):
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+        return response
+
+    return versions
@@ -0,0 +1,324 @@
+"""
+Compiled sentence templates for fast batch text generation
+"""
+import hashlib
+import json
+import logging
+import random
+import sys
+from string import Formatter
+
+logger = logging.getLogger(__name__)
+
+# Pattern placeholders that don't match a BUTTER_WORDS category name
+SLOT_ALIASES = {
+    'adj': 'adjectives',
+}
+
+
+# Units for exact-length output
+LENGTH_UNITS = ('chars', 'bytes')
+
+# Word categories used to pad exact-length output
+FILLER_CATEGORIES = ('adjectives', 'nouns')
+
+
+def text_length(text, unit):
+    """Length of text in characters or UTF-8 bytes"""
+    return len(text) if unit == 'chars' else len(text.encode('utf-8'))
+
+
+class CompiledPattern:
+    """A sentence pattern pre-parsed into a positional format string and slot pools"""
+    __slots__ = ('source', 'fmt', 'slots', 'capitalize', 'literal_length')
+
+    def __init__(self, source, fmt, slots, capitalize):
+        self.source = source
+        self.fmt = fmt
+        self.slots = slots
+        self.capitalize = capitalize
+        # Length of the pattern's literal text per unit, for exact-length output
+        literal = fmt.replace('{}', '').replace('{{', '{').replace('}}', '}')
+        self.literal_length = {unit: text_length(literal, unit) for unit in LENGTH_UNITS}
+
+
+class FillerTable:
+    """Word sequences of any exact length, for padding text to a target size.
+
+    A filler is words joined by spaces and ending in a period, so each word
+    costs its length plus one. ``choices[r]`` lists the costs that can start
+    a filler of total length r, which lets a filler of any reachable length
+    be built by a random walk with no backtracking.
+    """
+
+    def __init__(self, words, unit, limit):
+        by_cost = {}
+        for word in words:
+            by_cost.setdefault(text_length(word, unit) + 1, []).append(word)
+        self.words_by_cost = {cost: tuple(pool) for cost, pool in by_cost.items()}
+        costs = sorted(self.words_by_cost)
+
+        reachable = [False] * (limit + 1)
+        reachable[0] = True
+        self.choices = [()] * (limit + 1)
+        for r in range(1, limit + 1):
+            options = tuple(cost for cost in costs if cost <= r and reachable[r - cost])
+            self.choices[r] = options
+            reachable[r] = bool(options)
+
+        # Smallest length from which every length up to limit is reachable
+        self.min_length = limit
+        while self.min_length > 0 and reachable[self.min_length - 1]:
+            self.min_length -= 1
+        self.reachable = reachable
+
+    def fill(self, length, rng):
+        """Return a filler of exactly length units, or None if unreachable"""
+        if length <= 0 or length >= len(self.reachable) or not self.reachable[length]:
+            return None
+        words = []
+        while length:
+            cost = rng.choice(self.choices[length])
+            words.append(rng.choice(self.words_by_cost[cost]))
+            length -= cost
+        text = " ".join(words) + "."
+        return text[0].upper() + text[1:]
+
+
+def source_fingerprint(categories, pools, patterns):
+    """Hash of a pack's words and patterns, before any grammar table is applied"""
+    digest = hashlib.sha256()
+    for category, pool in zip(categories, pools):
+        digest.update(category.encode())
+        digest.update('\0'.join(pool).encode())
+    digest.update('\0'.join(patterns).encode())
+    return digest.hexdigest()
+
+
+class CompiledTemplates:
+    """Sentence patterns and word lists compiled once for batch sampling.
+
+    Every pattern is parsed into literal text and slots up front, so sampling N
+    sentences costs one ``choices`` call for the patterns plus one per word
+    pool, instead of five ``random.choice`` calls and a ``str.format`` per
+    sentence.
+
+    ``grammar`` is an optional table from compile_grammar.py listing, per
+    pattern slot, the indices of the words that fit there. Those subsets
+    become extra pools, so grammatical sampling costs the same as before.
+    """
+
+    def __init__(self, words, patterns, name=None, grammar=None):
+        self.name = name
+        self.categories = tuple(sys.intern(category) for category in words.keys())
+        # Interned so words shared between packs are stored once per process
+        self.pools = tuple(tuple(sys.intern(word) for word in words[category]) for category in self.categories)
+        pool_index = {category: i for i, category in enumerate(self.categories)}
+        self.source_fingerprint = source_fingerprint(self.categories, self.pools, patterns)
+        grammar = self._check_grammar(grammar, patterns)
+        self.grammar = grammar is not None
+        # Slots draw from slot_pools: the category pools, then any grammar subsets
+        slot_pools = list(self.pools)
+        subset_index = {}
+
+        compiled = []
+        for pattern_number, pattern in enumerate(patterns):
+            allowed = grammar['patterns'][pattern_number] if grammar else None
+            if grammar and allowed is None:
+                continue
+            fmt_parts = []
+            slots = []
+            for literal, field, _, _ in Formatter().parse(pattern):
+                fmt_parts.append(literal.replace('{', '{{').replace('}', '}}'))
+                if field is None:
+                    continue
+                category = SLOT_ALIASES.get(field, field)
+                if category not in pool_index:
+                    raise ValueError(f"Pattern {pattern!r} uses unknown word category {field!r}")
+                fmt_parts.append('{}')
+                pool = pool_index[category]
+                indices = allowed[len(slots)] if allowed else None
+                if indices is not None:
+                    key = (pool, tuple(indices))
+                    if key not in subset_index:
+                        subset_index[key] = len(slot_pools)
+                        slot_pools.append(tuple(self.pools[pool][i] for i in indices))
+                    pool = subset_index[key]
+                slots.append(pool)
+            compiled.append(CompiledPattern(
+                source=pattern,
+                fmt=''.join(fmt_parts),
+                slots=tuple(slots),
+                capitalize=not pattern[:1].isupper(),
+            ))
+        if not compiled:
+            raise ValueError("At least one sentence pattern is required")
+        self.patterns = tuple(compiled)
+        self.slot_pools = tuple(slot_pools)
+
+        # Word mode picks a category uniformly, then a word within it. Flattening
+        # the lists with matching cumulative weights keeps that distribution while
+        # drawing any number of words in a single call.
+        self.flat_words = tuple(word for pool in self.pools for word in pool)
+        cum_weights = []
+        total = 0.0
+        for pool in self.pools:
+            weight = 1.0 / (len(self.categories) * len(pool))
+            for _ in pool:
+                total += weight
+                cum_weights.append(total)
+        self.word_cum_weights = tuple(cum_weights)
+
+        # Exact-length output: longest possible sentence, per-word lengths and
+        # filler tables sized so any remainder after whole sentences can be padded
+        self.word_lengths = {
+            unit: {word: text_length(word, unit) for word in self.flat_words}
+            for unit in LENGTH_UNITS
+        }
+        filler_words = [word for category in FILLER_CATEGORIES if category in pool_index
+                        for word in self.pools[pool_index[category]]] or list(self.flat_words)
+        self.max_sentence_length = {}
+        self.fillers = {}
+        for unit in LENGTH_UNITS:
+            longest = {i: max(self.word_lengths[unit][word] for word in pool)
+                       for i, pool in enumerate(self.slot_pools)}
+            self.max_sentence_length[unit] = max(
+                pattern.literal_length[unit] + sum(longest[pool] for pool in pattern.slots)
+                for pattern in self.patterns)
+            limit = 2 * self.max_sentence_length[unit] + 64
+            self.fillers[unit] = FillerTable(filler_words, unit, limit)
+
+        # Identifies this vocabulary, so cached seeded output changes when it does
+        if grammar:
+            digest = hashlib.sha256(self.source_fingerprint.encode())
+            digest.update(json.dumps(grammar['patterns'], separators=(',', ':')).encode())
+            self.fingerprint = digest.hexdigest()
+        else:
+            self.fingerprint = self.source_fingerprint
+
+        logger.debug(f"Compiled {len(self.patterns)} patterns over {len(self.flat_words)} words")
+
+    def _check_grammar(self, grammar, patterns):
+        """Return grammar if it was compiled from exactly these words and patterns, else None"""
+        if grammar is None:
+            return None
+        label = self.name or 'vocabulary'
+        if grammar.get('source_fingerprint') != self.source_fingerprint:
+            logger.warning(f"Ignoring stale grammar table for {label}; rerun compile_grammar.py")
+            return None
+        tables = grammar.get('patterns')
+        if not isinstance(tables, list) or len(tables) != len(patterns):
+            logger.warning(f"Ignoring grammar table for {label}: expected {len(patterns)} patterns")
+            return None
+        if all(table is None for table in tables):
+            logger.warning(f"Ignoring grammar table for {label}: it disables every pattern")
+            return None
+        return grammar
+
+    def sentences(self, count, rng=random):
+        """Return a list of ``count`` sentences sampled in one batch"""
+        if count <= 0:
+            return []
+        chosen = rng.choices(self.patterns, k=count)
+
+        # Draw every word the batch needs from each pool in one call
+        needed = [0] * len(self.slot_pools)
+        for pattern in chosen:
+            for pool in pattern.slots:
+                needed[pool] += 1
+        draws = [iter(rng.choices(pool, k=n)) if n else None
+                 for pool, n in zip(self.slot_pools, needed)]
+        nexts = [it.__next__ if it is not None else None for it in draws]
+
+        sentences = []
+        append = sentences.append
+        for pattern in chosen:
+            sentence = pattern.fmt.format(*[nexts[pool]() for pool in pattern.slots])
+            if pattern.capitalize:
+                sentence = sentence[0].upper() + sentence[1:]
+            append(sentence)
+        return sentences
+
+    def words(self, count, rng=random):
+        """Return a list of ``count`` words"""
+        if count <= 0:
+            return []
+        return rng.choices(self.flat_words, cum_weights=self.word_cum_weights, k=count)
+
+    def paragraphs(self, count, rng=random, min_sentences=4, max_sentences=8):
+        """Return a list of ``count`` paragraphs of 4-8 sentences each"""
+        if count <= 0:
+            return []
+        sizes = [rng.randint(min_sentences, max_sentences) for _ in range(count)]
+        sentences = self.sentences(sum(sizes), rng)
+        paragraphs = []
+        start = 0
+        for size in sizes:
+            paragraphs.append(" ".join(sentences[start:start + size]))
+            start += size
+        return paragraphs
+
+    def sentences_with_lengths(self, count, unit, rng=random):
+        """Return (sentence, length) pairs, with lengths summed from precomputed parts"""
+        if count <= 0:
+            return []
+        chosen = rng.choices(self.patterns, k=count)
+        needed = [0] * len(self.slot_pools)
+        for pattern in chosen:
+            for pool in pattern.slots:
+                needed[pool] += 1
+        draws = [iter(rng.choices(pool, k=n)) if n else None
+                 for pool, n in zip(self.slot_pools, needed)]
+        nexts = [it.__next__ if it is not None else None for it in draws]
+        lengths = self.word_lengths[unit]
+
+        results = []
+        for pattern in chosen:
+            args = [nexts[pool]() for pool in pattern.slots]
+            sentence = pattern.fmt.format(*args)
+            if pattern.capitalize:
+                sentence = sentence[0].upper() + sentence[1:]
+            results.append((sentence, pattern.literal_length[unit] + sum(map(lengths.__getitem__, args))))
+        return results
+
+    def iter_exact_length(self, target, unit='chars', rng=random, batch_size=256):
+        """Yield chunks of text totalling exactly target characters or UTF-8 bytes.
+
+        Sentences are drawn in batches and kept whenever they still leave room
+        for a filler. The final remainder is padded in one step with a filler
+        of exactly the right length. Sentence lengths come from the
+        precomputed tables, so nothing is measured, trimmed or regenerated.
+        """
+        if unit not in LENGTH_UNITS:
+            raise ValueError(f"Unit must be one of: {', '.join(LENGTH_UNITS)}")
+        filler = self.fillers[unit]
+        reserve = filler.min_length + 1  # separator plus the shortest filler
+        longest = self.max_sentence_length[unit] + 1
+        remaining = target
+        separator = ""
+
+        while remaining > reserve:
+            candidates = max(8, min(batch_size, (remaining - reserve) // longest))
+            chunk = []
+            for sentence, length in self.sentences_with_lengths(candidates, unit, rng):
+                cost = len(separator) + length
+                if cost <= remaining - reserve:
+                    chunk.append(separator + sentence)
+                    remaining -= cost
+                    separator = " "
+            if not chunk:
+                break
+            yield "".join(chunk)
+
+        if remaining <= 0:
+            return
+        # After any sentence the remainder is at least the reserve, so only
+        # targets shorter than every word can miss here
+        text = filler.fill(remaining - len(separator), rng)
+        if text is None:
+            text = ("Butter" * remaining)[:remaining]
+        yield separator + text
+
+    def exact_length(self, target, unit='chars', rng=random):
+        """Return text of exactly target characters or UTF-8 bytes"""
+        return "".join(self.iter_exact_length(target, unit, rng))
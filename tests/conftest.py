@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+# Tests use hand-built grammar tables; the default pack's table needs spaCy to compile
+os.environ.setdefault('VOCAB_REQUIRE_GRAMMAR', 'false')
+
+from fake_openai import FakeOpenAIConfig, start_fake_openai
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """A local fake OpenAI server that new OpenAI clients talk to; yields its config"""
+    config = FakeOpenAIConfig(latency=0, jitter=0, token_interval=0.01, seed=1)
+    server, base_url = start_fake_openai(config)
+    monkeypatch.setenv('OPENAI_API_KEY', 'fake')
+    monkeypatch.setenv('OPENAI_BASE_URL', base_url)
+    monkeypatch.setenv('OPENAI_MAX_RETRIES', '0')
+    yield config
+    server.shutdown()
+
+
+@pytest.fixture
+def gpt_app(fake_openai, monkeypatch):
+    """The Flask app with GPT routes served by fake_openai, without the per-client limit or cache"""
+    import app
+    from gpt_cache import gpt_cache
+    from gpt_dispatch import GPTDispatcher
+
+    monkeypatch.setattr(app.gpt_generator, 'dispatcher', GPTDispatcher(timeout=5))
+    monkeypatch.setattr(app.gpt_generator, 'use_gpt', True)
+    monkeypatch.setattr(app, 'gpt_client_limiter', None)
+    gpt_cache.clear()
+    yield app.app
+    gpt_cache.clear()
@@ -0,0 +1,123 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import app
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+@pytest.mark.parametrize('path', ['/api/v1/generate', '/api/v1/stream'])
+def test_length_must_be_an_integer(client, path):
+    response = client.get(f'{path}?length=abc')
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Length must be an integer'
+
+
+@pytest.mark.parametrize('path', ['/api/v1/generate', '/api/v1/stream'])
+def test_length_out_of_range(client, path):
+    response = client.get(f'{path}?length=0')
+    assert response.status_code == 400
+    assert response.get_json()['message'].startswith('Length must be between 1 and')
+
+
+@pytest.mark.parametrize('path', ['/api/v1/generate?format=plain', '/api/v1/stream?unit=bytes'])
+def test_exact_length_plain_text(client, path):
+    response = client.get(f'{path}&length=40')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'text/plain; charset=utf-8'
+    assert len(response.get_data()) == 40
+
+
+@pytest.mark.parametrize('mode', ['paragraph', 'sentence', 'word'])
+def test_streamed_text_matches_buffered_plain_text(client, mode):
+    query = f'seed=3&count=3&mode={mode}'
+    buffered = client.get(f'/api/v1/generate?format=plain&{query}').get_data(as_text=True)
+    streamed = client.get(f'/api/v1/stream?{query}').get_data(as_text=True)
+    assert streamed.rstrip('\n') == buffered.rstrip('\n')
+
+
+@pytest.mark.parametrize('output_format, content_type', [
+    ('plain', 'text/plain; charset=utf-8'),
+    ('html', 'text/html; charset=utf-8'),
+    ('markdown', 'text/markdown; charset=utf-8'),
+    ('json-array', 'application/json'),
+])
+def test_output_format_content_type(client, output_format, content_type):
+    response = client.get(f'/api/v1/generate?count=2&mode=sentence&format={output_format}')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == content_type
+
+
+def test_seeded_output_is_reproducible_and_cacheable(client):
+    path = '/api/v1/generate?count=3&mode=sentence&seed=42'
+    first = client.get(path)
+    second = client.get(path)
+    assert first.status_code == second.status_code == 200
+    assert first.get_json()['text'] == second.get_json()['text']
+    etag = first.headers['ETag']
+    assert etag == second.headers['ETag']
+    assert 'immutable' in first.headers['Cache-Control']
+
+    other = client.get('/api/v1/generate?count=3&mode=sentence&seed=43')
+    assert other.headers['ETag'] != etag
+    assert other.get_json()['text'] != first.get_json()['text']
+
+
+def test_matching_if_none_match_gets_a_304(client):
+    path = '/api/v1/generate?count=2&mode=paragraph&seed=7&format=plain'
+    etag = client.get(path).headers['ETag']
+    response = client.get(path, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.headers['ETag'] == etag
+    assert client.get(path, headers={'If-None-Match': '"something-else"'}).status_code == 200
+
+
+def test_unseeded_output_is_not_cacheable(client):
+    response = client.get('/api/v1/generate?count=2&mode=sentence')
+    assert 'ETag' not in response.headers
+
+
+def test_seeded_output_is_the_same_under_concurrency():
+    path = '/api/v1/generate?count=5&mode=paragraph&seed=9'
+
+    def fetch(_):
+        return app.test_client().get(path).get_json()['text']
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        texts = set(pool.map(fetch, range(32)))
+    assert len(texts) == 1
+
+
+def test_batch_mixes_results_and_per_item_errors(client):
+    response = client.post('/api/v1/generate/batch', json={'requests': [
+        {'count': 2, 'mode': 'sentence'},
+        {'count': 0, 'mode': 'sentence'},
+        {'count': 3, 'mode': 'verse'},
+        'not an object',
+        {'count': 'many'},
+        {'count': 1, 'pack': 'no-such-pack'},
+        {'count': 4, 'mode': 'word', 'seed': 42},
+    ]})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert len(results) == 7
+    assert results[0]['metadata'] == {'count': 2, 'mode': 'sentence'} and results[0]['text']
+    assert [result.get('error') for result in results[1:6]] == [
+        'Invalid count parameter', 'Invalid mode parameter', 'Invalid request',
+        'Invalid parameter type', 'Invalid pack parameter']
+    assert results[6]['metadata'] == {'count': 4, 'mode': 'word', 'seed': 42}
+
+    again = client.post('/api/v1/generate/batch', json={'requests': [{'count': 4, 'mode': 'word', 'seed': 42}]})
+    assert again.get_json()['results'][0]['text'] == results[6]['text']
+
+
+@pytest.mark.parametrize('body', [None, {'requests': 'all'}, {'requests': [{}] * 1001}])
+def test_batch_rejects_malformed_bodies(client, body):
+    response = client.post('/api/v1/generate/batch', json=body) if body is not None else \
+        client.post('/api/v1/generate/batch', data='not json', content_type='application/json')
+    assert response.status_code == 400
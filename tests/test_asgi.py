@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+import asgi
+
+
+def http_scope(path, query=b''):
+    return {
+        'type': 'http', 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'root_path': '', 'query_string': query, 'headers': [],
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 50000),
+    }
+
+
+def test_disconnect_mid_stream_cancels_the_upstream_call(gpt_app, fake_openai):
+    fake_openai.token_interval = 0.05
+    bodies = []
+
+    async def request():
+        requested = False
+        got_text = asyncio.Event()
+        hung_up = asyncio.Event()
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': b''}
+            await hung_up.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.body' and message.get('body'):
+                bodies.append(message['body'])
+                got_text.set()
+
+        app_task = asyncio.ensure_future(
+            asgi.app(http_scope('/generate/stream', b'count=5&mode=paragraph'), receive, send))
+        await got_text.wait()
+        hung_up.set()
+        await asyncio.wait_for(app_task, 5)
+
+    asyncio.run(request())
+    assert b'event: done' not in b''.join(bodies)
+
+    deadline = time.monotonic() + 5
+    while fake_openai.abandoned_streams == 0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert fake_openai.abandoned_streams == 1
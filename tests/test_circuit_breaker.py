@@ -0,0 +1,118 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from admission import CircuitBreaker, CircuitOpenError, QueueFullError, classify_failure
+from gpt_dispatch import GPTDispatcher
+
+MESSAGES = [{'role': 'user', 'content': 'Write 2 sentences about butter'}]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def dispatcher(fake_openai, clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    return GPTDispatcher(max_concurrency=2, timeout=5, breaker=breaker)
+
+
+def complete(dispatcher, messages=MESSAGES):
+    return dispatcher.complete('gpt-4o-mini', messages, 50, 0.7)
+
+
+def trip(dispatcher, fake_openai, clock):
+    """Open the circuit with rate-limited calls, then wait out the reset timeout"""
+    fake_openai.rate_limit_rate = 1.0
+    for i in range(2):
+        with pytest.raises(openai.RateLimitError):
+            complete(dispatcher, [{'role': 'user', 'content': f'Write {i + 1} sentences'}])
+    fake_openai.rate_limit_rate = 0.0
+    assert dispatcher.breaker.state == 'open'
+    clock.now += 31
+    assert dispatcher.breaker.state == 'half_open'
+
+
+def test_circuit_opens_fails_fast_and_closes_after_a_trial(dispatcher, fake_openai, clock):
+    fake_openai.rate_limit_rate = 1.0
+    for _ in range(2):
+        with pytest.raises(openai.RateLimitError):
+            complete(dispatcher)
+    assert dispatcher.breaker.state == 'open'
+
+    requests = fake_openai.requests
+    with pytest.raises(CircuitOpenError):
+        complete(dispatcher)
+    assert fake_openai.requests == requests
+
+    fake_openai.rate_limit_rate = 0.0
+    clock.now += 31
+    assert dispatcher.breaker.state == 'half_open'
+    assert complete(dispatcher)
+    assert dispatcher.breaker.state == 'closed'
+
+
+def test_failed_trial_reopens_the_circuit(dispatcher, fake_openai, clock):
+    trip(dispatcher, fake_openai, clock)
+    fake_openai.rate_limit_rate = 1.0
+    with pytest.raises(openai.RateLimitError):
+        complete(dispatcher)
+    assert dispatcher.breaker.state == 'open'
+
+
+def test_closed_stream_releases_the_trial(dispatcher, fake_openai, clock):
+    trip(dispatcher, fake_openai, clock)
+    chunks = dispatcher.stream('gpt-4o-mini', MESSAGES, 50, 0.7)
+    assert next(chunks)
+    # A client disconnecting mid-stream says nothing about the upstream
+    chunks.close()
+    assert dispatcher.breaker.state == 'half_open'
+
+    assert complete(dispatcher)
+    assert dispatcher.breaker.state == 'closed'
+
+
+def test_cancelled_trial_releases_the_trial(dispatcher, fake_openai, clock):
+    trip(dispatcher, fake_openai, clock)
+    fake_openai.latency = 2
+
+    async def cancel_trial():
+        task = asyncio.ensure_future(dispatcher.complete_async('gpt-4o-mini', MESSAGES, 50, 0.7))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+    assert dispatcher.breaker.state == 'half_open'
+
+    fake_openai.latency = 0
+    assert complete(dispatcher)
+    assert dispatcher.breaker.state == 'closed'
+
+
+def test_queue_full_does_not_take_the_trial(fake_openai, clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure(TimeoutError())
+    clock.now += 31
+    dispatcher = GPTDispatcher(max_concurrency=0, max_queue=0, breaker=breaker)
+    with pytest.raises(QueueFullError):
+        complete(dispatcher)
+    assert breaker.allow()
+
+
+def test_sdk_timeout_trips_the_breaker():
+    error = openai.APITimeoutError(request=httpx.Request('POST', 'http://localhost/v1/chat/completions'))
+    assert classify_failure(error) == 'timeout'
@@ -0,0 +1,31 @@
+import pytest
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+import app as app_module
+from admission import ClientRateLimiter
+
+GPT_PATH = '/generate?engine=gpt&count=1&mode=sentence'
+
+
+@pytest.fixture
+def limited_app(gpt_app, monkeypatch):
+    # One request per client, refilled far slower than the test runs
+    monkeypatch.setattr(app_module, 'gpt_client_limiter', ClientRateLimiter(rate=0.001, burst=1))
+    return gpt_app
+
+
+def test_spoofed_forwarded_for_does_not_get_a_fresh_bucket(limited_app):
+    client = limited_app.test_client()
+    assert client.get(GPT_PATH, headers={'X-Forwarded-For': '10.0.0.1'}).status_code == 200
+    response = client.get(GPT_PATH, headers={'X-Forwarded-For': '10.0.0.2'})
+    assert response.status_code == 429
+    assert 'Retry-After' in response.headers
+
+
+def test_trusted_proxy_hop_identifies_the_client(limited_app, monkeypatch):
+    monkeypatch.setattr(limited_app, 'wsgi_app', ProxyFix(limited_app.wsgi_app, x_for=1))
+    client = limited_app.test_client()
+    # The proxy appends the real address; anything before it came from the client
+    assert client.get(GPT_PATH, headers={'X-Forwarded-For': 'spoof-1, 203.0.113.7'}).status_code == 200
+    assert client.get(GPT_PATH, headers={'X-Forwarded-For': 'spoof-2, 203.0.113.7'}).status_code == 429
+    assert client.get(GPT_PATH, headers={'X-Forwarded-For': '203.0.113.8'}).status_code == 200
@@ -0,0 +1,96 @@
+import io
+import re
+import sqlite3
+
+import pytest
+from sqlalchemy import Integer, String, Text
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from fixtures import Column, columns_from_model, iter_batches, load_sqlite, write_copy
+
+
+def test_parse_column_spec():
+    column = Column.parse('body:paragraph:3')
+    assert (column.name, column.kind, column.count) == ('body', 'paragraph', 3)
+
+
+@pytest.mark.parametrize('spec', ['body:paragraph:0', 'body:paragraph:-2', 'body:paragraph:x', 'body'])
+def test_parse_rejects_bad_specs(spec):
+    with pytest.raises(ValueError):
+        Column.parse(spec)
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Post(Base):
+    __tablename__ = 'posts'
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    title: Mapped[str] = mapped_column(String(80))
+    summary: Mapped[str] = mapped_column(Text)
+    body: Mapped[str] = mapped_column(Text)
+    views: Mapped[int] = mapped_column(Integer, nullable=True)
+
+
+class Rating(Base):
+    __tablename__ = 'ratings'
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    stars: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+COPY_UNESCAPES = {'\\': '\\', 't': '\t', 'n': '\n', 'r': '\r'}
+
+
+def read_copy(script):
+    """Parse the rows back out of a COPY ... FROM stdin script"""
+    lines = script.split('\n')
+    assert lines[0].startswith('COPY ') and lines[-2:] == ['\\.', '']
+    return [tuple(re.sub(r'\\(.)', lambda m: COPY_UNESCAPES[m.group(1)], field) for field in line.split('\t'))
+            for line in lines[1:-2]]
+
+
+def load(path, seed):
+    table, columns = columns_from_model(Post)
+    load_sqlite(str(path), table, columns, iter_batches(columns, 250, seed=seed, batch_size=100))
+    with sqlite3.connect(str(path)) as connection:
+        return connection.execute('SELECT * FROM posts ORDER BY id').fetchall()
+
+
+def test_columns_from_model():
+    table, columns = columns_from_model(Post)
+    assert table == 'posts'
+    assert [(column.name, column.kind, column.max_length) for column in columns] == [
+        ('id', 'serial', None), ('title', 'title', 80), ('summary', 'sentence', None), ('body', 'paragraph', None)]
+
+
+def test_required_column_that_cannot_be_generated():
+    with pytest.raises(ValueError, match="'stars'"):
+        columns_from_model(Rating)
+
+
+def test_sqlite_load_is_reproducible(tmp_path):
+    rows = load(tmp_path / 'first.db', seed=7)
+    assert len(rows) == 250
+    assert [row[0] for row in rows] == list(range(1, 251))
+    with sqlite3.connect(str(tmp_path / 'first.db')) as connection:
+        types = connection.execute(
+            'SELECT DISTINCT typeof(id), typeof(title), typeof(summary), typeof(body) FROM posts'
+        ).fetchall()
+    assert types == [('integer', 'text', 'text', 'text')]
+    assert all(0 < len(row[1]) <= 80 for row in rows)
+    assert all('\n\n' in row[3] for row in rows)
+
+    assert load(tmp_path / 'second.db', seed=7) == rows
+    assert load(tmp_path / 'other.db', seed=8) != rows
+
+
+def test_copy_output_round_trips():
+    table, columns = columns_from_model(Post)
+    out = io.StringIO()
+    write_copy(out, table, columns, iter_batches(columns, 120, seed=3, batch_size=50))
+    assert out.getvalue().startswith('COPY posts (id, title, summary, body) FROM stdin;\n')
+
+    expected = [tuple(str(value) for value in row)
+                for batch in iter_batches(columns, 120, seed=3, batch_size=50) for row in batch]
+    assert read_copy(out.getvalue()) == expected
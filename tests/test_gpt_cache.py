@@ -0,0 +1,65 @@
+from gpt_cache import GPTCompletionCache
+
+TUNING = {'humor': 5, 'poetic': 5}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def key(count):
+    return GPTCompletionCache.make_key(TUNING, 'sentence', count, 'gpt-4o-mini')
+
+
+def test_key_normalizes_tuning_parameters():
+    assert GPTCompletionCache.make_key({'poetic': '5', 'humor': 5.0}, 'sentence', '2', 'm') == \
+        GPTCompletionCache.make_key({'humor': 5, 'poetic': 5}, 'sentence', 2, 'm')
+
+
+def test_collects_variants_before_serving_them():
+    cache = GPTCompletionCache(variants=3)
+    for text in ('one', 'two'):
+        cache.put(key(1), text)
+        assert cache.get(key(1)) is None
+    # The same completion stored twice, as coalesced requests do, is one variant
+    cache.put(key(1), 'two')
+    assert cache.get(key(1)) is None
+    cache.put(key(1), 'three')
+    served = {cache.get(key(1)) for _ in range(50)}
+    assert served == {'one', 'two', 'three'}
+    assert cache.stats()['hits'] == 50
+
+
+def test_least_recently_used_key_is_evicted():
+    cache = GPTCompletionCache(maxsize=2, variants=1)
+    cache.put(key(1), 'one')
+    cache.put(key(2), 'two')
+    assert cache.get(key(1)) == 'one'
+    cache.put(key(3), 'three')
+    assert cache.get(key(2)) is None
+    assert cache.get(key(1)) == 'one'
+    assert cache.get(key(3)) == 'three'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_the_ttl():
+    clock = Clock()
+    cache = GPTCompletionCache(ttl=60, variants=2, clock=clock)
+    cache.put(key(1), 'old')
+    clock.now = 30
+    cache.put(key(1), 'new')
+    assert cache.get(key(1)) in ('old', 'new')
+
+    # The older variant expires first, so the key goes back to collecting
+    clock.now = 61
+    assert cache.get(key(1)) is None
+    cache.put(key(1), 'newer')
+    assert {cache.get(key(1)) for _ in range(30)} == {'new', 'newer'}
+
+    clock.now = 200
+    assert cache.get(key(1)) is None
+    assert cache.stats()['keys'] == 0
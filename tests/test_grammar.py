@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import random
+
+import pytest
+
+import compile_grammar
+from template_engine import CompiledTemplates, source_fingerprint
+from vocab_packs import DEFAULT_VOCAB_DIR, VocabRegistry, find_pack_files, grammar_path, load_pack, require_grammar
+
+WORDS = {'nouns': ['loaf', 'loaves', 'scone'], 'verbs': ['melts', 'melt']}
+PATTERNS = ['Each {nouns} {verbs}.', 'Warm {nouns} glow.']
+
+
+def fingerprint(words, patterns):
+    return source_fingerprint(tuple(words), [words[category] for category in words], patterns)
+
+
+def write_pack(tmp_path, grammar):
+    path = tmp_path / 'tiny.json'
+    path.write_text(json.dumps({'name': 'tiny', 'words': WORDS, 'patterns': PATTERNS}))
+    (tmp_path / 'tiny.grammar.json').write_text(json.dumps(grammar))
+    return str(path)
+
+
+def restricted_slots(templates):
+    """Number of pattern slots drawing from a grammar subset rather than a whole word pool"""
+    return sum(pool >= len(templates.pools) for pattern in templates.patterns for pool in pattern.slots)
+
+
+def test_grammar_table_restricts_slots(tmp_path):
+    # "Each" takes a singular noun and a singular verb; the second pattern is unrestricted
+    grammar = {'source_fingerprint': fingerprint(WORDS, PATTERNS), 'patterns': [[[0, 2], [0]], [None]]}
+    templates = load_pack(write_pack(tmp_path, grammar))
+    assert templates.grammar
+    assert restricted_slots(templates) == 2
+
+    sentences = templates.sentences(200, random.Random(1))
+    assert {s for s in sentences if s.startswith('Each')} == {'Each loaf melts.', 'Each scone melts.'}
+    assert any(s == 'Warm loaves glow.' for s in sentences)
+
+
+def test_stale_grammar_table_falls_back_with_a_warning(tmp_path, caplog):
+    grammar = {'source_fingerprint': fingerprint(WORDS, PATTERNS[:1]), 'patterns': [[[0, 2], [0]], [None]]}
+    with caplog.at_level(logging.WARNING, logger='template_engine'):
+        templates = load_pack(write_pack(tmp_path, grammar))
+    assert not templates.grammar
+    assert restricted_slots(templates) == 0
+    assert 'Ignoring stale grammar table for tiny' in caplog.text
+    assert templates.fingerprint == templates.source_fingerprint
+
+
+def test_default_pack_grammar_table_is_current():
+    path = find_pack_files(DEFAULT_VOCAB_DIR)['butter']
+    if not os.path.exists(grammar_path(path)):
+        pytest.skip("vocab/butter.grammar.json not built; run compile_grammar.py")
+    templates = load_pack(path)
+    assert templates.grammar
+    assert restricted_slots(templates) > 0
+
+
+def test_compile_restricts_default_pack_slots():
+    pytest.importorskip('spacy')
+    try:
+        nlp = compile_grammar.load_nlp(compile_grammar.DEFAULT_MODEL)
+    except OSError:
+        pytest.skip(f"spaCy model {compile_grammar.DEFAULT_MODEL} is not installed")
+    with open(find_pack_files(DEFAULT_VOCAB_DIR)['butter'], encoding='utf-8') as f:
+        pack = json.load(f)
+
+    table, _ = compile_grammar.compile_pack(nlp, pack)
+    templates = CompiledTemplates(pack['words'], pack['patterns'], grammar=table)
+    assert templates.grammar
+    assert restricted_slots(templates) > 0
+
+
+def test_loaded_table_fixes_subject_verb_agreement(tmp_path):
+    # Tables built with the compiler's own fits() from hand-written tags, so spaCy isn't needed
+    words = {'nouns': ['loaf', 'loaves', 'scone', 'scones'],
+             'verbs': ['melts', 'melt', 'melted', 'glistens', 'drizzled', 'glisten']}
+    patterns = ['The butter is {verbs}.', 'Each {nouns} {verbs}.']
+    tags = {'nouns': [{'number': number} for number in ('Sing', 'Plur', 'Sing', 'Plur')],
+            'verbs': [{'tag': 'VBZ', 'participle': False}, {'tag': 'VBP', 'participle': False},
+                      {'tag': 'VBN', 'participle': True}, {'tag': 'VBZ', 'participle': False},
+                      {'tag': 'VBN', 'participle': True}, {'tag': 'VBP', 'participle': False}]}
+    needs = [[('verbs', {'participle': True})],
+             [('nouns', {'number': 'Sing'}), ('verbs', {'tag': 'VBZ'})]]
+    table = [[[i for i, info in enumerate(tags[category]) if compile_grammar.fits(info, need)]
+              for category, need in slots] for slots in needs]
+    (tmp_path / 'tiny.json').write_text(json.dumps({'name': 'tiny', 'words': words, 'patterns': patterns}))
+    (tmp_path / 'tiny.grammar.json').write_text(json.dumps(
+        {'source_fingerprint': fingerprint(words, patterns), 'patterns': table}))
+
+    registry = VocabRegistry(str(tmp_path), default='tiny', reload_interval=0)
+    require_grammar(registry)
+    sentences = set(registry.get().sentences(300, random.Random(1)))
+    assert {s for s in sentences if s.startswith('The butter')} == \
+        {'The butter is melted.', 'The butter is drizzled.'}
+    assert {s for s in sentences if s.startswith('Each')} == \
+        {f'Each {noun} {verb}.' for noun in ('loaf', 'scone') for verb in ('melts', 'glistens')}
+
+
+def test_missing_table_fails_startup(tmp_path):
+    (tmp_path / 'tiny.json').write_text(json.dumps({'name': 'tiny', 'words': WORDS, 'patterns': PATTERNS}))
+    registry = VocabRegistry(str(tmp_path), default='tiny', reload_interval=0)
+    with pytest.raises(ValueError, match='tiny.grammar.json'):
+        require_grammar(registry)
@@ -0,0 +1,126 @@
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+from leader_election import FileLeaderLock, LeaderElection
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Prints "elected" when this process becomes leader, then waits for stdin to close
+CANDIDATE = """
+import sys
+from leader_election import FileLeaderLock, elect_leader
+elect_leader(FileLeaderLock('test', sys.argv[1]), lambda: print('elected', flush=True), retry_interval=0.05)
+print('started', flush=True)
+sys.stdin.read()
+"""
+
+
+class Candidate:
+    def __init__(self, lock_dir):
+        self.process = subprocess.Popen([sys.executable, '-c', CANDIDATE, str(lock_dir)],
+                                        cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        self.lines = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        for line in self.process.stdout:
+            self.lines.put(line.strip())
+
+    def wait_for(self, expected, timeout=10):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                line = self.lines.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                return False
+            if line == expected:
+                return True
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+
+
+def test_flock_elects_one_process_and_hands_over_when_it_exits(tmp_path):
+    first = Candidate(tmp_path)
+    assert first.wait_for('elected')
+    second = Candidate(tmp_path)
+    try:
+        assert second.wait_for('started')
+        # The second candidate keeps retrying but can't win while the first is alive
+        assert not second.wait_for('elected', timeout=0.5)
+
+        first.stop()
+        assert second.wait_for('elected')
+    finally:
+        first.stop()
+        second.stop()
+
+
+def test_flock_is_exclusive_between_lock_objects(tmp_path):
+    first = FileLeaderLock('test', str(tmp_path))
+    second = FileLeaderLock('test', str(tmp_path))
+    assert first.acquire()
+    assert first.is_held()
+    assert not second.acquire()
+    first.release()
+    assert not first.is_held()
+    assert second.acquire()
+    second.release()
+
+
+class LosableLock:
+    """A lock whose server-side hold can be taken away, like a dropped Postgres session"""
+
+    def __init__(self):
+        self.held = False
+        self.lost = False
+
+    def acquire(self):
+        self.held = not self.lost
+        return self.held
+
+    def is_held(self):
+        return self.held and not self.lost
+
+    def release(self):
+        self.held = False
+
+
+def test_leader_steps_down_when_the_lock_is_lost():
+    lock = LosableLock()
+    events = []
+    election = LeaderElection(lock, lambda: events.append('elected'), lambda: events.append('lost'),
+                              retry_interval=0, check_interval=0)
+    assert election.start()
+    assert election.check()
+
+    lock.lost = True
+    assert not election.check()
+    assert not election.is_leader
+    assert events == ['elected', 'lost']
+
+
+def test_periodic_check_steps_down_and_reelects():
+    lock = LosableLock()
+    elected = threading.Semaphore(0)
+    lost = threading.Event()
+    election = LeaderElection(lock, elected.release, lost.set, retry_interval=0.02, check_interval=0.02)
+    try:
+        assert election.start()
+        assert elected.acquire(timeout=1)
+
+        lock.lost = True
+        assert lost.wait(timeout=2)
+        assert not election.is_leader
+
+        lock.lost = False
+        assert elected.acquire(timeout=2)
+        assert election.is_leader
+    finally:
+        election.stop()
@@ -0,0 +1,59 @@
+import logging
+import os
+import random
+
+import pytest
+
+import markov_engine
+from markov_engine import MarkovModel, get_markov_model, train
+from text_generator import ButterTextGenerator
+
+CORPUS = """Golden butter melts slowly on warm toast.
+Salted butter glistens on fresh bread.
+Whipped butter melts into warm pancakes."""
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = tmp_path / 'butter.ngram'
+    path.write_bytes(train([CORPUS]))
+    return str(path)
+
+
+def test_trained_model_is_memory_mapped_and_samples(model_path):
+    model = MarkovModel(model_path)
+    assert model.order == 2
+    assert isinstance(model.keys, memoryview)
+    vocabulary = set(CORPUS.split())
+    for sentence in model.sentences(5, random.Random(1)):
+        assert sentence.endswith('.')
+        assert set(sentence.split()) <= vocabulary
+    assert len(model.words(7, random.Random(1))) == 7
+    # The same seed reproduces the same text
+    assert model.paragraphs(2, random.Random(3)) == MarkovModel(model_path).paragraphs(2, random.Random(3))
+
+
+def test_generator_loads_the_model_on_first_use(model_path, monkeypatch):
+    monkeypatch.setenv('MARKOV_MODEL_PATH', model_path)
+    generator = ButterTextGenerator(engine='markov', seed=1)
+    assert generator.engine == 'markov'
+    assert generator.markov is get_markov_model(model_path)
+    assert generator.generate_sentences(2)
+
+
+def test_default_model_path_does_not_depend_on_working_directory():
+    assert markov_engine.DEFAULT_MODEL_PATH == os.path.join(
+        os.path.dirname(os.path.abspath(markov_engine.__file__)), 'models', 'butter.ngram')
+
+
+def test_missing_model_is_logged_once_below_error(tmp_path, monkeypatch, caplog):
+    path = str(tmp_path / 'missing.ngram')
+    monkeypatch.setenv('MARKOV_MODEL_PATH', path)
+    with caplog.at_level(logging.INFO, logger='markov_engine'):
+        assert ButterTextGenerator(engine='markov').engine == 'template'
+        assert get_markov_model() is None
+    assert [record.levelname for record in caplog.records] == ['WARNING']
+    # Trained later, the model is picked up without a restart
+    with open(path, 'wb') as f:
+        f.write(train([CORPUS]))
+    assert get_markov_model().path == path
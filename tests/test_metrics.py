@@ -0,0 +1,79 @@
+import os
+
+import metrics
+from metrics import Registry
+
+# No process has this pid: pid_max is at most 2**22
+GONE_PID = 2 ** 23
+
+
+def make_registry(multiproc_dir, gauge_value=0):
+    registry = Registry(multiproc_dir=multiproc_dir and str(multiproc_dir))
+    requests = registry.counter('test_requests_total', 'Requests', ('route',))
+    duration = registry.histogram('test_duration_seconds', 'Duration', buckets=(0.1, 1.0))
+    registry.gauge('test_queue_depth', 'Queue depth', lambda: gauge_value)
+    return registry, requests, duration
+
+
+def write_as(registry, pid):
+    """Write registry's snapshot as if it came from another process"""
+    registry.write_snapshot()
+    path = os.path.join(registry.multiproc_dir, '{}.json')
+    os.replace(path.format(os.getpid()), path.format(pid))
+
+
+def test_renders_one_process_without_a_shared_dir():
+    registry, requests, duration = make_registry(None, gauge_value=3)
+    requests.inc('/a')
+    duration.observe(0.5)
+    text = registry.render()
+    assert '# TYPE test_requests_total counter' in text
+    assert 'test_requests_total{route="/a"} 1' in text
+    assert 'test_duration_seconds_bucket{le="1.0"} 1' in text
+    assert 'test_queue_depth 3' in text
+
+
+def test_adds_up_counters_and_histograms_across_processes(tmp_path):
+    other, other_requests, other_duration = make_registry(tmp_path)
+    other_requests.inc('/a', amount=2)
+    other_requests.inc('/b')
+    other_duration.observe(0.05)
+    write_as(other, GONE_PID)
+
+    registry, requests, duration = make_registry(tmp_path, gauge_value=7)
+    requests.inc('/a')
+    duration.observe(0.5)
+    text = registry.render()
+    assert 'test_requests_total{route="/a"} 3' in text
+    assert 'test_requests_total{route="/b"} 1' in text
+    assert 'test_duration_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_duration_seconds_bucket{le="1.0"} 2' in text
+    assert 'test_duration_seconds_count 2' in text
+    # Gauges come from live processes only, one series per pid
+    assert f'test_queue_depth{{pid="{os.getpid()}"}} 7' in text
+    assert f'pid="{GONE_PID}"' not in text
+
+
+def test_scrapes_stay_monotonic(tmp_path):
+    registry, requests, _ = make_registry(tmp_path)
+    requests.inc('/a')
+    assert 'test_requests_total{route="/a"} 1' in registry.render()
+    # A second render must not count this process's snapshot twice
+    assert 'test_requests_total{route="/a"} 1' in registry.render()
+    requests.inc('/a')
+    assert 'test_requests_total{route="/a"} 2' in registry.render()
+
+
+def test_gpt_cache_lookups_are_counters():
+    from gpt_cache import GPTCompletionCache
+
+    cache = GPTCompletionCache(variants=1)
+    key = GPTCompletionCache.make_key({}, 'sentence', 1, 'gpt-4o-mini')
+    hits, misses = metrics.gpt_cache_hits.snapshot().get((), 0), metrics.gpt_cache_misses.snapshot().get((), 0)
+    cache.get(key)
+    cache.put(key, 'Butter.')
+    cache.get(key)
+    assert metrics.gpt_cache_hits.kind == metrics.gpt_cache_misses.kind == 'counter'
+    assert metrics.gpt_cache_hits.name == 'butter_gpt_cache_hits_total'
+    assert metrics.gpt_cache_hits.snapshot()[()] == hits + 1
+    assert metrics.gpt_cache_misses.snapshot()[()] == misses + 1
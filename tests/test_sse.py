@@ -0,0 +1,66 @@
+import json
+import time
+
+STREAM_PATH = '/generate/stream?count=3&mode=sentence'
+
+
+def parse_events(body):
+    """Split an SSE body into (event, data) pairs"""
+    events = []
+    for block in body.decode('utf-8').strip().split('\n\n'):
+        event = 'message'
+        for line in block.split('\n'):
+            if line.startswith('event: '):
+                event = line[len('event: '):]
+            elif line.startswith('data: '):
+                data = json.loads(line[len('data: '):])
+        events.append((event, data))
+    return events
+
+
+def test_gpt_text_streams_as_events(gpt_app, fake_openai):
+    response = gpt_app.test_client().get(STREAM_PATH)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    events = parse_events(response.get_data())
+    assert events[-1] == ('done', {})
+    texts = [data['text'] for event, data in events[:-1]]
+    assert all(event == 'message' for event, _ in events[:-1])
+    # One event per token group from the fake server, adding up to three sentences
+    assert len(texts) > 3
+    assert ''.join(texts).count('.') == 3
+    assert fake_openai.requests == 1
+
+
+def test_first_event_arrives_before_the_completion_ends(gpt_app, fake_openai):
+    fake_openai.token_interval = 0.05
+    start = time.perf_counter()
+    response = gpt_app.test_client().get(STREAM_PATH, buffered=False)
+    chunks = iter(response.response)
+    first = next(chunks)
+    first_at = time.perf_counter() - start
+    rest = b''.join(chunks)
+    total = time.perf_counter() - start
+    response.close()
+
+    assert first.startswith(b'data: ')
+    assert b'event: done' in rest
+    assert first_at < total / 2
+
+
+def test_upstream_failure_before_the_first_token(gpt_app, fake_openai):
+    fake_openai.error_rate = 1.0
+    client = gpt_app.test_client()
+    response = client.get(STREAM_PATH)
+    assert response.status_code == 503
+    assert response.get_json()['fallback_available']
+
+    response = client.get(STREAM_PATH + '&fallback=template')
+    assert response.status_code == 200
+    assert response.headers['X-Butter-Fallback'] == 'template'
+    events = parse_events(response.get_data())
+    assert events[0][0] == 'fallback'
+    assert events[1][1]['text']
+    assert events[-1] == ('done', {})
@@ -0,0 +1,32 @@
+from flask import Flask
+
+from app import app
+from static_pages import PageCache
+
+
+def test_pages_are_shared_across_hosts():
+    client = app.test_client()
+    first = client.get('/', headers={'Host': 'example.com'})
+    second = client.get('/', headers={'Host': 'attacker.invalid'})
+    assert first.status_code == second.status_code == 200
+    assert first.headers['ETag'] == second.headers['ETag']
+    assert b'attacker.invalid' not in second.get_data()
+
+
+def test_canonical_links_use_the_site_url():
+    cache = PageCache(Flask(__name__, root_path=app.root_path), site_url='https://butter.example')
+    with cache.app.test_request_context('/', base_url='http://other.invalid/'):
+        body = cache.respond('api.html').get_data()
+    assert b'<link rel="canonical" href="https://butter.example/api/docs">' in body
+
+
+def test_warm_renders_pages_before_the_first_request(monkeypatch):
+    import static_pages
+
+    cache = PageCache(Flask(__name__, root_path=app.root_path))
+    cache.warm(['index.html', 'api.html'])
+    monkeypatch.setattr(static_pages, 'render_template', None)
+    with cache.app.test_request_context('/'):
+        response = cache.respond('api.html')
+    assert response.status_code == 200
+    assert b'<link rel="canonical" href="/api/docs">' in response.get_data()
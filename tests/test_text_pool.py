@@ -0,0 +1,49 @@
+from text_pool import TextPool
+
+
+def make_pool(items):
+    pool = TextPool(low=0, high=10, interval=3600)
+    pool.register('key', lambda n: [])
+    pool._buffers['key'].extend(items)
+    return pool
+
+
+def test_take_serves_from_the_buffer():
+    pool = make_pool(['a', 'b', 'c'])
+    assert pool.take('key', 2) == ['a', 'b']
+    assert list(pool._buffers['key']) == ['c']
+
+
+def test_short_take_keeps_pooled_items_and_fills_the_rest():
+    pool = make_pool(['a', 'b'])
+    requested = []
+
+    def fill(n):
+        requested.append(n)
+        return ['x'] * n
+
+    assert pool.take('key', 5, fill=fill) == ['a', 'b', 'x', 'x', 'x']
+    assert requested == [3]
+    assert not pool._buffers['key']
+
+
+def test_short_take_without_fill_puts_items_back():
+    pool = make_pool(['a', 'b'])
+    assert pool.take('key', 5) is None
+    assert list(pool._buffers['key']) == ['a', 'b']
+
+
+def test_refill_is_not_counted_as_generation_latency():
+    from metrics import generation_duration, text_pool_refill_duration
+    from text_generator import ButterTextGenerator
+    from text_pool import register_template_pools
+
+    pool = TextPool(low=4, high=8, interval=3600)
+    register_template_pools(pool, ButterTextGenerator(seed=1))
+    generations = generation_duration.snapshot()
+    refills = sum(text_pool_refill_duration.snapshot().get(('template',), [0])[:-1])
+    pool.refill()
+    assert len(pool._buffers[('template', 'sentence')]) == 8
+    assert generation_duration.snapshot() == generations
+    # Each of the three modes is filled in one call
+    assert sum(text_pool_refill_duration.snapshot()[('template',)][:-1]) == refills + 3
@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+from text_generator import ButterTextGenerator
+from tweet_composer import (TWEET_LIMIT, ThreadComposer, pack_lengths, pack_sentences, thread_suffix,
+                            validate_thread, weighted_length)
+
+
+def partitions(items):
+    """Every way of splitting items into unordered, non-empty groups"""
+    if not items:
+        yield []
+        return
+    first, rest = items[0], items[1:]
+    for groups in partitions(rest):
+        yield [[first]] + groups
+        for i in range(len(groups)):
+            yield groups[:i] + [[first] + groups[i]] + groups[i + 1:]
+
+
+def post_length(lengths, group, index, total):
+    return sum(lengths[i] for i in group) + len(group) - 1 + len(thread_suffix(index, total))
+
+
+def fewest_posts(lengths, limit):
+    """Brute force: the smallest thread any ordering of any grouping fits in"""
+    best = None
+    for groups in partitions(list(range(len(lengths)))):
+        total = len(groups)
+        if best is not None and total >= best:
+            continue
+        # Posts take the suffix of their position; all suffixes of a thread this small are equally long
+        if all(post_length(lengths, group, 1, total) <= limit for group in groups):
+            best = total
+    return best
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_packing_matches_brute_force(seed):
+    rng = random.Random(seed)
+    limit = rng.randint(30, 60)
+    # Short enough to fit in a post with its suffix on their own
+    lengths = [rng.randint(2, limit - len(thread_suffix(7, 7))) for _ in range(rng.randint(1, 7))]
+
+    groups = pack_lengths(lengths, limit)
+    assert sorted(i for group in groups for i in group) == list(range(len(lengths)))
+    for index, group in enumerate(groups, 1):
+        assert post_length(lengths, group, index, len(groups)) <= limit
+    assert len(groups) == fewest_posts(lengths, limit)
+
+
+def test_suffix_overhead_can_need_another_post():
+    # 140 + 1 + 139 fits exactly in one post, one more character doesn't
+    assert len(pack_lengths([140, 139])) == 1
+    assert len(pack_lengths([140, 140])) == 2
+    # Three 92s fit in one unnumbered post (278), but not in a numbered one (284)
+    assert len(pack_lengths([92, 92, 92])) == 1
+    assert len(pack_lengths([92] * 6)) == 3
+
+
+def test_sentence_too_long_for_a_numbered_post():
+    with pytest.raises(ValueError):
+        pack_lengths([275, 10])
+
+
+def test_weighted_length():
+    assert weighted_length("Butter melts.") == 13
+    assert weighted_length("バター") == 6
+    assert weighted_length("Crème brûlée") == 12
+
+
+def test_validate_thread_counts_weighted_length():
+    validate_thread(["バ" * 139 + "."])
+    with pytest.raises(ValueError, match="281 characters, over the 280 limit"):
+        validate_thread(["バ" * 140 + "."])
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_packed_template_sentences_are_minimal(seed):
+    generator = ButterTextGenerator(seed=seed)
+    sentences = [sentence for sentence, _ in generator.templates.sentences_with_lengths(8, 'chars', generator.rng)]
+    tweets = pack_sentences(sentences)
+    validate_thread(tweets)
+    assert len(tweets) == fewest_posts([weighted_length(sentence) for sentence in sentences], TWEET_LIMIT)
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_composed_threads_are_postable(seed):
+    tweets = ThreadComposer(ButterTextGenerator(seed=seed)).compose()
+    validate_thread(tweets)
+    assert 1 <= len(tweets) <= 8
+    assert all(weighted_length(tweet) <= TWEET_LIMIT for tweet in tweets)
+
+
+def test_pack_sentences_numbers_posts():
+    sentences = [f"Sentence number {i} is about butter." for i in range(12)]
+    tweets = pack_sentences(sentences)
+    validate_thread(tweets)
+    assert len(tweets) == 2
+    assert tweets[0].endswith(" (1/2)") and tweets[1].endswith(" (2/2)")
+    # Every sentence appears once, whole
+    assert all(sum(tweet.count(sentence) for tweet in tweets) == 1 for sentence in sentences)
@@ -0,0 +1,86 @@
+import pytest
+from tweepy.errors import TweepyException
+
+from fake_twitter import FakeTwitterClient
+from leader_election import FileLeaderLock
+from twitter_bot import create_twitter_bot
+
+
+@pytest.fixture
+def make_bot(tmp_path, monkeypatch):
+    """Build bots with FakeTwitterClients that elect a leader through a lock in tmp_path"""
+    monkeypatch.setenv('LEADER_RETRY_SECONDS', '0')
+    monkeypatch.setenv('LEADER_CHECK_SECONDS', '0')
+    bots = []
+
+    def make(client=None):
+        bot = create_twitter_bot(client=client or FakeTwitterClient(),
+                                 leader_lock=FileLeaderLock('twitter-scheduler', str(tmp_path)))
+        bots.append(bot)
+        return bot
+
+    yield make
+    for bot in bots:
+        bot.election.stop()
+        bot.stop_scheduled_posts()
+
+
+def test_only_the_leader_schedules_posts(make_bot):
+    leader = make_bot()
+    follower = make_bot()
+    assert leader.election.is_leader
+    assert leader.scheduler is not None and leader.scheduler.running
+    assert not follower.election.is_leader
+    assert follower.scheduler is None
+    # A process that lost the election skips the job even if it were run
+    assert follower.scheduled_post() == (False, "Not the leader")
+    assert follower.client.tweets == []
+
+
+def test_scheduled_post_goes_through_the_fake_client(make_bot):
+    bot = make_bot()
+    thread = list(bot.next_thread)
+    ok, _ = bot.scheduled_post()
+    assert ok
+    assert [tweet['text'] for tweet in bot.client.tweets] == thread
+    # The thread after it is prepared right away
+    assert bot.next_thread and bot.next_thread != thread
+
+
+def test_api_failure_on_the_first_tweet_keeps_the_thread(make_bot):
+    client = FakeTwitterClient(fail_after=0, error=TweepyException("over capacity"))
+    bot = make_bot(client)
+    thread = bot.next_thread
+    ok, message = bot.post_to_twitter()
+    assert not ok
+    assert message == "Twitter API error: over capacity"
+    assert client.tweets == []
+    # Nothing went live, so the same thread is posted next time
+    assert bot.next_thread == thread
+
+    client.fail_after = None
+    assert bot.post_to_twitter()[0]
+    assert [tweet['text'] for tweet in client.tweets] == thread
+
+
+def test_api_failure_mid_thread_uses_the_thread_up(make_bot):
+    client = FakeTwitterClient(fail_after=1, error=TweepyException("over capacity"))
+    bot = make_bot(client)
+    bot.next_thread = ["First sentence. (1/2)", "Second sentence. (2/2)"]
+    ok, message = bot.post_to_twitter()
+    assert not ok
+    assert message == "Twitter API error in thread: over capacity"
+    assert [tweet['text'] for tweet in client.tweets] == ["First sentence. (1/2)"]
+    # Part of it is live, so a new thread is prepared rather than reposting it
+    assert bot.next_thread and bot.next_thread[0] != "First sentence. (1/2)"
+
+
+def test_thread_lands_in_order_as_a_reply_chain(make_bot):
+    bot = make_bot()
+    bot.next_thread = ["Butter melts. (1/3)", "Toast crisps. (2/3)", "Scones rise. (3/3)"]
+    assert bot.post_to_twitter()[0]
+    tweets = bot.client.tweets
+    assert [tweet['text'] for tweet in tweets] == ["Butter melts. (1/3)", "Toast crisps. (2/3)", "Scones rise. (3/3)"]
+    assert tweets[0]['in_reply_to_tweet_id'] is None
+    assert [tweet['in_reply_to_tweet_id'] for tweet in tweets[1:]] == [tweet['id'] for tweet in tweets[:-1]]
+    assert bot.client.threads() == [[tweet['text'] for tweet in tweets]]
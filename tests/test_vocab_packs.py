@@ -0,0 +1,58 @@
+import json
+import os
+import random
+
+import pytest
+
+from vocab_packs import VocabRegistry
+
+
+def write(path, words, patterns, mtime_ns):
+    path.write_text(json.dumps({'name': path.stem, 'words': words, 'patterns': patterns}))
+    # Set the mtime explicitly; rewrites within one timestamp tick would look unchanged
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def vocab_dir(tmp_path):
+    write(tmp_path / 'main.json', {'nouns': ['butter']}, ['Plain {nouns}.'], 1_000_000_000)
+    write(tmp_path / 'toast.json', {'nouns': ['toast']}, ['Warm {nouns}.'], 1_000_000_000)
+    return tmp_path
+
+
+def test_edited_pack_is_swapped_in(vocab_dir):
+    registry = VocabRegistry(str(vocab_dir), default='main', reload_interval=0)
+    before = registry.get('toast')
+    assert before.sentences(1, random.Random(1)) == ['Warm toast.']
+    assert registry.reload() == []
+
+    write(vocab_dir / 'toast.json', {'nouns': ['crumpet']}, ['Hot {nouns}.'], 2_000_000_000)
+    assert registry.reload() == ['toast']
+    assert registry.get('toast').sentences(1, random.Random(1)) == ['Hot crumpet.']
+    # Whoever still holds the old version keeps a working copy of it
+    assert before.sentences(1, random.Random(1)) == ['Warm toast.']
+    assert before.fingerprint != registry.get('toast').fingerprint
+
+
+def test_broken_pack_keeps_the_last_good_version(vocab_dir, caplog):
+    registry = VocabRegistry(str(vocab_dir), default='main', reload_interval=0)
+    good = registry.get('toast')
+
+    (vocab_dir / 'toast.json').write_text('{"words": {"nouns": ["half a')
+    os.utime(vocab_dir / 'toast.json', ns=(2_000_000_000, 2_000_000_000))
+    assert registry.reload() == []
+    assert registry.get('toast') is good
+    assert 'Could not load vocabulary pack' in caplog.text
+
+    write(vocab_dir / 'toast.json', {'nouns': ['bagel']}, ['A {nouns}.'], 3_000_000_000)
+    assert registry.reload() == ['toast']
+    assert registry.get('toast').sentences(1, random.Random(1)) == ['A bagel.']
+
+
+def test_removed_pack_is_dropped_but_the_default_stays(vocab_dir):
+    registry = VocabRegistry(str(vocab_dir), default='main', reload_interval=0)
+    os.remove(vocab_dir / 'toast.json')
+    os.remove(vocab_dir / 'main.json')
+    assert registry.reload() == ['toast']
+    assert registry.names() == ['main']
+    assert registry.get() is not None
@@ -1,139 +1,330 @@
+import functools
 import random
 import logging
 import os
-from openai import OpenAI
-from butter_words import BUTTER_WORDS, SENTENCE_PATTERNS
-from gpt_prompts import create_system_prompt, create_user_prompt, DEFAULT_TUNING_PARAMS
+import re
+import time
+from vocab_packs import vocab_registry
+from admission import CircuitOpenError, QueueFullError
+from gpt_cache import gpt_cache
+from gpt_dispatch import gpt_dispatcher
+from gpt_prompts import completion_token_budget, create_system_prompt, create_user_prompt, DEFAULT_TUNING_PARAMS
+from metrics import generation_duration, record_error
+from markov_engine import explore_from_tuning, get_markov_model
 
 logger = logging.getLogger(__name__)
 
+# Number of units produced per batch by the streaming iterators
+STREAM_BATCH_SIZE = 512
+
+def save_to_corpus(text):
+    """Append GPT output to GPT_CORPUS_PATH, if set, for training the n-gram engine"""
+    corpus_path = os.environ.get("GPT_CORPUS_PATH")
+    if not corpus_path:
+        return
+    try:
+        with open(corpus_path, 'a', encoding='utf-8') as f:
+            f.write(text.strip() + "\n\n")
+    except OSError as e:
+        logger.warning(f"Could not save GPT output to corpus: {str(e)}")
+
+# GPT returns one text blob; these recover its unit boundaries
+GPT_PARAGRAPH_SPLIT = re.compile(r'\n\s*\n')
+GPT_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+GPT_LIST_MARKER = re.compile(r'^\s*(?:[-*\u2022]|\d+[.)])\s*')
+
+def split_gpt_text(text, mode):
+    """Split GPT output into a list of words, sentences or paragraphs"""
+    if mode == 'paragraph':
+        return [p.strip() for p in GPT_PARAGRAPH_SPLIT.split(text) if p.strip()]
+    lines = [GPT_LIST_MARKER.sub('', line).strip() for line in text.splitlines()]
+    if mode == 'sentence':
+        return [s for line in lines if line for s in GPT_SENTENCE_SPLIT.split(line)]
+    return [word for line in lines for word in line.split()]
+
+def gpt_error(e):
+    """Log a failed GPT call and return a ValueError with a message fit for users"""
+    error_msg = str(e)
+    logger.error(f"Error during GPT text generation: {error_msg}")
+    record_error('gpt', e)
+    if isinstance(e, CircuitOpenError):
+        return ValueError("GPT generation is temporarily paused after repeated OpenAI errors. Please try again shortly.")
+    elif isinstance(e, QueueFullError):
+        return ValueError("Too many GPT requests are waiting. Please try again in a few moments.")
+    elif isinstance(e, TimeoutError):
+        return ValueError("OpenAI API took too long to respond. Please try again in a few moments.")
+    elif "insufficient_quota" in error_msg:
+        return ValueError("OpenAI API quota exceeded. Please try again later.")
+    elif "rate_limit" in error_msg:
+        return ValueError("OpenAI API rate limit reached. Please try again in a few moments.")
+    else:
+        return ValueError(f"GPT generation failed: {error_msg}")
+
+def timed_generation(mode):
+    """Record how long a generate_* method takes, by mode and engine"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                generation_duration.observe(time.perf_counter() - start, mode, self.engine)
+        return wrapper
+    return decorator
+
 class ButterTextGenerator:
-    def __init__(self, use_gpt=False, tuning_params=None):
-        self.words = BUTTER_WORDS
-        self.patterns = SENTENCE_PATTERNS
+    def __init__(self, use_gpt=False, tuning_params=None, seed=None, engine='template', pack=None):
+        # Vocabulary pack name; None follows the registry's default pack
+        self.pack = pack
+        if vocab_registry.get(pack) is None:
+            raise ValueError(f"Unknown vocabulary pack: {pack}")
+        # Each generator owns its RNG, so a seed reproduces output exactly and
+        # per-request generators never share state across threads
+        self.seed = seed
+        self.rng = random.Random(seed)
         self.use_gpt = use_gpt
         self.tuning_params = tuning_params or DEFAULT_TUNING_PARAMS
-        self.openai_client = None
+        self.dispatcher = None
+        self.markov_requested = engine == 'markov' and not use_gpt
         self.model = "gpt-4o-mini"  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024
         
-        logger.debug(f"Initializing ButterTextGenerator (GPT: {use_gpt})")
-        
-        # Initialize OpenAI client if using GPT
+        # GPT calls go through the shared async dispatcher
         if self.use_gpt:
-            try:
-                api_key = os.environ.get("OPENAI_API_KEY")
-                if not api_key:
-                    raise ValueError("OpenAI API key not found in environment variables")
-                
-                logger.debug("Initializing OpenAI client...")
-                self.openai_client = OpenAI(api_key=api_key)
-                logger.info("OpenAI client initialized successfully")
-                
-            except ValueError as ve:
-                logger.error(f"Configuration error: {str(ve)}")
-                self.use_gpt = False
-            except Exception as e:
-                logger.error(f"Unexpected error initializing OpenAI client: {str(e)}")
+            if gpt_dispatcher.available():
+                self.dispatcher = gpt_dispatcher
+            else:
+                logger.error("Configuration error: OpenAI API key not found in environment variables")
                 self.use_gpt = False
-        
-        logger.debug(f"Initialized ButterTextGenerator with {len(self.patterns)} patterns")
-        logger.debug(f"GPT generation: {'enabled' if self.use_gpt else 'disabled'}")
+
+    @property
+    def templates(self):
+        """The current compiled version of this generator's vocabulary pack"""
+        # Looked up per call, so a reloaded pack takes effect without new generators
+        # (a pack removed while in use falls back to the default)
+        return vocab_registry.get(self.pack) or vocab_registry.get()
+
+    @property
+    def words(self):
+        templates = self.templates
+        return dict(zip(templates.categories, templates.pools))
+
+    @property
+    def patterns(self):
+        return tuple(pattern.source for pattern in self.templates.patterns)
+
+    @property
+    def markov(self):
+        """The n-gram model, loaded on first use, or None if there is none"""
+        # Memory-mapped and shared process-wide
+        return get_markov_model() if self.markov_requested else None
+
+    @property
+    def engine(self):
+        """Name of the engine this generator currently uses"""
         if self.use_gpt:
-            logger.debug(f"Using model: {self.model}")
+            return 'gpt'
+        return 'markov' if self.markov is not None else 'template'
+
+    def _local_words(self, count, tuning_params=None):
+        if self.markov is not None:
+            return self.markov.words(count, self.rng, explore_from_tuning(tuning_params or self.tuning_params))
+        return self.templates.words(count, self.rng)
+
+    def _local_sentences(self, count, tuning_params=None):
+        if self.markov is not None:
+            return self.markov.sentences(count, self.rng, explore_from_tuning(tuning_params or self.tuning_params))
+        return self.templates.sentences(count, self.rng)
+
+    def _local_paragraphs(self, count, tuning_params=None):
+        if self.markov is not None:
+            return self.markov.paragraphs(count, self.rng, explore_from_tuning(tuning_params or self.tuning_params))
+        return self.templates.paragraphs(count, self.rng)
 
-    def generate_with_gpt(self, count, mode):
-        """Generate text using GPT model"""
-        if not self.openai_client:
+    def generate_with_gpt(self, count, mode, tuning_params=None):
+        """Generate text using GPT model, with per-call tuning parameters"""
+        if not self.dispatcher:
             logger.warning("OpenAI client not initialized")
             raise ValueError("GPT generation is not available - OpenAI client not initialized")
 
+        tuning_params = tuning_params or self.tuning_params
+        cache_key = gpt_cache.make_key(tuning_params, mode, count, self.model)
+        cached = gpt_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Serving cached GPT text for %s %s(s)", count, mode)
+            return cached
+
         try:
-            logger.debug(f"Preparing GPT generation for {count} {mode}(s)")
-            system_prompt = create_system_prompt(self.tuning_params)
-            user_prompt = create_user_prompt(count, mode)
-            
-            logger.debug(f"Sending request to OpenAI API using model {self.model}")
-            response = self.openai_client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=200 if mode == 'word' else 500 if mode == 'sentence' else 1000,
-                temperature=0.8
-            )
+            logger.debug("Sending request to OpenAI API using model %s", self.model)
+            text = self.dispatcher.complete(**self._gpt_call(count, mode, tuning_params))
             
-            text = response.choices[0].message.content
             logger.info(f"Successfully generated text using GPT ({len(text)} chars)")
+            gpt_cache.put(cache_key, text)
+            save_to_corpus(text)
             return text
             
         except Exception as e:
-            error_msg = str(e)
-            logger.error(f"Error during GPT text generation: {error_msg}")
-            if "insufficient_quota" in str(e):
-                raise ValueError("OpenAI API quota exceeded. Please try again later.")
-            elif "rate_limit" in str(e):
-                raise ValueError("OpenAI API rate limit reached. Please try again in a few moments.")
-            else:
-                raise ValueError(f"GPT generation failed: {str(e)}")
+            raise gpt_error(e)
+
+    async def generate_with_gpt_async(self, count, mode, tuning_params=None):
+        """Awaitable generate_with_gpt for async handlers; no thread waits on OpenAI"""
+        if not self.dispatcher:
+            logger.warning("OpenAI client not initialized")
+            raise ValueError("GPT generation is not available - OpenAI client not initialized")
 
-    def generate_sentence(self):
+        tuning_params = tuning_params or self.tuning_params
+        cache_key = gpt_cache.make_key(tuning_params, mode, count, self.model)
+        cached = gpt_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Serving cached GPT text for %s %s(s)", count, mode)
+            return cached
+
+        start = time.perf_counter()
+        try:
+            text = await self.dispatcher.complete_async(**self._gpt_call(count, mode, tuning_params))
+        except Exception as e:
+            raise gpt_error(e)
+        finally:
+            generation_duration.observe(time.perf_counter() - start, mode, 'gpt')
+
+        logger.info(f"Successfully generated text using GPT ({len(text)} chars)")
+        gpt_cache.put(cache_key, text)
+        save_to_corpus(text)
+        return text
+
+    def _gpt_call(self, count, mode, tuning_params):
+        """Dispatcher arguments for a GPT request"""
+        logger.debug("Preparing GPT generation for %s %s(s)", count, mode)
+        return {
+            'model': self.model,
+            'messages': [
+                {"role": "system", "content": create_system_prompt(tuning_params)},
+                {"role": "user", "content": create_user_prompt(count, mode)}
+            ],
+            'max_tokens': completion_token_budget(count, mode),
+            'temperature': 0.8,
+        }
+
+    def stream_with_gpt(self, count, mode, tuning_params=None):
+        """Yield GPT text as it is generated; a cached completion is yielded whole"""
+        if not self.dispatcher:
+            logger.warning("OpenAI client not initialized")
+            raise ValueError("GPT generation is not available - OpenAI client not initialized")
+
+        tuning_params = tuning_params or self.tuning_params
+        cache_key = gpt_cache.make_key(tuning_params, mode, count, self.model)
+        cached = gpt_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Serving cached GPT text for %s %s(s)", count, mode)
+            yield cached
+            return
+
+        parts = []
+        deltas = self.dispatcher.stream(**self._gpt_call(count, mode, tuning_params))
+        try:
+            for delta in deltas:
+                parts.append(delta)
+                yield delta
+        except Exception as e:
+            raise gpt_error(e)
+        finally:
+            # Closed early when the client goes away; this cancels the upstream call
+            deltas.close()
+
+        text = ''.join(parts)
+        logger.info(f"Successfully streamed text using GPT ({len(text)} chars)")
+        gpt_cache.put(cache_key, text)
+        save_to_corpus(text)
+
+    @timed_generation('sentence')
+    def generate_sentence(self, tuning_params=None):
         """Generate a single sentence"""
         if self.use_gpt:
-            return self.generate_with_gpt(1, "sentence")
+            return self.generate_with_gpt(1, "sentence", tuning_params)
         
         try:
-            pattern = random.choice(self.patterns)
-            logger.debug(f"Selected pattern: {pattern}")
-            
-            sentence = pattern.format(
-                adj=random.choice(self.words['adjectives']),
-                nouns=random.choice(self.words['nouns']),
-                verbs=random.choice(self.words['verbs']),
-                descriptions=random.choice(self.words['descriptions'])
-            )
-            # Ensure proper capitalization
-            return sentence[0].upper() + sentence[1:]
-        except KeyError as e:
-            logger.error(f"Missing word category: {str(e)}")
-            return "Error generating sentence: missing word category"
+            return self._local_sentences(1, tuning_params)[0]
         except Exception as e:
             logger.error(f"Error generating sentence: {str(e)}")
             return "Error generating sentence"
 
-    def generate_words(self, count):
+    @timed_generation('word')
+    def generate_words(self, count, tuning_params=None):
         """Generate a list of words"""
         if self.use_gpt:
-            return self.generate_with_gpt(count, "word")
+            return self.generate_with_gpt(count, "word", tuning_params)
         
-        words = []
-        categories = list(self.words.keys())
-        for _ in range(count):
-            category = random.choice(categories)
-            words.append(random.choice(self.words[category]))
-        return " ".join(words)
-
-    def generate_sentences(self, count):
+        return " ".join(self._local_words(count, tuning_params))
+
+    @timed_generation('sentence')
+    def generate_sentences(self, count, tuning_params=None):
         """Generate multiple sentences"""
         if self.use_gpt:
-            return self.generate_with_gpt(count, "sentence")
+            return self.generate_with_gpt(count, "sentence", tuning_params)
         
-        return " ".join([self.generate_sentence() for _ in range(count)])
+        return " ".join(self._local_sentences(count, tuning_params))
 
-    def generate_paragraphs(self, count):
+    @timed_generation('paragraph')
+    def generate_paragraphs(self, count, tuning_params=None):
         """Generate multiple paragraphs"""
         if self.use_gpt:
-            return self.generate_with_gpt(count, "paragraph")
+            return self.generate_with_gpt(count, "paragraph", tuning_params)
             
         try:
-            paragraphs = []
-            for _ in range(count):
-                # Generate 4-8 sentences per paragraph
-                num_sentences = random.randint(4, 8)
-                paragraph = self.generate_sentences(num_sentences)
-                paragraphs.append(paragraph)
-            logger.debug(f"Generated {count} paragraphs")
+            # Sentence counts (4-8 per paragraph) and all sentences are drawn in one batch
+            paragraphs = self._local_paragraphs(count, tuning_params)
+            logger.debug("Generated %s paragraphs", count)
             return "\n\n".join(paragraphs)
         except Exception as e:
             logger.error(f"Error generating paragraphs: {str(e)}")
             return "Error generating paragraphs"
+
+    def generate_units(self, count, mode, tuning_params=None, record=True):
+        """Generate count units of mode as a list, one string per word, sentence or paragraph
+
+        record=False leaves the call out of generation_duration, for work done
+        outside a request such as text pool refills.
+        """
+        start = time.perf_counter()
+        try:
+            if self.use_gpt:
+                return split_gpt_text(self.generate_with_gpt(count, mode, tuning_params), mode)
+            if mode == 'paragraph':
+                return self._local_paragraphs(count, tuning_params)
+            if mode == 'sentence':
+                return self._local_sentences(count, tuning_params)
+            return self._local_words(count, tuning_params)
+        finally:
+            if record:
+                generation_duration.observe(time.perf_counter() - start, mode, self.engine)
+
+    def generate_length(self, length, unit='chars'):
+        """Generate template text of exactly length characters or UTF-8 bytes"""
+        return self.templates.exact_length(length, unit, self.rng)
+
+    def iter_length(self, length, unit='chars'):
+        """Yield chunks of template text totalling exactly length units"""
+        return self.templates.iter_exact_length(length, unit, self.rng)
+
+    def iter_words(self, count, batch_size=STREAM_BATCH_SIZE):
+        """Yield lists of words in batches, for streaming large outputs"""
+        for size in self._batch_sizes(count, batch_size):
+            yield self._local_words(size)
+
+    def iter_sentences(self, count, batch_size=STREAM_BATCH_SIZE):
+        """Yield lists of sentences in batches, for streaming large outputs"""
+        for size in self._batch_sizes(count, batch_size):
+            yield self._local_sentences(size)
+
+    def iter_paragraphs(self, count, batch_size=STREAM_BATCH_SIZE // 8):
+        """Yield lists of paragraphs in batches, for streaming large outputs"""
+        for size in self._batch_sizes(count, batch_size):
+            yield self._local_paragraphs(size)
+
+    @staticmethod
+    def _batch_sizes(count, batch_size):
+        """Split count into batch-sized pieces"""
+        while count > 0:
+            size = min(count, batch_size)
+            yield size
+            count -= size
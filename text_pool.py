@@ -0,0 +1,148 @@
+"""
+Pool of pre-generated text, refilled in the background between requests
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from metrics import record_error, text_pool_refill_duration, text_pool_requests
+
+logger = logging.getLogger(__name__)
+
+MODES = ('paragraph', 'sentence', 'word')
+
+
+class TextPool:
+    """Per-key ring buffers of pre-generated text.
+
+    Each key (for example ``('template', 'paragraph')``) maps to a deque
+    bounded at its high watermark. ``take`` pops from the left without a
+    lock; deque appends and pops are atomic, so request threads never wait
+    on the refill thread. When a buffer falls below its low watermark the
+    refill thread wakes and tops it back up to the high watermark, using
+    the ``produce(n)`` callable registered for that key.
+    """
+
+    def __init__(self, low=64, high=256, interval=5.0):
+        self.low = low
+        self.high = high
+        self.interval = interval
+        self._buffers = {}
+        self._producers = {}  # key -> (produce, low, high)
+        self._wakeup = threading.Event()
+        self._worker_pid = None
+        self._start_lock = threading.Lock()
+
+    def register(self, key, produce, low=None, high=None):
+        """Keep a buffer for key, filled by produce(n) returning up to n items"""
+        low = self.low if low is None else low
+        high = self.high if high is None else high
+        self._producers[key] = (produce, low, high)
+        self._buffers[key] = deque(maxlen=high)
+
+    def take(self, key, count=1, fill=None):
+        """Pop count items for key, or return None if the pool can't serve them.
+
+        When the buffer holds fewer than count items, the ones it has are
+        kept and fill(n) generates the rest; without fill they go back in
+        the buffer and None is returned.
+        """
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            return None
+        self._ensure_worker()
+        items = []
+        try:
+            for _ in range(count):
+                items.append(buffer.popleft())
+            outcome = 'hit'
+        except IndexError:
+            if fill is not None and items:
+                items.extend(fill(count - len(items)))
+                outcome = 'partial'
+            else:
+                buffer.extendleft(reversed(items))
+                items = None
+                outcome = 'miss'
+        if len(buffer) < self._producers[key][1]:
+            self._wakeup.set()
+        text_pool_requests.inc(key[0], outcome)
+        return items
+
+    def _ensure_worker(self):
+        """Start the refill thread on first use in this process"""
+        # Compare pids so a worker forked from a preloaded app starts its own thread
+        if self._worker_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._worker_pid != os.getpid():
+                thread = threading.Thread(target=self._run, name="text-pool-refill", daemon=True)
+                thread.start()
+                self._worker_pid = os.getpid()
+                logger.debug("Started text pool refill thread")
+
+    def _run(self):
+        while True:
+            self.refill()
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def refill(self):
+        """Top up every buffer that is below its low watermark"""
+        for key, (produce, low, high) in list(self._producers.items()):
+            buffer = self._buffers[key]
+            if len(buffer) >= low:
+                continue
+            while len(buffer) < high:
+                start = time.perf_counter()
+                try:
+                    items = produce(high - len(buffer))
+                except Exception as e:
+                    # Leave this key for the next pass; a failing upstream shouldn't spin
+                    logger.warning(f"Text pool refill failed for {key}: {str(e)}")
+                    record_error('text_pool', e)
+                    break
+                finally:
+                    text_pool_refill_duration.observe(time.perf_counter() - start, key[0])
+                if not items:
+                    break
+                buffer.extend(items)
+
+    def stats(self):
+        """Return the number of buffered items per key"""
+        return {':'.join(str(part) for part in key): len(buffer)
+                for key, buffer in self._buffers.items()}
+
+
+def register_template_pools(pool, generator):
+    """Buffer template units for every mode; generator should be used only by the pool"""
+    for mode in MODES:
+        pool.register(('template', mode), lambda n, mode=mode: generator.generate_units(n, mode, record=False))
+
+
+def register_gpt_pools(pool, generator, counts, high=2):
+    """Buffer whole GPT completions for the default tuning profile and the given counts"""
+    for mode in MODES:
+        for count in counts:
+            pool.register(('gpt', mode, count),
+                          lambda n, mode=mode, count=count: [generator.generate_with_gpt(count, mode)],
+                          low=1, high=high)
+
+
+def create_text_pool():
+    """Create the process-wide text pool from environment settings, or None if disabled"""
+    if os.environ.get('TEXT_POOL_ENABLED', 'false').lower() != 'true':
+        return None
+    low = int(os.environ.get('TEXT_POOL_LOW', 64))
+    high = int(os.environ.get('TEXT_POOL_HIGH', 256))
+    interval = float(os.environ.get('TEXT_POOL_INTERVAL', 5))
+    logger.debug(f"Text pool: low={low}, high={high}, interval={interval}s")
+    return TextPool(low=low, high=max(low, high), interval=interval)
+
+
+def gpt_pool_counts():
+    """Counts to prefetch GPT completions for, from TEXT_POOL_GPT_COUNTS (e.g. "1,3")"""
+    counts = os.environ.get('TEXT_POOL_GPT_COUNTS', '')
+    return [int(count) for count in counts.split(',') if count.strip()]
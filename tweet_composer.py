@@ -0,0 +1,161 @@
+"""
+Compose tweet threads from whole sentences, packed into as few posts as possible
+"""
+import logging
+import math
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+TWEET_LIMIT = 280
+# Exact packing is tried up to this many sentences; longer inputs use first-fit decreasing
+EXACT_PACKING_LIMIT = 12
+# Rounds of redrawing sentences too long for a post before giving up
+MAX_DRAWS = 8
+SENTENCE_ENDINGS = ('.', '!', '?')
+# twitter-text v3 counts code points in these ranges once and all others (CJK, emoji) twice
+SINGLE_WEIGHT_RANGES = ((0, 4351), (8192, 8205), (8208, 8223), (8242, 8247))
+
+
+def weighted_length(text):
+    """Length of text as Twitter counts it against the post limit.
+
+    Emoji sequences are counted per code point, so this can only overcount.
+    """
+    if text.isascii():
+        return len(text)
+    return sum(1 if any(low <= ord(char) <= high for low, high in SINGLE_WEIGHT_RANGES) else 2
+               for char in unicodedata.normalize('NFC', text))
+
+
+def thread_suffix(index, total):
+    """Numbering appended to post index of total, empty for a single post"""
+    return f" ({index}/{total})" if total > 1 else ''
+
+
+def fit_bins(costs, capacities):
+    """Assign items to bins without exceeding any bin's capacity.
+
+    Returns a list of item indices per bin, or None if the items don't fit.
+    """
+    order = sorted(range(len(costs)), key=costs.__getitem__, reverse=True)
+    loads = [0] * len(capacities)
+    groups = [[] for _ in capacities]
+
+    if len(costs) > EXACT_PACKING_LIMIT:
+        for item in order:
+            for b, capacity in enumerate(capacities):
+                if loads[b] + costs[item] <= capacity:
+                    loads[b] += costs[item]
+                    groups[b].append(item)
+                    break
+            else:
+                return None
+        return groups
+
+    def place(k):
+        if k == len(order):
+            return True
+        item = order[k]
+        tried = set()
+        for b, capacity in enumerate(capacities):
+            # Bins with the same load and capacity are interchangeable; try one of them
+            if (loads[b], capacity) in tried or loads[b] + costs[item] > capacity:
+                continue
+            tried.add((loads[b], capacity))
+            loads[b] += costs[item]
+            groups[b].append(item)
+            if place(k + 1):
+                return True
+            loads[b] -= costs[item]
+            groups[b].pop()
+        return False
+
+    return groups if place(0) else None
+
+
+def pack_lengths(lengths, limit=TWEET_LIMIT):
+    """Group items of the given lengths into the fewest numbered posts.
+
+    Items in a post are joined by single spaces, and every post of a thread
+    ends with its " (i/n)" suffix. Returns a list of item indices per post.
+    Raises ValueError if an item can't fit in a post on its own.
+    """
+    if not lengths:
+        return []
+    if sum(lengths) + len(lengths) - 1 <= limit:
+        return [list(range(len(lengths)))]
+
+    # Each item costs its length plus a joining space; a post's first item
+    # has none, so every post gets one unit of room back
+    costs = [length + 1 for length in lengths]
+    total = max(2, math.ceil(sum(costs) / (limit + 1)))
+    while total <= len(lengths):
+        capacities = [limit - len(thread_suffix(i, total)) + 1 for i in range(1, total + 1)]
+        groups = fit_bins(costs, capacities)
+        if groups is not None:
+            for group in groups:
+                group.sort()
+            if len(set(capacities)) == 1:
+                # Posts are interchangeable, so keep sentences roughly in their drawn order
+                groups.sort(key=lambda group: group[0])
+            return groups
+        total += 1
+    raise ValueError(f"A {max(lengths)}-character sentence doesn't fit in a {limit}-character post")
+
+
+def pack_sentences(sentences, limit=TWEET_LIMIT):
+    """Pack whole sentences into the fewest posts, numbered " (i/n)" when there is more than one"""
+    groups = pack_lengths([weighted_length(sentence) for sentence in sentences], limit)
+    return [' '.join(sentences[i] for i in group) + thread_suffix(index, len(groups))
+            for index, group in enumerate(groups, 1)]
+
+
+def validate_thread(tweets, limit=TWEET_LIMIT):
+    """Raise ValueError unless tweets is a postable thread of whole sentences"""
+    if not tweets:
+        raise ValueError("Thread has no posts")
+    for index, tweet in enumerate(tweets, 1):
+        suffix = thread_suffix(index, len(tweets))
+        length = weighted_length(tweet)
+        if length > limit:
+            raise ValueError(f"Post {index} is {length} characters, over the {limit} limit")
+        if not tweet.endswith(suffix):
+            raise ValueError(f"Post {index} is missing its {suffix.strip()} numbering")
+        body = tweet[:len(tweet) - len(suffix)]
+        if not body.strip():
+            raise ValueError(f"Post {index} is empty")
+        if not body.endswith(SENTENCE_ENDINGS):
+            raise ValueError(f"Post {index} ends mid-sentence")
+
+
+class ThreadComposer:
+    """Draw template sentences with their lengths and pack them into a thread.
+
+    Lengths come from the compiled templates' length tables, in characters,
+    which is how Twitter counts the Latin-script text of the packs.
+    """
+
+    def __init__(self, generator, limit=TWEET_LIMIT, min_sentences=1, max_sentences=8):
+        self.generator = generator
+        self.limit = limit
+        self.min_sentences = min_sentences
+        self.max_sentences = max_sentences
+
+    def compose(self, sentence_count=None):
+        """Return the posts of a new thread of sentence_count sentences (default: random)"""
+        rng = self.generator.rng
+        count = sentence_count or rng.randint(self.min_sentences, self.max_sentences)
+        # Anything longer couldn't go in a numbered post even on its own
+        longest = self.limit - len(thread_suffix(count, count))
+        templates = self.generator.templates
+        sentences = []
+        for _ in range(MAX_DRAWS):
+            for sentence, length in templates.sentences_with_lengths(count - len(sentences), 'chars', rng):
+                if length <= longest:
+                    sentences.append(sentence)
+            if len(sentences) == count:
+                tweets = pack_sentences(sentences, self.limit)
+                logger.debug("Packed %s sentences into %s post(s)", count, len(tweets))
+                return tweets
+        raise ValueError(f"Could not draw {count} sentences that fit in a {self.limit}-character post")
@@ -1,18 +1,45 @@
 import logging
-import tweepy
 import os
-import random # Added for random.randint
-from datetime import datetime
-from pytz import timezone
-from apscheduler.schedulers.background import BackgroundScheduler
+import threading
+import time
 from text_generator import ButterTextGenerator
+from tweet_composer import ThreadComposer, validate_thread
+from leader_election import create_leader_lock, elect_leader
+from metrics import twitter_job_duration
 
 logger = logging.getLogger(__name__)
 
+TWITTER_CREDENTIAL_VARS = (
+    'TWITTER_API_KEY',
+    'TWITTER_API_SECRET',
+    'TWITTER_ACCESS_TOKEN',
+    'TWITTER_ACCESS_TOKEN_SECRET',
+)
+
+def twitter_bot_enabled():
+    """Return True if the bot is not switched off and credentials are configured"""
+    if os.environ.get('TWITTER_BOT_ENABLED', 'true').lower() == 'false':
+        return False
+    return all(os.environ.get(name) for name in TWITTER_CREDENTIAL_VARS)
+
 class ButterTwitterBot:
-    def __init__(self):
+    def __init__(self, client=None):
         self.text_generator = ButterTextGenerator()
-        self.scheduler = BackgroundScheduler()
+        self.composer = ThreadComposer(self.text_generator)
+        # Composed ahead of the schedule, so posting time only makes API calls
+        self.next_thread = None
+        self._post_lock = threading.Lock()
+        # Created only in the leader process, see schedule_daily_posts
+        self.scheduler = None
+        self.election = None
+
+        # Use an injected client (e.g. FakeTwitterClient) if one is given
+        if client is not None:
+            self.client = client
+            return
+
+        # The Twitter SDK is only loaded when a real client is needed
+        import tweepy
 
         # Initialize Twitter client using v2 API
         try:
@@ -27,53 +54,52 @@ class ButterTwitterBot:
             logger.error(f"Failed to initialize Twitter client: {str(e)}")
             raise
 
-    def generate_daily_post(self):
-        """Generate random number of butter-themed sentences (1-8)"""
+    def prepare_next_thread(self):
+        """Compose and validate the next thread of 1-8 sentences, packed into the fewest posts"""
         try:
-            # Generate random number of sentences between 1 and 8
-            num_sentences = random.randint(1, 8)
-            text = self.text_generator.generate_sentences(num_sentences)
-            return text
+            tweets = self.composer.compose()
+            validate_thread(tweets)
         except Exception as e:
-            logger.error(f"Error generating daily post: {str(e)}")
+            logger.error(f"Error preparing next thread: {str(e)}")
             return None
-
-    def split_text_into_tweets(self, text, max_length=275):  # 275 to leave room for thread numbering
-        """Split long text into multiple tweets"""
-        words = text.split()
-        tweets = []
-        current_tweet = []
-        current_length = 0
-
-        for word in words:
-            # +1 for the space between words
-            if current_length + len(word) + 1 <= max_length:
-                current_tweet.append(word)
-                current_length += len(word) + 1
-            else:
-                tweets.append(' '.join(current_tweet))
-                current_tweet = [word]
-                current_length = len(word) + 1
-
-        if current_tweet:
-            tweets.append(' '.join(current_tweet))
-
-        # Add thread numbering
-        total = len(tweets)
-        if total > 1:
-            tweets = [f"{tweet} ({i+1}/{total})" for i, tweet in enumerate(tweets)]
-
+        self.next_thread = tweets
+        logger.info(f"Prepared next thread of {len(tweets)} post(s)")
         return tweets
 
+    def generate_daily_post(self):
+        """Return the text of the next thread to be posted, composing it if needed"""
+        tweets = self.next_thread or self.prepare_next_thread()
+        return '\n\n'.join(tweets) if tweets else None
+
     def post_to_twitter(self):
         """Post the generated text to Twitter using v2 API, creating a thread if needed"""
+        start = time.perf_counter()
+        result = (False, "Twitter job did not complete")
         try:
-            text = self.generate_daily_post()
-            if not text:
-                return False, "Failed to generate text for Twitter post"
+            result = self._post_thread()
+            return result
+        finally:
+            outcome = 'success' if result[0] else 'failure'
+            twitter_job_duration.observe(time.perf_counter() - start, outcome)
+
+    def _post_thread(self):
+        """Post the prepared thread, then prepare the one after it"""
+        with self._post_lock:
+            result = self._post_next_thread()
+        if self.next_thread is None:
+            self.prepare_next_thread()
+        return result
+
+    def _post_next_thread(self):
+        try:
+            from tweepy.errors import TweepyException
+        except ImportError:  # only an injected client can be used without the SDK
+            TweepyException = Exception
 
-            # Split text into tweet-sized chunks
-            tweets = self.split_text_into_tweets(text)
+        try:
+            tweets = self.next_thread or self.prepare_next_thread()
+            if not tweets:
+                return False, "Failed to generate text for Twitter post"
 
             # Post the first tweet
             try:
@@ -81,11 +107,13 @@ class ButterTwitterBot:
                 if not response.data:
                     logger.error("Failed to post initial tweet")
                     return False, "Failed to post initial tweet: No response data received"
-            except tweepy.errors.TweepyException as te:
+            except TweepyException as te:
                 error_msg = f"Twitter API error: {str(te)}"
                 logger.error(error_msg)
                 return False, error_msg
 
+            # Once any of it is live the thread is used up, even if a reply fails
+            self.next_thread = None
             previous_tweet_id = response.data['id']
             logger.info(f"Posted initial tweet with ID: {previous_tweet_id}")
 
@@ -101,7 +129,7 @@ class ButterTwitterBot:
                         return False, "Failed to post thread reply: No response data received"
                     previous_tweet_id = response.data['id']
                     logger.info(f"Posted thread reply with ID: {previous_tweet_id}")
-                except tweepy.errors.TweepyException as te:
+                except TweepyException as te:
                     error_msg = f"Twitter API error in thread: {str(te)}"
                     logger.error(error_msg)
                     return False, error_msg
@@ -115,12 +143,19 @@ class ButterTwitterBot:
     def schedule_daily_posts(self):
         """Schedule daily posts at 9am PT"""
         try:
+            self.prepare_next_thread()
+
+            from apscheduler.schedulers.background import BackgroundScheduler
+            from pytz import timezone
+
+            self.scheduler = BackgroundScheduler()
+
             # Configure scheduler to use PT timezone
             pt_timezone = timezone('US/Pacific')
 
             # Schedule job to run at 9am PT
             self.scheduler.add_job(
-                self.post_to_twitter,
+                self.scheduled_post,
                 'cron',
                 hour=9,
                 minute=0,
@@ -135,12 +170,28 @@ class ButterTwitterBot:
             logger.error(f"Error scheduling daily posts: {str(e)}")
             return False
 
-def create_twitter_bot():
-    """Create and initialize the Twitter bot"""
+    def stop_scheduled_posts(self):
+        """Stop the scheduler, when this process is no longer leader"""
+        if self.scheduler is not None:
+            self.scheduler.shutdown(wait=False)
+            self.scheduler = None
+            logger.info("Stopped scheduled Twitter posts")
+
+    def scheduled_post(self):
+        """The scheduled job: post only if this process is still the leader"""
+        if self.election is not None and not self.election.check():
+            logger.warning("Skipped scheduled Twitter post: no longer the leader")
+            return False, "Not the leader"
+        return self.post_to_twitter()
+
+def create_twitter_bot(client=None, leader_lock=None):
+    """Create the Twitter bot; only the elected leader process schedules posts"""
     try:
-        bot = ButterTwitterBot()
-        success = bot.schedule_daily_posts()
-        return bot if success else None
+        bot = ButterTwitterBot(client=client)
+        lock = leader_lock or create_leader_lock('twitter-scheduler')
+        bot.leader_lock = lock
+        bot.election = elect_leader(lock, bot.schedule_daily_posts, on_lost=bot.stop_scheduled_posts)
+        return bot
     except Exception as e:
         logger.error(f"Error creating Twitter bot: {str(e)}")
-        return None
\ No newline at end of file
+        return None
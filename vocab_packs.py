@@ -0,0 +1,164 @@
+"""
+Vocabulary packs: JSON word lists and sentence patterns, compiled and hot-swapped
+
+A pack is vocab/<name>.json:
+
+    {"name": "butter", "description": "...",
+     "words": {"nouns": [...], "verbs": [...], ...},
+     "patterns": ["The {adj} butter {verbs} {descriptions}.", ...]}
+
+An optional vocab/<name>.grammar.json, written by compile_grammar.py,
+restricts each pattern slot to the words that fit it grammatically.
+
+Packs are compiled into immutable CompiledTemplates. A background thread
+polls the pack files and recompiles any that change; the new version
+replaces the old with a single reference swap, so requests already using
+the old version finish with it and nothing blocks.
+"""
+import json
+import logging
+import os
+import threading
+
+from template_engine import CompiledTemplates
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VOCAB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vocab')
+DEFAULT_PACK = 'butter'
+
+
+def grammar_path(path):
+    """Path of the compiled grammar table that goes with a pack file"""
+    return os.path.splitext(path)[0] + '.grammar.json'
+
+
+def pack_mtime(path):
+    """Modification times of a pack file and its grammar table, if any"""
+    try:
+        grammar_mtime = os.stat(grammar_path(path)).st_mtime_ns
+    except FileNotFoundError:
+        grammar_mtime = None
+    return os.stat(path).st_mtime_ns, grammar_mtime
+
+
+def load_pack(path, name=None):
+    """Read and compile one pack file, with its grammar table if there is one"""
+    with open(path, encoding='utf-8') as f:
+        pack = json.load(f)
+    if not isinstance(pack.get('words'), dict) or not isinstance(pack.get('patterns'), list):
+        raise ValueError(f"{path} must contain a 'words' object and a 'patterns' list")
+    grammar = None
+    try:
+        with open(grammar_path(path), encoding='utf-8') as f:
+            grammar = json.load(f)
+    except FileNotFoundError:
+        pass
+    except ValueError as e:
+        logger.error(f"Ignoring unreadable grammar table for {path}: {str(e)}")
+    return CompiledTemplates(pack['words'], pack['patterns'], name=name or pack.get('name'), grammar=grammar)
+
+
+def find_pack_files(vocab_dir):
+    """Return {name: path} for every pack file in vocab_dir"""
+    files = {}
+    for filename in sorted(os.listdir(vocab_dir)):
+        name, ext = os.path.splitext(filename)
+        # Skip derived files such as butter.grammar.json
+        if ext == '.json' and '.' not in name:
+            files[name] = os.path.join(vocab_dir, filename)
+    return files
+
+
+class VocabRegistry:
+    """Compiled packs by name, reloaded from vocab_dir when their files change"""
+
+    def __init__(self, vocab_dir=DEFAULT_VOCAB_DIR, default=DEFAULT_PACK, reload_interval=10.0):
+        self.vocab_dir = vocab_dir
+        self.default = default
+        self.reload_interval = reload_interval
+        # Replaced wholesale on reload, never mutated, so readers need no lock
+        self._packs = {}
+        self._mtimes = {}
+        self._reload_lock = threading.Lock()
+        self._watcher_pid = None
+        self.reload()
+        if self.default not in self._packs:
+            raise ValueError(f"Default vocabulary pack {self.default!r} not found in {vocab_dir}")
+
+    def pack_files(self):
+        return find_pack_files(self.vocab_dir)
+
+    def reload(self):
+        """Recompile packs whose files changed, then swap them in; returns changed names"""
+        with self._reload_lock:
+            packs = dict(self._packs)
+            mtimes = dict(self._mtimes)
+            files = self.pack_files()
+            changed = []
+            for name, path in files.items():
+                mtime = pack_mtime(path)
+                if mtimes.get(name) == mtime:
+                    continue
+                try:
+                    packs[name] = load_pack(path, name)
+                except (OSError, ValueError) as e:
+                    # Keep serving the last good version of a broken pack
+                    logger.error(f"Could not load vocabulary pack {path}: {str(e)}")
+                    continue
+                mtimes[name] = mtime
+                changed.append(name)
+            for name in set(packs) - set(files) - {self.default}:
+                del packs[name]
+                mtimes.pop(name, None)
+                changed.append(name)
+            self._packs = packs
+            self._mtimes = mtimes
+        if changed:
+            logger.info(f"Loaded vocabulary packs: {', '.join(sorted(changed))}")
+        return changed
+
+    def get(self, name=None):
+        """Return the current compiled pack, or None if there is no such pack"""
+        self._ensure_watcher()
+        return self._packs.get(name or self.default)
+
+    def names(self):
+        return sorted(self._packs)
+
+    def _ensure_watcher(self):
+        """Start the reload thread on first use in this process"""
+        if self.reload_interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        with self._reload_lock:
+            if self._watcher_pid != os.getpid():
+                threading.Thread(target=self._watch, name="vocab-reload", daemon=True).start()
+                self._watcher_pid = os.getpid()
+
+    def _watch(self):
+        stopped = threading.Event()
+        while not stopped.wait(self.reload_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"Vocabulary reload failed: {str(e)}")
+
+
+def require_grammar(registry):
+    """Raise unless the default pack has a grammar table compiled from its current words and patterns"""
+    if not registry.get().grammar:
+        path = grammar_path(os.path.join(registry.vocab_dir, f'{registry.default}.json'))
+        raise ValueError(f"No current grammar table for vocabulary pack {registry.default!r} ({path}); "
+                         "run compile_grammar.py, or set VOCAB_REQUIRE_GRAMMAR=false to serve without one")
+
+
+def create_vocab_registry():
+    """Create the process-wide registry from environment settings"""
+    return VocabRegistry(
+        vocab_dir=os.environ.get('VOCAB_DIR', DEFAULT_VOCAB_DIR),
+        default=os.environ.get('VOCAB_DEFAULT_PACK', DEFAULT_PACK),
+        reload_interval=float(os.environ.get('VOCAB_RELOAD_INTERVAL', 10)),
+    )
+
+
+vocab_registry = create_vocab_registry()